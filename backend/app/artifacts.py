@@ -0,0 +1,179 @@
+"""
+Compiled, memory-mappable model artifacts.
+
+`python -m app.artifacts` converts the pickled model and encoders in
+backend/model/ into a directory of .npy arrays (flattened tree tables,
+class labels, encoder vocabularies and feature names) plus a meta.json.
+Loading them with np.load(mmap_mode="r") needs no unpickling, and every
+worker process maps the same file pages instead of holding its own copy
+of the trees.
+
+The artifacts record a hash of the source .pkl files; stale artifacts are
+ignored and the service falls back to the pickles. Registry versions keep
+their artifacts in <version>/compiled/ (see app.registry).
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+# -------- Configuration --------
+MODEL_DIR = Path(__file__).resolve().parent.parent / "model"
+ARTIFACTS_DIR = Path(os.getenv("MODEL_ARTIFACTS_DIR", str(MODEL_DIR / "compiled")))
+# "auto": use compiled artifacts when present and up to date; "off": always load pickles.
+MODEL_ARTIFACTS = os.getenv("MODEL_ARTIFACTS", "auto").lower()
+
+FORMAT_VERSION = 1
+SOURCE_FILES = (
+    "triage_model.pkl",
+    "symptom_encoder.pkl",
+    "condition_encoder.pkl",
+    "feature_names.pkl",
+)
+ARRAYS = (
+    "feature",
+    "threshold",
+    "children",
+    "leaf_values",
+    "roots",
+    "classes",
+    "symptom_classes",
+    "condition_classes",
+    "feature_names",
+)
+
+
+def source_fingerprint(model_dir=MODEL_DIR):
+    """Hash of the source pickles the artifacts were compiled from."""
+    digest = hashlib.sha256()
+    for name in SOURCE_FILES:
+        with open(Path(model_dir) / name, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _string_array(values):
+    # Fixed-width unicode so the array can be memory-mapped (no pickled objects).
+    return np.asarray([str(value) for value in values])
+
+
+def _class_array(classes):
+    classes = np.asarray(classes)
+    if classes.dtype != object:
+        return classes
+    if not all(isinstance(label, str) for label in classes):
+        raise TypeError("Class labels must be numbers or strings to be memory-mapped")
+    return _string_array(classes)
+
+
+def artifacts_dir_for(model_dir):
+    """ARTIFACTS_DIR for the bundled model, <model_dir>/compiled for registry versions."""
+    model_dir = Path(model_dir).resolve()
+    return ARTIFACTS_DIR if model_dir == MODEL_DIR else model_dir / "compiled"
+
+
+# -------- Compile --------
+def compile_artifacts(model_dir=MODEL_DIR, out_dir=None):
+    """Write .npy artifacts for the model and encoders in model_dir."""
+    import joblib
+    from app.compiled_model import CompiledTreeEnsemble
+
+    model_dir = Path(model_dir)
+    out_dir = Path(out_dir) if out_dir else artifacts_dir_for(model_dir)
+    model = joblib.load(model_dir / "triage_model.pkl")
+    mlb_symptoms = joblib.load(model_dir / "symptom_encoder.pkl")
+    mlb_conditions = joblib.load(model_dir / "condition_encoder.pkl")
+    feature_names = joblib.load(model_dir / "feature_names.pkl")
+    compiled = CompiledTreeEnsemble.from_estimator(model)
+
+    arrays = {
+        "feature": compiled.feature,
+        "threshold": compiled.threshold,
+        "children": compiled.children,
+        "leaf_values": compiled.leaf_values,
+        "roots": compiled.roots,
+        "classes": _class_array(compiled.classes_),
+        "symptom_classes": _string_array(mlb_symptoms.classes_),
+        "condition_classes": _string_array(mlb_conditions.classes_),
+        "feature_names": _string_array(feature_names),
+    }
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(out_dir / f"{name}.npy", np.ascontiguousarray(array), allow_pickle=False)
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "source_fingerprint": source_fingerprint(model_dir),
+        "estimator": type(model).__name__,
+        "max_depth": int(compiled.max_depth),
+        "n_trees": int(compiled.n_trees),
+        "n_nodes": int(len(compiled.feature)),
+    }
+    # Written last: a directory without meta.json is never loaded.
+    (out_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+    return meta
+
+
+# -------- Load --------
+def load_artifacts(artifacts_dir=ARTIFACTS_DIR, model_dir=MODEL_DIR, mmap_mode="r"):
+    """
+    Load compiled artifacts, memory-mapped by default.
+
+    Returns None when artifacts are disabled, missing, from another format
+    version, or compiled from different source pickles.
+    """
+    artifacts_dir = Path(artifacts_dir)
+    meta_path = artifacts_dir / "meta.json"
+    if MODEL_ARTIFACTS == "off" or not meta_path.exists():
+        return None
+
+    meta = json.loads(meta_path.read_text())
+    if meta.get("format_version") != FORMAT_VERSION:
+        return None
+    if meta.get("source_fingerprint") != source_fingerprint(model_dir):
+        return None
+
+    arrays = {
+        name: np.load(artifacts_dir / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+        for name in ARRAYS
+    }
+    return SimpleNamespace(meta=meta, **arrays)
+
+
+@lru_cache(maxsize=4)
+def cached_artifacts(model_dir=MODEL_DIR):
+    """Artifacts for a model directory, loaded once per process."""
+    model_dir = Path(model_dir)
+    return load_artifacts(artifacts_dir_for(model_dir), model_dir)
+
+
+def compiled_model_from_artifacts(artifacts):
+    from app.compiled_model import CompiledTreeEnsemble
+
+    return CompiledTreeEnsemble(
+        classes=artifacts.classes,
+        feature=artifacts.feature,
+        threshold=artifacts.threshold,
+        children=artifacts.children,
+        leaf_values=artifacts.leaf_values,
+        roots=artifacts.roots,
+        max_depth=artifacts.meta["max_depth"],
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile model pickles into memory-mappable .npy artifacts.")
+    parser.add_argument("--model-dir", default=str(MODEL_DIR))
+    parser.add_argument("--out-dir", default=None, help="default: the model directory's artifact directory")
+    args = parser.parse_args()
+
+    meta = compile_artifacts(args.model_dir, args.out_dir)
+    out_dir = args.out_dir or artifacts_dir_for(args.model_dir)
+    print(f"Compiled {meta['n_trees']} trees ({meta['n_nodes']} nodes) into {out_dir}")
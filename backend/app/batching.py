@@ -0,0 +1,98 @@
+import asyncio
+import os
+
+# -------- Configuration --------
+BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "5"))
+BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+BATCH_CONCURRENCY = int(os.getenv("PREDICT_BATCH_CONCURRENCY", "1"))
+
+
+# -------- Micro-batching Scheduler --------
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item requests into batches.
+
+    Callers await submit(item). Items are gathered until max_batch_size is
+    reached or max_wait_ms has passed since the first item of the batch
+    arrived, then process_batch(items) runs once off the event loop and
+    each caller receives the result at its own position.
+
+    With concurrency=1 only one batch runs at a time, so requests that
+    arrive while the model is busy are collected into the next batch
+    instead of competing for the GIL. With a multi-worker executor set
+    concurrency to the number of workers.
+
+    executor is anything with an async run(fn, *args) method, such as
+    InferenceExecutor; by default batches run on the loop's thread pool.
+    """
+
+    def __init__(self, process_batch, max_batch_size=BATCH_MAX_SIZE,
+                 max_wait_ms=BATCH_WINDOW_MS, concurrency=BATCH_CONCURRENCY,
+                 executor=None):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.concurrency = max(1, concurrency)
+        self.executor = executor
+        self._queue = None
+        self._workers = []
+
+    async def submit(self, item):
+        if self._queue is None:
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def _start(self):
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.concurrency)
+        ]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                if self.executor is not None:
+                    results = await self.executor.run(self.process_batch, items)
+                else:
+                    results = await loop.run_in_executor(None, self.process_batch, items)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
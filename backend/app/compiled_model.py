@@ -0,0 +1,138 @@
+import numpy as np
+import sklearn
+from sklearn.utils.fixes import parse_version
+
+# -------- Compiled Tree Ensemble --------
+# sklearn evaluates trees on float32 inputs (compared against float64
+# thresholds); do the same so leaf assignment is bit-for-bit identical.
+INPUT_DTYPE = np.float32
+
+# Since scikit-learn 1.4 tree_.value already holds class fractions and
+# predict_proba returns them as-is; older versions stored weighted counts
+# and normalized at predict time.
+_VALUES_ARE_COUNTS = parse_version(sklearn.__version__) < parse_version("1.4")
+
+_SUPPORTED_ESTIMATORS = (
+    "DecisionTreeClassifier",
+    "ExtraTreeClassifier",
+    "RandomForestClassifier",
+    "ExtraTreesClassifier",
+)
+
+
+def _leaf_distribution(tree, n_classes):
+    """Per-node class distribution exactly as DecisionTreeClassifier.predict_proba returns it."""
+    proba = tree.value[:, 0, :n_classes].astype(np.float64)
+    if _VALUES_ARE_COUNTS:
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        proba = proba / normalizer
+    return proba
+
+
+class CompiledTreeEnsemble:
+    """
+    A fitted sklearn tree classifier flattened into NumPy arrays.
+
+    All trees share one node table (feature, threshold, [left, right] child
+    pairs and leaf class distribution). Leaves point back to themselves, so
+    a batch is evaluated by advancing every (sample, tree) pair max_depth
+    times with array operations and then averaging the leaf class
+    distributions in tree order, exactly like
+    RandomForestClassifier.predict_proba.
+
+    The arrays are only read, so they may be read-only memory maps (see
+    app.artifacts).
+    """
+
+    def __init__(self, classes, feature, threshold, children, leaf_values,
+                 roots, max_depth):
+        self.classes_ = classes
+        self.feature = feature
+        self.threshold = threshold
+        # Row-major [left, right] pairs so one gather picks the next node.
+        self.children = children
+        self.leaf_values = leaf_values
+        self.roots = roots
+        self.max_depth = max_depth
+        self._children = children.ravel()
+
+    @property
+    def children_left(self):
+        return self.children[:, 0]
+
+    @property
+    def children_right(self):
+        return self.children[:, 1]
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Compile a fitted single-output tree classifier or forest of them."""
+        name = type(estimator).__name__
+        if name not in _SUPPORTED_ESTIMATORS:
+            raise TypeError(f"Cannot compile estimator of type {name}")
+        if getattr(estimator, "n_outputs_", 1) != 1:
+            raise TypeError("Only single-output classifiers can be compiled")
+
+        trees = [e.tree_ for e in getattr(estimator, "estimators_", [estimator])]
+        n_classes = len(estimator.classes_)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            node_ids = np.arange(tree.node_count, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            values.append(_leaf_distribution(tree, n_classes))
+
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            classes=np.asarray(estimator.classes_),
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1).astype(np.intp),
+            leaf_values=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max(tree.max_depth for tree in trees),
+        )
+
+    def apply(self, X):
+        """Return the global leaf index reached by every sample in every tree."""
+        X = np.ascontiguousarray(X, dtype=INPUT_DTYPE)
+        flat_X = X.ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+
+        for _ in range(self.max_depth):
+            values = np.take(flat_X, row_offsets + np.take(self.feature, nodes))
+            go_right = ~(values <= np.take(self.threshold, nodes))
+            nodes = np.take(self._children, 2 * nodes + go_right)
+
+        return nodes
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        probabilities = np.zeros((leaves.shape[0], len(self.classes_)), dtype=np.float64)
+        # Accumulate tree by tree to keep sklearn's summation order.
+        for tree in range(self.n_trees):
+            probabilities += self.leaf_values[leaves[:, tree]]
+        if self.n_trees > 1:
+            probabilities /= self.n_trees
+        return probabilities
+
+    def predict_with_proba(self, X):
+        """Return (predicted labels, class indices, probabilities) in one pass."""
+        probabilities = self.predict_proba(X)
+        class_indices = np.argmax(probabilities, axis=1)
+        return self.classes_.take(class_indices), class_indices, probabilities
@@ -0,0 +1,146 @@
+"""
+Zero-downtime model swaps.
+
+A Deployment is one model version with its own inference pool and
+micro-batcher. ModelManager serves requests from the active deployment
+and swaps versions in the background: the new pool is started and warmed
+next to the one serving traffic (loading one worker at a time so they do
+not starve it of CPU), then made active in a single assignment. The old
+deployment finishes the work it already admitted and is shut down.
+"""
+import asyncio
+import logging
+import os
+import time
+from functools import partial
+
+from app.batching import MicroBatcher
+from app.encoding import load_encoder
+from app.executor import InferenceExecutor, score_requests
+from app.registry import ModelVersionError, get_version, set_active
+
+# -------- Configuration --------
+# Workers of the incoming version that load at the same time during a swap.
+MODEL_SWAP_LOAD_CONCURRENCY = int(os.getenv("MODEL_SWAP_LOAD_CONCURRENCY", "1"))
+# How long the outgoing version may take to finish admitted requests.
+MODEL_SWAP_DRAIN_TIMEOUT_SECONDS = float(os.getenv("MODEL_SWAP_DRAIN_TIMEOUT_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class SwapInProgress(Exception):
+    """Raised when a swap is requested while another one is running."""
+
+
+class Deployment:
+    """One model version with its own inference pool and batcher."""
+
+    def __init__(self, version, encoder, load_concurrency=None):
+        self.version = version
+        self.encoder = encoder
+        self.inference = InferenceExecutor(version=version, load_concurrency=load_concurrency)
+        # Single /predict calls are coalesced into batches with one batch in
+        # flight per worker.
+        self.batcher = MicroBatcher(
+            partial(score_requests, version=version),
+            executor=self.inference,
+            concurrency=self.inference.workers,
+        )
+
+    async def retire(self, timeout=MODEL_SWAP_DRAIN_TIMEOUT_SECONDS):
+        """Let admitted requests finish, then stop the batcher and the pool."""
+        if not await self.inference.wait_idle(timeout):
+            logger.warning(
+                "Model %s still had %d patients pending after %.0fs; shutting down anyway",
+                self.version.name, self.inference.pending, timeout,
+            )
+        await self.batcher.close()
+        await asyncio.to_thread(self.inference.shutdown)
+
+    async def close(self):
+        await self.batcher.close()
+        self.inference.shutdown()
+
+
+class ModelManager:
+    """
+    Holds the active Deployment and swaps in new versions.
+
+    Request handlers read `active` once and use that deployment for the
+    whole request; a swap replaces it between two event-loop steps, so a
+    request never mixes versions. on_swap(version) is called right after a
+    swap, e.g. to clear caches keyed on the old version.
+    """
+
+    def __init__(self, version, on_swap=None):
+        self.active = Deployment(version, load_encoder(version.path))
+        self.on_swap = on_swap
+        self._swap_task = None
+        # Deployments still warming or draining, closed on shutdown.
+        self._standby = set()
+        self.swap_status = {"status": "idle"}
+
+    async def start(self):
+        await self.active.inference.warm_up()
+
+    def activate(self, name):
+        """
+        Start swapping to version name in the background and return the swap
+        status. Raises ModelVersionError for an unknown version and
+        SwapInProgress if a swap is already running.
+        """
+        version = get_version(name)
+        if self._swap_task is not None and not self._swap_task.done():
+            raise SwapInProgress(self.swap_status["to_version"])
+        if version == self.active.version:
+            return self.status()
+        self.swap_status = {
+            "status": "warming",
+            "from_version": self.active.version.name,
+            "to_version": version.name,
+        }
+        self._swap_task = asyncio.create_task(self._swap(version))
+        return self.status()
+
+    async def _swap(self, version):
+        started = time.perf_counter()
+        try:
+            encoder = await asyncio.to_thread(load_encoder, version.path)
+            candidate = Deployment(version, encoder, load_concurrency=MODEL_SWAP_LOAD_CONCURRENCY)
+            self._standby.add(candidate)
+            await candidate.inference.warm_up()
+        except Exception as exc:
+            logger.exception("Warming model %s failed; keeping %s", version.name, self.active.version.name)
+            self.swap_status.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+            for deployment in list(self._standby):
+                self._standby.discard(deployment)
+                await asyncio.to_thread(deployment.inference.shutdown)
+            return
+
+        previous, self.active = self.active, candidate
+        self._standby.discard(candidate)
+        self._standby.add(previous)
+        if self.on_swap is not None:
+            self.on_swap(version)
+        try:
+            set_active(version.name)
+        except (OSError, ModelVersionError) as exc:
+            logger.error("Could not record %s as the active model version: %s", version.name, exc)
+        logger.info("Swapped model %s -> %s", previous.version.name, version.name)
+
+        self.swap_status.update(status="draining", warm_up_seconds=candidate.inference.warm_up_seconds)
+        await previous.retire()
+        self._standby.discard(previous)
+        self.swap_status.update(status="completed", seconds=round(time.perf_counter() - started, 3))
+
+    def status(self):
+        return {"active_version": self.active.version.name, "swap": dict(self.swap_status)}
+
+    async def close(self):
+        if self._swap_task is not None and not self._swap_task.done():
+            self._swap_task.cancel()
+            await asyncio.gather(self._swap_task, return_exceptions=True)
+        for deployment in self._standby:
+            await deployment.close()
+        self._standby.clear()
+        await self.active.close()
@@ -0,0 +1,109 @@
+"""
+Feature encoding shared by the model workers and the API process.
+
+Only the encoder vocabularies and feature layout are loaded here (no
+model, no SHAP), so the API process can encode requests, e.g. for
+result-cache keys, without paying the model's load time or memory.
+Each model version has its own FeatureEncoder.
+"""
+import numpy as np
+from functools import lru_cache
+from pathlib import Path
+from app.artifacts import MODEL_DIR, cached_artifacts
+
+
+def _load_vocabularies(model_dir):
+    artifacts = cached_artifacts(model_dir)
+    if artifacts is not None:
+        return (
+            [str(label) for label in artifacts.symptom_classes],
+            [str(label) for label in artifacts.condition_classes],
+            [str(name) for name in artifacts.feature_names],
+        )
+    import joblib
+    return (
+        list(joblib.load(model_dir / "symptom_encoder.pkl").classes_),
+        list(joblib.load(model_dir / "condition_encoder.pkl").classes_),
+        list(joblib.load(model_dir / "feature_names.pkl")),
+    )
+
+
+# -------- Encoding --------
+NUMERIC_FEATURES = ["Age", "Gender", "Blood_Pressure", "Heart_Rate", "Temperature"]
+
+
+def _build_column_index(classes, feature_names, offset):
+    """Map each encoder label to its column in the full feature vector."""
+    labels = list(classes)
+    if list(feature_names[offset:offset + len(labels)]) != labels:
+        raise ValueError("feature_names does not match the encoder vocabulary layout")
+    return {label: offset + i for i, label in enumerate(labels)}
+
+
+def _normalize_labels(labels, known, fallback):
+    normalized = []
+    for label in labels:
+        label = label.strip()
+        normalized.append(label if label in known else fallback)
+    return normalized
+
+
+class FeatureEncoder:
+    """Encoder vocabularies and feature layout of one model version."""
+
+    def __init__(self, symptom_classes, condition_classes, feature_names):
+        self.symptom_classes = list(symptom_classes)
+        self.condition_classes = list(condition_classes)
+        self.feature_names = list(feature_names)
+        # Column layout: numeric block, then symptom block, then condition block,
+        # exactly as in feature_names.
+        self.symptom_columns = _build_column_index(
+            self.symptom_classes, self.feature_names, len(NUMERIC_FEATURES)
+        )
+        self.condition_columns = _build_column_index(
+            self.condition_classes, self.feature_names,
+            len(NUMERIC_FEATURES) + len(self.symptom_columns),
+        )
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR):
+        return cls(*_load_vocabularies(Path(model_dir)))
+
+    def encode(self, patients_data):
+        """
+        Encode a list of patient dicts into a single model input matrix.
+        
+        Rows are written straight into a preallocated buffer using the column
+        index, which gives the same matrix as MultiLabelBinarizer.transform
+        without any sklearn calls.
+        """
+        final_input = np.zeros((len(patients_data), len(self.feature_names)))
+        rows, cols = [], []
+        
+        for row, patient in enumerate(patients_data):
+            final_input[row, :len(NUMERIC_FEATURES)] = (
+                patient["age"],
+                0 if patient["gender"] == "Male" else 1,
+                patient["blood_pressure"],
+                patient["heart_rate"],
+                patient["temperature"],
+            )
+            
+            symptoms = _normalize_labels(patient["symptoms"], self.symptom_columns, "Other_Symptom")
+            conditions = _normalize_labels(patient["conditions"], self.condition_columns, "Other_Condition")
+            
+            for label in symptoms:
+                rows.append(row)
+                cols.append(self.symptom_columns[label])
+            for label in conditions:
+                rows.append(row)
+                cols.append(self.condition_columns[label])
+        
+        final_input[rows, cols] = 1.0
+        return final_input
+
+
+@lru_cache(maxsize=4)
+def load_encoder(model_dir=MODEL_DIR):
+    """FeatureEncoder for a model directory, loaded once per process."""
+    return FeatureEncoder.load(model_dir)
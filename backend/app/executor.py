@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from app.metrics import INFERENCE_ERRORS, INFERENCE_PENDING, observe_stages, run_timed
+from observability.profiling import collect_worker_profiles, start_worker_profile
+
+# -------- Configuration --------
+# "process" runs inference in worker processes with the model preloaded in
+# each one; "thread" keeps it in this process (one GIL).
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "process").lower()
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+# Patients admitted (queued or being scored) before new work is rejected.
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "1024"))
+INFERENCE_RETRY_AFTER_SECONDS = int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "1"))
+# Load the sklearn model and SHAP explainer when a worker starts ("1") or on
+# the first explained request ("0"); scoring alone only needs the compiled model.
+INFERENCE_PRELOAD_EXPLAINER = os.getenv("INFERENCE_PRELOAD_EXPLAINER", "1") == "1"
+# Synthetic patients each worker scores during warm-up (0 only starts the workers).
+INFERENCE_WARM_UP_BATCH_SIZE = int(os.getenv("INFERENCE_WARM_UP_BATCH_SIZE", "32"))
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloaded(Exception):
+    """Raised when the inference queue is full."""
+
+
+# -------- Worker Functions --------
+def _init_worker(version=None, load_gate=None, warm_up_batch_size=INFERENCE_WARM_UP_BATCH_SIZE):
+    # One BLAS/OpenMP thread per process; parallelism comes from the pool.
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+    # The gate limits how many workers load at once, e.g. while a new model
+    # version warms up next to the pool that is still serving traffic.
+    if load_gate is None:
+        _warm_up_model(version, warm_up_batch_size)
+    else:
+        with load_gate:
+            _warm_up_model(version, warm_up_batch_size)
+
+
+def score_requests(requests, version=None):
+    """Score [(patient_data, explain_mode), ...] in one batch."""
+    from app.model_inference import predict_patients_json
+
+    patients, modes = zip(*requests)
+    return predict_patients_json(list(patients), explain=list(modes), version=version)
+
+
+def _warm_up_requests(version, size, explain):
+    """A deterministic synthetic batch covering every symptom and condition."""
+    from app.model_inference import load_model
+
+    encoder = load_model(version).encoder
+    symptom_classes, condition_classes = encoder.symptom_classes, encoder.condition_classes
+    return [
+        ({
+            "age": 5 + (i * 7) % 90,
+            "gender": "Male" if i % 2 else "Female",
+            "blood_pressure": 85 + (i * 11) % 120,
+            "heart_rate": 50 + (i * 13) % 95,
+            "temperature": 36.0 + (i % 10) * 0.5,
+            "symptoms": [symptom_classes[i % len(symptom_classes)],
+                         symptom_classes[(3 * i + 1) % len(symptom_classes)]],
+            "conditions": [condition_classes[i % len(condition_classes)]],
+        }, explain)
+        for i in range(size)
+    ]
+
+
+def _warm_up_model(version, size=INFERENCE_WARM_UP_BATCH_SIZE):
+    # Loads the model (and SHAP when the explainer is preloaded) and scores
+    # one batch so the first real request does not pay for lazy setup.
+    from app.model_inference import load_model
+
+    model = load_model(version)
+    if INFERENCE_PRELOAD_EXPLAINER:
+        model.explainer
+    if size:
+        explain = "top_k" if INFERENCE_PRELOAD_EXPLAINER else "none"
+        score_requests(_warm_up_requests(version, size, explain), version)
+
+
+def _ping():
+    return os.getpid()
+
+
+# -------- Inference Executor --------
+class InferenceExecutor:
+    """
+    Runs predict_patients_json on a dedicated pool with bounded admission.
+
+    Callers wrap their work in admit(n); once max_pending patients are
+    queued or in progress further requests raise InferenceOverloaded so the
+    API can shed load instead of growing an unbounded backlog.
+    """
+
+    def __init__(self, backend=INFERENCE_BACKEND, workers=INFERENCE_WORKERS,
+                 max_pending=INFERENCE_MAX_PENDING, version=None, load_concurrency=None,
+                 warm_up_batch_size=INFERENCE_WARM_UP_BATCH_SIZE):
+        if backend not in ("process", "thread"):
+            raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}'")
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        # Registry ModelVersion served by this pool (None: the active version).
+        self.version = version
+        # Workers loading the model at the same time (None: all of them).
+        self.load_concurrency = load_concurrency
+        self.warm_up_batch_size = warm_up_batch_size
+        self.pending = 0
+        self.pool = None
+        # Warm-up state reported by readiness().
+        self.ready = False
+        self.warm_up_seconds = None
+        self.warm_up_error = None
+
+    def start(self):
+        if self.pool is not None:
+            return
+        if self.backend == "process":
+            context = multiprocessing.get_context()
+            load_gate = None
+            if self.load_concurrency and self.load_concurrency < self.workers:
+                load_gate = context.Semaphore(self.load_concurrency)
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.version, load_gate, self.warm_up_batch_size),
+            )
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    async def warm_up(self):
+        """
+        Start every worker, load its model and score a synthetic batch on it.
+
+        Explanations are included when INFERENCE_PRELOAD_EXPLAINER is set so
+        SHAP is imported and exercised too. Sets ready once all workers are
+        warm; a failure is recorded in warm_up_error and re-raised.
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            if self.backend == "process":
+                # Process workers warm up in their initializer; a worker only
+                # answers a ping once it is done, so wait until all have.
+                await self._on_each_worker(_ping)
+            else:
+                # Threads share one model. Not through run(), so warm-up
+                # timings stay out of the stage metrics.
+                await loop.run_in_executor(self.pool, _warm_up_model, self.version, self.warm_up_batch_size)
+        except Exception as exc:
+            self.warm_up_error = f"{type(exc).__name__}: {exc}"
+            logger.exception("Inference warm-up failed")
+            raise
+        self.warm_up_seconds = round(time.perf_counter() - started, 3)
+        self.ready = True
+
+    async def _on_each_worker(self, fn, *args, timeout=None):
+        """
+        Run fn(*args) until every worker process has run it (or timeout
+        seconds have passed) and return the set of pids seen. Tasks go to
+        whichever worker is free, so fn must be safe to repeat and return
+        os.getpid().
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        seen = set()
+        while True:
+            seen.update(await asyncio.gather(*(
+                loop.run_in_executor(self.pool, fn, *args)
+                for _ in range(self.workers)
+            )))
+            if len(seen) >= self.workers or (deadline is not None and loop.time() >= deadline):
+                return seen
+            await asyncio.sleep(0.05)
+
+    async def profile_workers(self, seconds, interval_seconds, include_idle=False):
+        """
+        Sample every worker process for seconds and return the collapsed
+        stack counts merged across workers. Thread workers live in the API
+        process and are covered by its own sampler, so this is empty for
+        the thread backend.
+        """
+        if self.backend != "process" or self.pool is None:
+            return Counter()
+        with tempfile.TemporaryDirectory(prefix="triage-profile-") as path:
+            pids = await self._on_each_worker(
+                start_worker_profile, path, seconds, interval_seconds, include_idle, timeout=seconds,
+            )
+            await asyncio.sleep(seconds)
+            counts, missing = await collect_worker_profiles(path, pids, timeout=seconds + 5)
+        if missing:
+            logger.warning("No profile from inference workers %s", sorted(missing))
+        return counts
+
+    async def score(self, requests):
+        """score_requests on this pool's model version."""
+        return await self.run(score_requests, requests, self.version)
+
+    def readiness(self):
+        if self.ready:
+            status = "ready"
+        elif self.warm_up_error:
+            status = "failed"
+        else:
+            status = "starting"
+        return {
+            "status": status,
+            "backend": self.backend,
+            "workers": self.workers,
+            "model_version": self.version.name if self.version else None,
+            "explainer_preloaded": INFERENCE_PRELOAD_EXPLAINER,
+            "warm_up_seconds": self.warm_up_seconds,
+            "error": self.warm_up_error,
+        }
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+        self.ready = False
+
+    async def wait_idle(self, timeout):
+        """Wait until no admitted work is left; False if timeout seconds pass first."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.pending:
+            if loop.time() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    @contextmanager
+    def admit(self, count=1):
+        # A batch bigger than the whole queue is only let in when idle.
+        if self.pending and self.pending + count > self.max_pending:
+            raise InferenceOverloaded()
+        self.pending += count
+        gauge = INFERENCE_PENDING.labels(self.version.name if self.version else "")
+        gauge.inc(count)
+        try:
+            yield
+        finally:
+            self.pending -= count
+            gauge.dec(count)
+
+    async def run(self, fn, *args):
+        """Run fn on the pool and record the stage timings it reports."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        try:
+            result, timings = await loop.run_in_executor(self.pool, run_timed, fn, *args)
+        except Exception:
+            INFERENCE_ERRORS.inc()
+            raise
+        observe_stages(timings)
+        return result
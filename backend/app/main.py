@@ -1,8 +1,29 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import secrets
+from typing import Literal, Optional
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
-from app.model_inference import predict_patient_json
+from app.deployment import ModelManager, SwapInProgress
+from app.executor import INFERENCE_RETRY_AFTER_SECONDS, InferenceOverloaded
+from app.metrics import CONTENT_TYPE, HTTP_METRICS, MetricsMiddleware, current_trace_id, render_metrics
+from observability.profiling import (
+    PROFILE_INTERVAL_MS, ProfilerBusy, RequestProfilingMiddleware, format_collapsed, profile,
+)
+from app.registry import ModelVersionError, active_version, list_versions
+from app.result_cache import PredictionCache, feature_key
+
+# When set, /admin endpoints require it in the X-Admin-Token header.
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN", "")
 
 app = FastAPI()
+# Per-request samples for GET /admin/profile/slow-requests (idle otherwise).
+app.add_middleware(RequestProfilingMiddleware, trace_id=current_trace_id)
+# Request metrics for GET /metrics and the X-Trace-Id header.
+app.add_middleware(MetricsMiddleware, metrics=HTTP_METRICS, service="ai")
+
+ExplainMode = Literal["none", "top_k"]
 
 class PatientInput(BaseModel):
     age: int
@@ -13,6 +34,147 @@ class PatientInput(BaseModel):
     symptoms: list[str]
     conditions: list[str]
 
+# Results for repeat inputs are served from memory without touching the pool.
+startup_version = active_version()
+result_cache = PredictionCache(model_version=startup_version.name)
+# The active model version runs on a dedicated worker pool and can be swapped
+# at runtime (POST /admin/models/{version}/activate).
+models = ModelManager(
+    startup_version,
+    on_swap=lambda version: result_cache.set_model_version(version.name),
+)
+
+@app.exception_handler(InferenceOverloaded)
+async def overloaded_handler(request: Request, exc: InferenceOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Inference queue is full, retry shortly."},
+        headers={"Retry-After": str(INFERENCE_RETRY_AFTER_SECONDS)},
+    )
+
+# Warm-up runs in the background so the app binds and answers /health/live
+# straight away; /health/ready turns 200 once every worker is warm.
+warm_up_task = None
+
+@app.on_event("startup")
+async def startup_event():
+    global warm_up_task
+    warm_up_task = asyncio.create_task(models.start())
+    # The failure is already logged and reported by /health/ready.
+    warm_up_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    await models.close()
+
+@app.get("/health/live")
+async def health_live():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def health_ready():
+    readiness = models.active.inference.readiness()
+    if readiness["status"] != "ready":
+        return JSONResponse(status_code=503, content=readiness)
+    return readiness
+
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
+
+def _check_admin_token(token):
+    # Fails closed: the /admin endpoints are off until a token is configured.
+    if not MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set MODEL_ADMIN_TOKEN to enable them")
+    if not secrets.compare_digest(token or "", MODEL_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.get("/admin/models")
+async def admin_models(x_admin_token: Optional[str] = Header(None)):
+    _check_admin_token(x_admin_token)
+    return {**models.status(), "versions": list_versions()}
+
+@app.post("/admin/models/{version}/activate", status_code=202)
+async def admin_activate_model(version: str, x_admin_token: Optional[str] = Header(None)):
+    """Load and warm version in the background, then swap it in without dropping requests."""
+    _check_admin_token(x_admin_token)
+    try:
+        return models.activate(version)
+    except ModelVersionError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except SwapInProgress as exc:
+        raise HTTPException(status_code=409, detail=f"A swap to {exc} is already in progress")
+
+async def _run_profile(seconds, interval_ms, include_idle=False, slow_ms=None, during=None):
+    try:
+        sampler, workers = await profile(
+            seconds, interval_ms, include_idle, root="api", slow_ms=slow_ms, during=during,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    counts = sampler.counts + workers if workers else sampler.counts
+    return PlainTextResponse(format_collapsed(counts), headers={
+        "X-Profile-Samples": str(sampler.samples),
+        "X-Profile-Slow-Requests": str(sampler.slow_requests),
+    })
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(seconds: float = 10, interval_ms: float = PROFILE_INTERVAL_MS,
+                        include_idle: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Sample the API process and every inference worker; collapsed stacks for a flamegraph."""
+    _check_admin_token(x_admin_token)
+    inference = models.active.inference
+    return await _run_profile(
+        seconds, interval_ms, include_idle,
+        during=lambda: inference.profile_workers(seconds, interval_ms / 1000.0, include_idle),
+    )
+
+@app.get("/admin/profile/slow-requests", response_class=PlainTextResponse)
+async def admin_profile_slow_requests(seconds: float = 10, threshold_ms: float = 100,
+                                      interval_ms: float = PROFILE_INTERVAL_MS,
+                                      x_admin_token: Optional[str] = Header(None)):
+    """Collapsed stacks of API-process CPU per request slower than threshold_ms."""
+    _check_admin_token(x_admin_token)
+    return await _run_profile(seconds, interval_ms, slow_ms=threshold_ms)
+
+# Each request reads models.active once, so it is scored, cached and keyed
+# by a single model version even if a swap happens meanwhile.
 @app.post("/predict")
-def predict(patient: PatientInput):
-    return predict_patient_json(patient.model_dump())
+async def predict(patient: PatientInput, explain: ExplainMode = "top_k"):
+    deployment = models.active
+    patient_data = patient.model_dump()
+    key = feature_key(patient_data, deployment.encoder)
+    cached = result_cache.get(key, explain)
+    if cached is not None:
+        return cached
+    with deployment.inference.admit():
+        result = await deployment.batcher.submit((patient_data, explain))
+    result_cache.put(key, explain, result)
+    return result
+
+@app.post("/predict/batch")
+async def predict_batch(patients: list[PatientInput], explain: ExplainMode = "top_k"):
+    if not patients:
+        return []
+    deployment = models.active
+    patients_data = [patient.model_dump() for patient in patients]
+    keys = [feature_key(patient_data, deployment.encoder) for patient_data in patients_data]
+    results = [result_cache.get(key, explain) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        with deployment.inference.admit(len(missing)):
+            scored = await deployment.inference.score(
+                [(patients_data[i], explain) for i in missing]
+            )
+        for i, result in zip(missing, scored):
+            result_cache.put(keys[i], explain, result)
+            results[i] = result
+    return results
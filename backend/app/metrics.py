@@ -0,0 +1,66 @@
+"""
+Prometheus metrics for the AI service.
+
+The metric types, GET /metrics rendering, request middleware and trace
+IDs come from the shared observability package; this module only defines
+the AI service's own metrics. See observability.metrics for running
+several API processes behind one port (PROMETHEUS_MULTIPROC_DIR).
+
+Stage timings (encode, predict, route, explain) are recorded where the
+work happens, which may be an inference worker process: run_timed wraps
+the call in the worker and hands the timings back with the result, and
+the API process observes them.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from observability.metrics import (
+    CONTENT_TYPE, DEFAULT_BUCKETS, Counter, Gauge, Histogram, HttpMetrics,
+    MetricsMiddleware, current_trace_id, render_metrics,
+)
+
+# -------- AI Service Metrics --------
+HTTP_METRICS = HttpMetrics("ai")
+STAGE_SECONDS = Histogram(
+    "ai_inference_stage_duration_seconds",
+    "Time per inference stage for one batch (encode, predict, route, explain).",
+    ["stage"], buckets=DEFAULT_BUCKETS,
+)
+INFERENCE_PENDING = Gauge(
+    "ai_inference_pending_patients", "Patients admitted to an inference pool and not yet scored.",
+    ["model_version"], multiprocess_mode="livesum",
+)
+INFERENCE_ERRORS = Counter("ai_inference_errors", "Batches that failed in an inference worker.")
+
+
+# -------- Stage Timing --------
+_stage_log = threading.local()
+
+
+@contextmanager
+def stage(name):
+    """Time one stage of the current run_timed call (a no-op outside one)."""
+    timings = getattr(_stage_log, "timings", None)
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append((name, time.perf_counter() - start))
+
+
+def run_timed(fn, *args):
+    """Run fn in the current (worker) thread and return (result, stage timings)."""
+    _stage_log.timings = []
+    try:
+        return fn(*args), _stage_log.timings
+    finally:
+        _stage_log.timings = None
+
+
+def observe_stages(timings):
+    for name, seconds in timings:
+        STAGE_SECONDS.labels(name).observe(seconds)
@@ -1,142 +1,157 @@
-import joblib
 import numpy as np
-import shap
-from pathlib import Path
+from functools import cached_property, lru_cache
+from app.artifacts import compiled_model_from_artifacts, cached_artifacts
+from app.compiled_model import CompiledTreeEnsemble
+from app.encoding import load_encoder
+from app.metrics import stage
+from app.registry import active_version
+from app.routing import DepartmentRouter
 
-# -------- Load Saved Objects --------
-_MODEL_DIR = Path(__file__).resolve().parent.parent / "model"
 
-model = joblib.load(_MODEL_DIR / "triage_model.pkl")
-mlb_symptoms = joblib.load(_MODEL_DIR / "symptom_encoder.pkl")
-mlb_conditions = joblib.load(_MODEL_DIR / "condition_encoder.pkl")
-feature_names = joblib.load(_MODEL_DIR / "feature_names.pkl")
+# -------- Explanation --------
+EXPLAIN_MODES = ("none", "top_k")
+TOP_K_FEATURES = 5
 
-explainer = shap.TreeExplainer(model)
 
-
-# -------- Department Logic --------
-def recommend_department(predicted_risk, symptoms, bp, hr):
-    
-    emergency_flags = [
-        "Severe Bleeding",
-        "Trauma",
-        "Sudden Collapse",
-        "Loss of Consciousness"
-    ]
-    
-    if predicted_risk == "High":
-        return "Emergency"
-    
-    if any(symptom in symptoms for symptom in emergency_flags):
-        return "Emergency"
-    
-    if bp > 180 or hr > 130:
-        return "Emergency"
+def _top_features(shap_class, feature_names, k=TOP_K_FEATURES):
+    # Stable sort on -|impact| keeps the original tie order of sorted(..., reverse=True).
+    top_indices = np.argsort(-np.abs(shap_class), kind="stable")[:k]
     
-    cardio_symptoms = [
-        "Chest Pain",
-        "Palpitations",
-        "Shortness of Breath",
-        "Swelling"
+    return [
+        {"feature": feature_names[idx], "impact": round(float(shap_class[idx]), 4)}
+        for idx in top_indices
     ]
-    
-    if any(symptom in symptoms for symptom in cardio_symptoms):
-        return "Cardiology"
-    
-    neuro_symptoms = [
-        "Seizure",
-        "Confusion",
-        "Weakness",
-        "Blurred Vision"
-    ]
-    
-    if any(symptom in symptoms for symptom in neuro_symptoms):
-        return "Neurology"
-    
-    respiratory_symptoms = [
-        "Breathing Difficulty",
-        "Wheezing",
-        "Cough"
-    ]
-    
-    if any(symptom in symptoms for symptom in respiratory_symptoms):
-        return "Pulmonology"
-    
-    gastro_symptoms = [
-        "Abdominal Pain",
-        "Nausea",
-        "Vomiting",
-        "Diarrhea",
-        "Blood in Stool"
-    ]
-    
-    if any(symptom in symptoms for symptom in gastro_symptoms):
-        return "Gastroenterology"
-    
-    return "General Medicine"
+
+
+# -------- Model Version --------
+class TriageModel:
+    """
+    Everything needed to score with one model version: the feature encoder,
+    the department routing rules compiled for its columns, the flat-array
+    tree engine (memory-mapped from the compiled artifacts when they exist,
+    otherwise built from the pickle), and the sklearn estimator and SHAP
+    explainer, which are only loaded on first use.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.encoder = load_encoder(version.path)
+        self.router = DepartmentRouter.load(self.encoder)
+        artifacts = cached_artifacts(version.path)
+        if artifacts is not None:
+            self.compiled_model = compiled_model_from_artifacts(artifacts)
+        else:
+            # Falls back to sklearn for estimator types it cannot compile.
+            try:
+                self.compiled_model = CompiledTreeEnsemble.from_estimator(self.model)
+            except TypeError:
+                self.compiled_model = None
+
+    @cached_property
+    def model(self):
+        """The sklearn estimator, unpickled on first use (SHAP or no compiled artifacts)."""
+        import joblib
+        return joblib.load(self.version.path / "triage_model.pkl")
+
+    @cached_property
+    def explainer(self):
+        # shap pulls in a large dependency tree; import it only when explanations are needed.
+        import shap
+        return shap.TreeExplainer(self.model)
+
+    def predict_with_proba(self, final_input):
+        if self.compiled_model is not None:
+            return self.compiled_model.predict_with_proba(final_input)
+        
+        probabilities = self.model.predict_proba(final_input)
+        # Same rule sklearn classifiers use for predict(), without a second pass.
+        class_indices = np.argmax(probabilities, axis=1)
+        return self.model.classes_.take(class_indices), class_indices, probabilities
+
+    def explain_rows(self, final_input, rows, class_indices):
+        """
+        Run SHAP only for the rows that asked for an explanation and keep only
+        the predicted class's contributions for each of them.
+        """
+        if not rows:
+            return {}
+        
+        shap_values = self.explainer.shap_values(final_input[rows])
+        
+        explanations = {}
+        for position, row in enumerate(rows):
+            class_index = class_indices[row]
+            if isinstance(shap_values, list):
+                shap_class = shap_values[class_index][position]
+            else:
+                shap_class = shap_values[position][:, class_index]
+            explanations[row] = _top_features(shap_class, self.encoder.feature_names)
+        
+        return explanations
+
+
+@lru_cache(maxsize=2)
+def load_model(version=None):
+    """
+    TriageModel for a registry version (default: the active one), loaded
+    once per process. Two are kept so a process can serve the outgoing and
+    incoming versions during a swap.
+    """
+    return TriageModel(version or active_version())
 
 
 # -------- Prediction Function --------
-def predict_patient_json(patient_data):
-    
-    age = patient_data["age"]
-    gender = patient_data["gender"]
-    bp = patient_data["blood_pressure"]
-    hr = patient_data["heart_rate"]
-    temp = patient_data["temperature"]
-    symptoms_input = patient_data["symptoms"]
-    conditions_input = patient_data["conditions"]
-    
-    symptoms_input = [
-        s.strip() if s.strip() in mlb_symptoms.classes_
-        else "Other_Symptom"
-        for s in symptoms_input
-    ]
-    
-    conditions_input = [
-        c.strip() if c.strip() in mlb_conditions.classes_
-        else "Other_Condition"
-        for c in conditions_input
-    ]
-    
-    gender_val = 0 if gender == "Male" else 1
-    
-    symptoms_encoded_input = mlb_symptoms.transform([symptoms_input])
-    conditions_encoded_input = mlb_conditions.transform([conditions_input])
-    
-    numeric_part = np.array([[age, gender_val, bp, hr, temp]])
-    final_input = np.hstack([numeric_part, symptoms_encoded_input, conditions_encoded_input])
-    
-    prediction = model.predict(final_input)[0]
-    probabilities = model.predict_proba(final_input)[0]
-    confidence = round(float(np.max(probabilities) * 100), 2)
-    
-    department = recommend_department(prediction, symptoms_input, bp, hr)
-    
-    shap_values = explainer.shap_values(final_input)
-    class_index = list(model.classes_).index(prediction)
-    
-    if isinstance(shap_values, list):
-        shap_class = shap_values[class_index][0]
+def predict_patients_json(patients_data, explain="top_k", version=None):
+    """
+    Score a batch of patients with one encoding pass, one model pass and at
+    most one SHAP pass. Results are returned in input order and
+    are identical to calling predict_patient_json on each patient.
+    
+    explain is either one mode for the whole batch or a list with one mode
+    per patient: "top_k" returns the top contributing features of the
+    predicted class, "none" skips SHAP and returns an empty explanation.
+    
+    version is a registry ModelVersion; by default the active version is used.
+    Each result records the version that produced it in model_version.
+    """
+    if not patients_data:
+        return []
+    
+    modes = [explain] * len(patients_data) if isinstance(explain, str) else list(explain)
+    for mode in modes:
+        if mode not in EXPLAIN_MODES:
+            raise ValueError(f"Unknown explain mode: {mode}")
+    
+    triage_model = load_model(version)
+    with stage("encode"):
+        final_input = triage_model.encoder.encode(patients_data)
+    
+    with stage("predict"):
+        predictions, class_indices, probabilities = triage_model.predict_with_proba(final_input)
+    with stage("route"):
+        departments = triage_model.router.route(final_input, predictions)
+    
+    explained_rows = [row for row, mode in enumerate(modes) if mode == "top_k"]
+    if explained_rows:
+        with stage("explain"):
+            explanations = triage_model.explain_rows(final_input, explained_rows, class_indices)
     else:
-        shap_class = shap_values[0][:, class_index]
-    
-    feature_importance = sorted(
-        list(enumerate(shap_class)),
-        key=lambda x: abs(x[1]),
-        reverse=True
-    )[:5]
-    
-    explanation = []
-    for idx, val in feature_importance:
-        explanation.append({
-            "feature": feature_names[idx],
-            "impact": round(float(val), 4)
+        explanations = {}
+    
+    results = []
+    for row in range(len(patients_data)):
+        confidence = round(float(np.max(probabilities[row]) * 100), 2)
+        
+        results.append({
+            "risk_level": predictions[row],
+            "confidence": confidence,
+            "recommended_department": departments[row],
+            "explanation": explanations.get(row, []),
+            "model_version": triage_model.version.name,
         })
     
-    return {
-        "risk_level": prediction,
-        "confidence": confidence,
-        "recommended_department": department,
-        "explanation": explanation
-    }
+    return results
+
+
+def predict_patient_json(patient_data, explain="top_k", version=None):
+    return predict_patients_json([patient_data], explain=explain, version=version)[0]
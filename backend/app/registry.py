@@ -0,0 +1,150 @@
+"""
+Versioned model registry.
+
+Each version is a directory under MODEL_REGISTRY_DIR holding the model
+pickles and its compiled artifacts:
+
+    model/registry/
+        2024-06-01/triage_model.pkl, symptom_encoder.pkl, ...
+        2024-06-01/compiled/*.npy, meta.json
+        ACTIVE              name of the version served after a restart
+
+`python -m app.registry publish <version>` copies the pickles from
+backend/model/ (or --from DIR) into a new version and compiles its
+artifacts. A running service switches versions through
+POST /admin/models/{version}/activate.
+
+With an empty registry the service serves the bundled backend/model/
+directory, named "bundled-" plus a hash of its pickles.
+"""
+import os
+import re
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.artifacts import MODEL_DIR, SOURCE_FILES, compile_artifacts, source_fingerprint
+
+# -------- Configuration --------
+REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", str(MODEL_DIR / "registry")))
+# Version served at startup; defaults to the ACTIVE file, then the bundled model.
+MODEL_VERSION = os.getenv("MODEL_VERSION", "")
+
+ACTIVE_FILE = "ACTIVE"
+_VERSION_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+class ModelVersionError(ValueError):
+    """Raised for an invalid, unknown or already published model version."""
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    name: str
+    path: Path
+
+
+def _check_name(name):
+    if not _VERSION_NAME.match(name):
+        raise ModelVersionError(
+            f"Invalid model version '{name}': use letters, digits, '.', '_' or '-'"
+        )
+
+
+def bundled_version():
+    return ModelVersion(f"bundled-{source_fingerprint(MODEL_DIR)[:12]}", MODEL_DIR)
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    registry_dir = Path(registry_dir)
+    if not registry_dir.is_dir():
+        return []
+    return sorted(
+        path.name for path in registry_dir.iterdir()
+        if _VERSION_NAME.match(path.name) and (path / "triage_model.pkl").exists()
+    )
+
+
+def get_version(name, registry_dir=REGISTRY_DIR):
+    _check_name(name)
+    if name.startswith("bundled-"):
+        bundled = bundled_version()
+        if name == bundled.name:
+            return bundled
+    path = Path(registry_dir) / name
+    if not (path / "triage_model.pkl").exists():
+        raise ModelVersionError(f"Unknown model version '{name}'")
+    return ModelVersion(name, path.resolve())
+
+
+def active_version(registry_dir=REGISTRY_DIR):
+    """MODEL_VERSION if set, else the registry's ACTIVE version, else the bundled model."""
+    if MODEL_VERSION:
+        return get_version(MODEL_VERSION, registry_dir)
+    active_path = Path(registry_dir) / ACTIVE_FILE
+    if active_path.exists():
+        return get_version(active_path.read_text().strip(), registry_dir)
+    return bundled_version()
+
+
+def set_active(name, registry_dir=REGISTRY_DIR):
+    """Record name as the version to serve after a restart."""
+    get_version(name, registry_dir)
+    registry_dir = Path(registry_dir)
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = registry_dir / f".{ACTIVE_FILE}.tmp"
+    tmp_path.write_text(name + "\n")
+    os.replace(tmp_path, registry_dir / ACTIVE_FILE)
+
+
+def publish(name, source_dir=MODEL_DIR, registry_dir=REGISTRY_DIR):
+    """Copy the pickles in source_dir into a new version and compile its artifacts."""
+    _check_name(name)
+    registry_dir = Path(registry_dir)
+    target = registry_dir / name
+    if target.exists():
+        raise ModelVersionError(f"Model version '{name}' already exists")
+
+    # Built under a temporary name so a half-written version is never listed.
+    staging = registry_dir / f".{name}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    try:
+        for file_name in SOURCE_FILES:
+            shutil.copy2(Path(source_dir) / file_name, staging / file_name)
+        compile_artifacts(staging, staging / "compiled")
+        os.rename(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return ModelVersion(name, target.resolve())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list published versions")
+    publish_parser = commands.add_parser("publish", help="publish model pickles as a new version")
+    publish_parser.add_argument("version")
+    publish_parser.add_argument("--from", dest="source_dir", default=str(MODEL_DIR))
+    publish_parser.add_argument("--activate", action="store_true",
+                                help="also serve this version after a restart")
+    activate_parser = commands.add_parser("activate", help="serve a version after a restart")
+    activate_parser.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        active = active_version().name
+        for name in list_versions() or [active]:
+            print(f"{'*' if name == active else ' '} {name}")
+    elif args.command == "publish":
+        version = publish(args.version, args.source_dir)
+        if args.activate:
+            set_active(version.name)
+        print(f"Published {version.name} to {version.path}")
+    else:
+        set_active(args.version)
+        print(f"{args.version} will be served after a restart; "
+              f"use POST /admin/models/{args.version}/activate to switch a running service")
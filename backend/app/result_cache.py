@@ -0,0 +1,82 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+# -------- Configuration --------
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+
+
+def feature_key(patient, encoder):
+    """
+    Canonical key for a patient: a hash of the encoded feature vector.
+
+    Encoding strips whitespace and maps unknown symptoms/conditions to
+    Other_*, so requests that differ only in label order, duplicates or
+    unknown labels share a key. The model and department routing depend
+    only on this vector, so equal keys give equal results for one model
+    version; encoder is that version's FeatureEncoder.
+    """
+    row = encoder.encode([patient])
+    return hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+
+
+# -------- Result Cache --------
+class PredictionCache:
+    """
+    LRU cache of prediction results keyed on feature_key.
+
+    An entry stores the explanation when one was computed; a "top_k"
+    lookup only hits entries that have it, a "none" lookup hits any entry
+    and returns it without the explanation. All entries are dropped when
+    the model version changes, and results from any other version than
+    the current one are not stored.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, model_version=None):
+        self.max_entries = max(0, max_entries)
+        self.model_version = model_version
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def set_model_version(self, version):
+        if version != self.model_version:
+            self._entries.clear()
+            self.model_version = version
+
+    def get(self, key, explain):
+        entry = self._entries.get(key)
+        if entry is None or (explain == "top_k" and not entry["explanation_computed"]):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        result = entry["result"]
+        return {**result, "explanation": list(result["explanation"]) if explain == "top_k" else []}
+
+    def put(self, key, explain, result):
+        if self.max_entries == 0 or result.get("model_version", self.model_version) != self.model_version:
+            return
+        existing = self._entries.get(key)
+        if existing is not None and existing["explanation_computed"] and explain != "top_k":
+            # Keep the richer entry.
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = {"result": result, "explanation_computed": explain == "top_k"}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "model_version": self.model_version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
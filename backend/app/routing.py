@@ -0,0 +1,142 @@
+"""
+Department routing from a declarative rule table.
+
+Rules are read from ROUTING_RULES_PATH (default config/routing_rules.json)
+and tried in order; the first rule a patient matches picks the department,
+and patients matching none get default_department. A rule matches when
+any of its criteria holds:
+
+    risk_levels   the predicted risk level is one of these
+    symptoms      the patient has any of these symptoms
+    vitals        any threshold is crossed, e.g. {"Heart_Rate": {"gt": 130}}
+                  (operators gt, ge, lt, le; keys are feature names)
+
+Each rule is compiled against a model version's feature layout: symptom
+lists become 0/1 masks over the encoded symptom columns, so a whole batch
+is routed from the encoded feature matrix with one matrix product plus a
+few array comparisons. A malformed table (unknown keys, vitals or
+operators, non-numeric thresholds, symptoms outside the model vocabulary)
+raises RoutingRulesError when it is compiled. Changes to the file apply on
+restart or on the next model swap.
+"""
+import json
+import operator
+import os
+from pathlib import Path
+
+import numpy as np
+
+from app.encoding import NUMERIC_FEATURES
+
+# -------- Configuration --------
+ROUTING_RULES_PATH = Path(os.getenv(
+    "ROUTING_RULES_PATH",
+    str(Path(__file__).resolve().parent.parent / "config" / "routing_rules.json"),
+))
+
+VITAL_OPERATORS = {"gt": operator.gt, "ge": operator.ge, "lt": operator.lt, "le": operator.le}
+RULE_KEYS = {"department", "risk_levels", "symptoms", "vitals"}
+
+
+class RoutingRulesError(ValueError):
+    """Raised for a malformed routing rule table."""
+
+
+def load_rules(path=ROUTING_RULES_PATH):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+class DepartmentRouter:
+    """A rule table compiled against one FeatureEncoder's column layout."""
+
+    def __init__(self, rules, encoder):
+        if not isinstance(rules, dict) or not isinstance(rules.get("rules"), list):
+            raise RoutingRulesError("Routing rules must be an object with a 'rules' list")
+        self.default_department = rules.get("default_department", "General Medicine")
+        self.departments = []
+        self.risk_levels = []
+        self.vitals = []
+
+        symptom_start = len(NUMERIC_FEATURES)
+        self._symptom_block = slice(symptom_start, symptom_start + len(encoder.symptom_columns))
+        masks = []
+
+        for position, rule in enumerate(rules["rules"]):
+            unknown = set(rule) - RULE_KEYS
+            if unknown:
+                raise RoutingRulesError(f"Rule {position}: unknown keys {sorted(unknown)}")
+            if not rule.get("department"):
+                raise RoutingRulesError(f"Rule {position}: 'department' is required")
+            if not any(rule.get(key) for key in ("risk_levels", "symptoms", "vitals")):
+                raise RoutingRulesError(f"Rule {position}: needs risk_levels, symptoms or vitals")
+
+            for key in ("risk_levels", "symptoms"):
+                if not isinstance(rule.get(key, []), list):
+                    raise RoutingRulesError(f"Rule {position}: '{key}' must be a list")
+            if not isinstance(rule.get("vitals", {}), dict):
+                raise RoutingRulesError(f"Rule {position}: 'vitals' must be an object")
+
+            mask = np.zeros(len(encoder.symptom_columns))
+            for symptom in rule.get("symptoms", []):
+                column = encoder.symptom_columns.get(symptom)
+                if column is None:
+                    # Unknown labels are encoded as Other_Symptom, so it could never match.
+                    raise RoutingRulesError(f"Rule {position}: symptom '{symptom}' is not in the model vocabulary")
+                mask[column - symptom_start] = 1.0
+            masks.append(mask)
+
+            vitals = []
+            for feature, thresholds in rule.get("vitals", {}).items():
+                if feature not in NUMERIC_FEATURES:
+                    raise RoutingRulesError(
+                        f"Rule {position}: unknown vital '{feature}', expected one of {NUMERIC_FEATURES}"
+                    )
+                if not isinstance(thresholds, dict) or not thresholds:
+                    raise RoutingRulesError(f"Rule {position}: '{feature}' needs thresholds such as {{\"gt\": 130}}")
+                for op_name, value in thresholds.items():
+                    if op_name not in VITAL_OPERATORS:
+                        raise RoutingRulesError(
+                            f"Rule {position}: unknown operator '{op_name}', expected one of {sorted(VITAL_OPERATORS)}"
+                        )
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        raise RoutingRulesError(f"Rule {position}: '{feature}' {op_name} threshold must be a number")
+                    vitals.append((NUMERIC_FEATURES.index(feature), VITAL_OPERATORS[op_name], float(value)))
+
+            self.departments.append(rule["department"])
+            self.risk_levels.append(list(rule.get("risk_levels", [])))
+            self.vitals.append(vitals)
+
+        # (n_symptoms, n_rules): column j marks the symptoms of rule j.
+        self._symptom_masks = np.column_stack(masks) if masks else np.zeros((len(encoder.symptom_columns), 0))
+
+    @classmethod
+    def load(cls, encoder, path=ROUTING_RULES_PATH):
+        return cls(load_rules(path), encoder)
+
+    def route(self, final_input, predictions):
+        """Department for every row of the encoded matrix, given its predicted risk level."""
+        n = len(final_input)
+        departments = np.full(n, self.default_department, dtype=object)
+        if not n:
+            return departments
+
+        # Symptom criteria for all rules at once: row i has a symptom of rule j.
+        symptom_hits = (final_input[:, self._symptom_block] @ self._symptom_masks) > 0
+        predictions = np.asarray(predictions)
+        unrouted = np.ones(n, dtype=bool)
+
+        for j, department in enumerate(self.departments):
+            matched = symptom_hits[:, j].copy()
+            if self.risk_levels[j]:
+                matched |= np.isin(predictions, self.risk_levels[j])
+            for column, compare, value in self.vitals[j]:
+                matched |= compare(final_input[:, column], value)
+            # Earlier rules take priority.
+            matched &= unrouted
+            departments[matched] = department
+            unrouted &= ~matched
+            if not unrouted.any():
+                break
+
+        return departments
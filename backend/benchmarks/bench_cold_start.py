@@ -0,0 +1,118 @@
+"""
+Cold start and per-worker memory: pickled model vs compiled artifacts.
+
+For each mode a fresh interpreter imports app.model_inference and scores
+one patient; the time to do so and the process RSS / PSS are reported.
+Then a process pool is started and RSS / PSS is read for every worker.
+PSS splits shared pages between the processes mapping them, so it shows
+what memory-mapping saves across workers; RSS counts shared pages in full.
+
+Modes:
+  pickle     MODEL_ARTIFACTS=off (joblib.load of the .pkl files)
+  artifacts  memory-mapped .npy artifacts (run `python -m app.artifacts` first)
+
+Usage (from backend/):
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --workers 4 --preload-explainer 1
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+COLD_START_SCRIPT = """
+import json, time
+import joblib, numpy, sklearn.ensemble
+from app.artifacts import MODEL_DIR, compiled_model_from_artifacts, load_artifacts
+from app.compiled_model import CompiledTreeEnsemble
+
+# Model load alone (libraries already imported).
+load_start = time.perf_counter()
+artifacts = load_artifacts()
+if artifacts is not None:
+    compiled_model_from_artifacts(artifacts)
+else:
+    CompiledTreeEnsemble.from_estimator(joblib.load(MODEL_DIR / "triage_model.pkl"))
+load_seconds = time.perf_counter() - load_start
+
+start = time.perf_counter()
+from app.model_inference import predict_patient_json
+from benchmarks.common import synthetic_patients
+predict_patient_json(synthetic_patients(1)[0], explain="none")
+elapsed = time.perf_counter() - start
+from benchmarks.bench_cold_start import memory_mb
+print(json.dumps({"seconds": elapsed, "load_seconds": load_seconds, **memory_mb(None)}))
+"""
+
+POOL_SCRIPT = """
+import asyncio, json, sys
+from app.executor import InferenceExecutor
+from benchmarks.bench_cold_start import memory_mb
+
+async def main(workers):
+    inference = InferenceExecutor(backend="process", workers=workers)
+    await inference.warm_up()
+    pids = sorted(inference.pool._processes)
+    print(json.dumps([memory_mb(pid) for pid in pids]))
+    inference.shutdown()
+
+asyncio.run(main(int(sys.argv[1])))
+"""
+
+
+def memory_mb(pid=None):
+    """RSS and PSS of a process in MB, from /proc (Linux only)."""
+    path = f"/proc/{pid or 'self'}/smaps_rollup"
+    values = {}
+    with open(path) as handle:
+        for line in handle:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key.lower() + "_mb"] = round(int(rest.split()[0]) / 1024, 1)
+    return values
+
+
+def run(script, env, *args):
+    result = subprocess.run(
+        [sys.executable, "-c", script, *args],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--preload-explainer", choices=["0", "1"], default="0",
+                        help="INFERENCE_PRELOAD_EXPLAINER for the worker pool")
+    args = parser.parse_args()
+
+    for mode, setting in (("pickle", "off"), ("artifacts", "auto")):
+        env = {
+            **os.environ,
+            "MODEL_ARTIFACTS": setting,
+            "INFERENCE_PRELOAD_EXPLAINER": args.preload_explainer,
+            "PYTHONWARNINGS": "ignore",
+        }
+        cold = [run(COLD_START_SCRIPT, env) for _ in range(args.repeats)]
+        best = min(cold, key=lambda sample: sample["seconds"])
+        load = min(sample["load_seconds"] for sample in cold)
+        print(
+            f"{mode:<9} model load = {load * 1000:7.1f} ms  "
+            f"import + first predict = {best['seconds'] * 1000:7.1f} ms  "
+            f"rss={best['rss_mb']:6.1f} MB  pss={best['pss_mb']:6.1f} MB"
+        )
+
+        workers = run(POOL_SCRIPT, env, str(args.workers))
+        rss = sum(worker["rss_mb"] for worker in workers) / len(workers)
+        pss = sum(worker["pss_mb"] for worker in workers) / len(workers)
+        print(
+            f"{'':<9} {len(workers)} workers (preload_explainer={args.preload_explainer}): "
+            f"mean rss={rss:6.1f} MB  mean pss={pss:6.1f} MB per worker"
+        )
+
+
+if __name__ == "__main__":
+    main()
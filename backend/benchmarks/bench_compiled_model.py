@@ -0,0 +1,57 @@
+"""
+Compiled tree-ensemble benchmark.
+
+Times the previous sklearn path (model.predict + model.predict_proba)
+against CompiledTreeEnsemble.predict_with_proba at batch sizes 1, 64 and
+4096, and checks that both produce identical classes and probabilities.
+
+Usage (from backend/):
+    python -m benchmarks.bench_compiled_model
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.model_inference import load_model
+from benchmarks.common import synthetic_feature_matrix
+
+BATCH_SIZES = (1, 64, 4096)
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(args):
+    triage_model = load_model()
+    model, compiled_model = triage_model.model, triage_model.compiled_model
+    if compiled_model is None:
+        raise SystemExit(f"{type(model).__name__} is not supported by the compiled engine")
+
+    for batch_size in BATCH_SIZES:
+        X = synthetic_feature_matrix(batch_size)
+
+        labels, _, probabilities = compiled_model.predict_with_proba(X)
+        assert np.array_equal(labels, model.predict(X))
+        assert np.array_equal(probabilities, model.predict_proba(X))
+
+        sklearn_time = best_of(lambda: (model.predict(X), model.predict_proba(X)), args.repeats)
+        compiled_time = best_of(lambda: compiled_model.predict_with_proba(X), args.repeats)
+
+        print(
+            f"batch={batch_size:<5} sklearn={sklearn_time * 1000:9.3f} ms  "
+            f"compiled={compiled_time * 1000:9.3f} ms  "
+            f"speedup={sklearn_time / compiled_time:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""
+Department routing benchmark.
+
+Times the previous per-patient recommend_department (five flag lists
+rebuilt per call and scanned with `in`) against DepartmentRouter.route on
+the encoded batch at batch sizes 1, 64 and 4096, and checks that both give
+the same department for every patient.
+
+Usage (from backend/):
+    python -m benchmarks.bench_department_routing
+"""
+import argparse
+import time
+
+from app.model_inference import load_model
+from benchmarks.common import synthetic_patients
+
+BATCH_SIZES = (1, 64, 4096)
+
+
+def reference_department(predicted_risk, symptoms, bp, hr):
+    """recommend_department as it was before the rule table."""
+    if predicted_risk == "High":
+        return "Emergency"
+    if any(symptom in symptoms for symptom in ["Severe Bleeding", "Trauma", "Sudden Collapse", "Loss of Consciousness"]):
+        return "Emergency"
+    if bp > 180 or hr > 130:
+        return "Emergency"
+    if any(symptom in symptoms for symptom in ["Chest Pain", "Palpitations", "Shortness of Breath", "Swelling"]):
+        return "Cardiology"
+    if any(symptom in symptoms for symptom in ["Seizure", "Confusion", "Weakness", "Blurred Vision"]):
+        return "Neurology"
+    if any(symptom in symptoms for symptom in ["Breathing Difficulty", "Wheezing", "Cough"]):
+        return "Pulmonology"
+    if any(symptom in symptoms for symptom in ["Abdominal Pain", "Nausea", "Vomiting", "Diarrhea", "Blood in Stool"]):
+        return "Gastroenterology"
+    return "General Medicine"
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(args):
+    triage_model = load_model()
+    known = triage_model.encoder.symptom_columns
+
+    for batch_size in BATCH_SIZES:
+        patients = synthetic_patients(batch_size)
+        X = triage_model.encoder.encode(patients)
+        predictions, _, _ = triage_model.predict_with_proba(X)
+        # The old routing saw labels after the same cleanup the encoder applies.
+        symptoms = [
+            [s.strip() if s.strip() in known else "Other_Symptom" for s in p["symptoms"]]
+            for p in patients
+        ]
+
+        def per_patient():
+            return [
+                reference_department(predictions[i], symptoms[i], p["blood_pressure"], p["heart_rate"])
+                for i, p in enumerate(patients)
+            ]
+
+        def vectorized():
+            return triage_model.router.route(X, predictions)
+
+        assert list(vectorized()) == per_patient()
+        old_time = best_of(per_patient, args.repeats)
+        new_time = best_of(vectorized, args.repeats)
+        print(
+            f"batch={batch_size:<5} per-patient={old_time * 1e6:9.1f} us  "
+            f"rule table={new_time * 1e6:9.1f} us  speedup={old_time / new_time:6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""
+Micro-batching benchmark for the /predict path.
+
+Compares the previous behaviour (each request scored on its own in a
+thread pool, like a sync FastAPI handler) against the MicroBatcher at
+several concurrency levels and reports p50/p99 latency and throughput.
+
+Usage (from backend/):
+    python -m benchmarks.bench_micro_batching
+    python -m benchmarks.bench_micro_batching --requests 2000 --window-ms 2
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.batching import MicroBatcher
+from app.model_inference import predict_patient_json, predict_patients_json
+from benchmarks.common import synthetic_patients
+
+CONCURRENCY_LEVELS = (1, 16, 128)
+# Starlette's default anyio thread limiter
+THREADPOOL_SIZE = 40
+
+
+async def run_clients(call, patients, concurrency):
+    latencies = []
+    next_index = iter(range(len(patients)))
+
+    async def client():
+        for i in next_index:
+            start = time.perf_counter()
+            await call(patients[i])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return np.array(latencies), elapsed
+
+
+def report(label, concurrency, latencies, elapsed):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(
+        f"{label:<12} clients={concurrency:<4} "
+        f"p50={p50:8.2f} ms  p99={p99:8.2f} ms  "
+        f"throughput={len(latencies) / elapsed:9.1f} req/s"
+    )
+
+
+async def main(args):
+    patients = synthetic_patients(args.requests)
+    predict_patients_json(patients[:8])  # warm-up
+
+    threadpool = ThreadPoolExecutor(max_workers=THREADPOOL_SIZE)
+
+    async def unbatched(patient):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(threadpool, predict_patient_json, patient)
+
+    for concurrency in CONCURRENCY_LEVELS:
+        latencies, elapsed = await run_clients(unbatched, patients, concurrency)
+        report("unbatched", concurrency, latencies, elapsed)
+
+        batcher = MicroBatcher(
+            predict_patients_json,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.window_ms,
+        )
+        latencies, elapsed = await run_clients(batcher.submit, patients, concurrency)
+        await batcher.close()
+        report("micro-batch", concurrency, latencies, elapsed)
+
+    threadpool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
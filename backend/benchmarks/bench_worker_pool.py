@@ -0,0 +1,60 @@
+"""
+Worker pool scaling benchmark.
+
+Runs the /predict path (MicroBatcher + InferenceExecutor) with 1, 2, 4, ...
+worker processes up to the number of cores and reports throughput and
+speedup relative to a single worker.
+
+Usage (from backend/):
+    python -m benchmarks.bench_worker_pool
+    python -m benchmarks.bench_worker_pool --clients 256 --requests 4000
+"""
+import argparse
+import asyncio
+import os
+
+import numpy as np
+
+from app.batching import MicroBatcher
+from app.executor import InferenceExecutor, score_requests
+from benchmarks.bench_micro_batching import run_clients
+from benchmarks.common import synthetic_patients
+
+
+def worker_counts(max_workers):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+async def main(args):
+    requests = [(patient, args.explain) for patient in synthetic_patients(args.requests)]
+    baseline = None
+
+    for workers in worker_counts(args.max_workers):
+        inference = InferenceExecutor(backend="process", workers=workers)
+        await inference.warm_up()
+        batcher = MicroBatcher(score_requests, executor=inference, concurrency=workers)
+
+        latencies, elapsed = await run_clients(batcher.submit, requests, args.clients)
+        await batcher.close()
+        inference.shutdown()
+
+        throughput = len(latencies) / elapsed
+        baseline = baseline or throughput
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(
+            f"workers={workers:<3} throughput={throughput:9.1f} req/s  "
+            f"speedup={throughput / baseline:5.2f}x  p50={p50:8.2f} ms  p99={p99:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=128)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--explain", choices=["none", "top_k"], default="top_k")
+    asyncio.run(main(parser.parse_args()))
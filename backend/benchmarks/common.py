@@ -0,0 +1,33 @@
+"""Shared synthetic inputs for the backend benchmarks."""
+import random
+
+from app.encoding import load_encoder
+from app.registry import active_version
+
+
+def _encoder():
+    return load_encoder(active_version().path)
+
+
+def synthetic_patients(n, seed=0):
+    rng = random.Random(seed)
+    encoder = _encoder()
+    symptoms = [s for s in encoder.symptom_classes if s != "Other_Symptom"]
+    conditions = [c for c in encoder.condition_classes if c != "Other_Condition"]
+    return [
+        {
+            "age": rng.randint(1, 95),
+            "gender": rng.choice(["Male", "Female"]),
+            "blood_pressure": rng.randint(80, 210),
+            "heart_rate": rng.randint(45, 150),
+            "temperature": round(rng.uniform(35.0, 41.0), 1),
+            "symptoms": rng.sample(symptoms, rng.randint(0, 4)),
+            "conditions": rng.sample(conditions, rng.randint(0, 2)),
+        }
+        for _ in range(n)
+    ]
+
+
+def synthetic_feature_matrix(n, seed=0):
+    final_input = _encoder().encode(synthetic_patients(n, seed))
+    return final_input
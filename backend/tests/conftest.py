@@ -0,0 +1,55 @@
+import os
+import random
+
+# Inference runs in threads of the test process; set before app modules read it.
+os.environ.setdefault("INFERENCE_BACKEND", "thread")
+os.environ.setdefault("INFERENCE_WORKERS", "1")
+os.environ.setdefault("INFERENCE_WARM_UP_BATCH_SIZE", "4")
+os.environ.setdefault("MODEL_ADMIN_TOKEN", "test-admin-token")
+
+import pytest
+
+from app.model_inference import load_model
+
+
+@pytest.fixture(scope="session")
+def triage_model():
+    return load_model()
+
+
+def make_patients(encoder, n, seed=0):
+    """Random patients over the model vocabulary, plus labels it does not know."""
+    rng = random.Random(seed)
+    symptoms = list(encoder.symptom_classes) + ["Hiccups", " Chest Pain "]
+    conditions = list(encoder.condition_classes) + ["Gout"]
+    return [
+        {
+            "age": rng.randint(1, 95),
+            "gender": rng.choice(["Male", "Female"]),
+            "blood_pressure": rng.randint(80, 210),
+            "heart_rate": rng.randint(45, 150),
+            "temperature": round(rng.uniform(35.0, 41.0), 1),
+            "symptoms": rng.sample(symptoms, rng.randint(0, 4)),
+            "conditions": rng.sample(conditions, rng.randint(0, 2)),
+        }
+        for _ in range(n)
+    ]
+
+
+@pytest.fixture(scope="session")
+def patients(triage_model):
+    return make_patients(triage_model.encoder, 200)
+
+
+@pytest.fixture(scope="session")
+def client():
+    import time
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        deadline = time.monotonic() + 120
+        while test_client.get("/health/ready").status_code != 200:
+            assert time.monotonic() < deadline, "inference warm-up did not finish"
+            time.sleep(0.05)
+        yield test_client
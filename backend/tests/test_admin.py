@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+TOKEN = os.environ["MODEL_ADMIN_TOKEN"]
+
+
+def test_admin_requires_the_token(client):
+    assert client.get("/admin/models").status_code == 401
+    assert client.get("/admin/models", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    response = client.get("/admin/models", headers={"X-Admin-Token": TOKEN})
+    assert response.status_code == 200
+    assert "active_version" in response.json()
+
+
+@pytest.mark.parametrize("method, path", [
+    ("get", "/admin/models"),
+    ("post", "/admin/models/some-version/activate"),
+    ("get", "/admin/profile?seconds=0.05"),
+    ("get", "/admin/profile/slow-requests?seconds=0.05"),
+])
+def test_admin_is_disabled_without_a_token(client, monkeypatch, method, path):
+    from app import main
+
+    monkeypatch.setattr(main, "MODEL_ADMIN_TOKEN", "")
+    for headers in ({}, {"X-Admin-Token": ""}, {"X-Admin-Token": TOKEN}):
+        assert getattr(client, method)(path, headers=headers).status_code == 403
+
+
+@pytest.mark.parametrize("path", ["/admin/profile", "/admin/profile/slow-requests"])
+def test_profile_requires_the_token(client, path):
+    assert client.get(path, params={"seconds": 0.05}).status_code == 401
+    assert client.get(path, params={"seconds": 0.05}, headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+
+def test_profile_returns_collapsed_stacks(client):
+    response = client.get(
+        "/admin/profile", params={"seconds": 0.2, "include_idle": True},
+        headers={"X-Admin-Token": TOKEN},
+    )
+    assert response.status_code == 200
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    stack, _, count = response.text.splitlines()[0].rpartition(" ")
+    assert stack.startswith("api;") and int(count) > 0
@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+
+from app.model_inference import predict_patient_json, predict_patients_json
+from tests.test_routing import reference_department
+
+
+# -------- Reference --------
+@pytest.fixture(scope="module")
+def reference(triage_model):
+    """
+    The original one-patient pipeline: MultiLabelBinarizer encoding, sklearn
+    predict / predict_proba, hard-coded routing and a SHAP call per patient.
+    """
+    import joblib
+    import shap
+
+    path = triage_model.version.path
+    model = joblib.load(path / "triage_model.pkl")
+    mlb_symptoms = joblib.load(path / "symptom_encoder.pkl")
+    mlb_conditions = joblib.load(path / "condition_encoder.pkl")
+    feature_names = joblib.load(path / "feature_names.pkl")
+    explainer = shap.TreeExplainer(model)
+
+    def predict(patient):
+        symptoms = [
+            s.strip() if s.strip() in mlb_symptoms.classes_ else "Other_Symptom"
+            for s in patient["symptoms"]
+        ]
+        conditions = [
+            c.strip() if c.strip() in mlb_conditions.classes_ else "Other_Condition"
+            for c in patient["conditions"]
+        ]
+        numeric = np.array([[
+            patient["age"], 0 if patient["gender"] == "Male" else 1,
+            patient["blood_pressure"], patient["heart_rate"], patient["temperature"],
+        ]])
+        final_input = np.hstack([numeric, mlb_symptoms.transform([symptoms]), mlb_conditions.transform([conditions])])
+        prediction = model.predict(final_input)[0]
+        probabilities = model.predict_proba(final_input)[0]
+        shap_values = explainer.shap_values(final_input)
+        class_index = list(model.classes_).index(prediction)
+        if isinstance(shap_values, list):
+            shap_class = shap_values[class_index][0]
+        else:
+            shap_class = shap_values[0][:, class_index]
+        top = sorted(enumerate(shap_class), key=lambda item: abs(item[1]), reverse=True)[:5]
+        explanation = [{"feature": feature_names[idx], "impact": round(float(val), 4)} for idx, val in top]
+        return {
+            "risk_level": prediction,
+            "confidence": round(float(np.max(probabilities) * 100), 2),
+            "recommended_department": reference_department(
+                prediction, symptoms, patient["blood_pressure"], patient["heart_rate"]
+            ),
+            "explanation": explanation,
+        }
+
+    predict.model = model
+    return predict
+
+
+@pytest.fixture(scope="module")
+def edge_patients(reference, patients):
+    """Patients with vitals exactly on the routing thresholds and on the trees' split points."""
+    edges = []
+    for i, (bp, hr) in enumerate([(180, 130), (181, 130), (180, 131), (179, 129)]):
+        edges.append({**patients[i], "blood_pressure": bp, "heart_rate": hr})
+
+    # Split thresholds on the numeric features (Age, Gender, BP, HR, Temperature).
+    splits = {feature: set() for feature in range(5)}
+    for estimator in getattr(reference.model, "estimators_", [reference.model]):
+        tree = estimator.tree_
+        for feature, threshold in zip(tree.feature, tree.threshold):
+            if 0 <= feature < 5:
+                splits[feature].add(float(threshold))
+    fields = {0: "age", 2: "blood_pressure", 3: "heart_rate", 4: "temperature"}
+    rng = np.random.default_rng(1)
+    for feature, name in fields.items():
+        values = sorted(splits[feature])
+        for threshold in rng.choice(values, size=min(10, len(values)), replace=False):
+            patient = dict(patients[len(edges) % len(patients)])
+            if name == "temperature":
+                patient[name] = float(threshold)
+            else:
+                # Integer inputs: the nearest values on both sides of the split.
+                for value in (int(np.floor(threshold)), int(np.ceil(threshold))):
+                    edges.append({**patient, name: value})
+                continue
+            edges.append(patient)
+    return edges
+
+
+@pytest.fixture(scope="module")
+def expected(reference, patients):
+    """Reference top_k results for the shared patients; "none" only drops the explanation."""
+    return [reference(patient) for patient in patients]
+
+
+def _expected(result, explain):
+    return result if explain == "top_k" else {**result, "explanation": []}
+
+
+def _without_version(results):
+    return [{key: value for key, value in result.items() if key != "model_version"} for result in results]
+
+
+# -------- Batch vs Reference --------
+@pytest.mark.parametrize("explain", ["top_k", "none"])
+def test_batch_matches_the_reference(expected, patients, explain):
+    batch = predict_patients_json(patients, explain=explain)
+    assert _without_version(batch) == [_expected(result, explain) for result in expected]
+
+
+def test_threshold_edges_match_the_reference(reference, edge_patients):
+    batch = predict_patients_json(edge_patients, explain="top_k")
+    assert _without_version(batch) == [reference(patient) for patient in edge_patients]
+
+
+def test_single_patient_call_matches_the_reference(expected, patients):
+    for patient, result in zip(patients[:10], expected):
+        assert _without_version([predict_patient_json(patient)]) == [result]
+
+
+def test_per_patient_explain_modes(expected, patients):
+    modes = ["top_k" if i % 3 else "none" for i in range(len(patients))]
+    batch = predict_patients_json(patients, explain=modes)
+    for mode, result, reference_result in zip(modes, batch, expected):
+        assert _without_version([result]) == [_expected(reference_result, mode)]
+        assert (result["explanation"] == []) == (mode == "none")
+
+
+def test_explanations_are_top_k_of_predicted_class(patients):
+    for result in predict_patients_json(patients[:20], explain="top_k"):
+        impacts = [abs(item["impact"]) for item in result["explanation"]]
+        assert len(impacts) == 5
+        assert impacts == sorted(impacts, reverse=True)
+
+
+def test_empty_batch():
+    assert predict_patients_json([]) == []
+
+
+def test_unknown_explain_mode(patients):
+    with pytest.raises(ValueError):
+        predict_patients_json(patients[:2], explain="all")
+
+
+def test_batch_endpoint_matches_predict_endpoint(client, patients):
+    sample = patients[:10]
+    batch = client.post("/predict/batch", json=sample, params={"explain": "none"})
+    assert batch.status_code == 200
+    singles = [
+        client.post("/predict", json=patient, params={"explain": "none"}).json()
+        for patient in sample
+    ]
+    assert batch.json() == singles
+
+
+def test_batch_endpoint_empty_list(client):
+    assert client.post("/predict/batch", json=[]).json() == []
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.batching import MicroBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_submits_share_one_batch_in_order():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch_size=64, max_wait_ms=20)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        finally:
+            await batcher.close()
+
+    assert run(main()) == [i * 10 for i in range(10)]
+    assert batches == [list(range(10))]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    sizes = []
+
+    def process(items):
+        sizes.append(len(items))
+        return items
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=20)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        finally:
+            await batcher.close()
+
+    assert run(main()) == list(range(10))
+    assert sizes == [4, 4, 2]
+
+
+def test_batch_error_reaches_every_caller():
+    def process(items):
+        raise RuntimeError("model failed")
+
+    async def main():
+        batcher = MicroBatcher(process, max_wait_ms=5)
+        try:
+            return await asyncio.gather(
+                *(batcher.submit(i) for i in range(3)), return_exceptions=True
+            )
+        finally:
+            await batcher.close()
+
+    results = run(main())
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_batcher_keeps_serving_after_an_error():
+    def process(items):
+        if items == ["bad"]:
+            raise ValueError("bad item")
+        return items
+
+    async def main():
+        batcher = MicroBatcher(process, max_wait_ms=0)
+        try:
+            with pytest.raises(ValueError):
+                await batcher.submit("bad")
+            return await batcher.submit("good")
+        finally:
+            await batcher.close()
+
+    assert run(main()) == "good"
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from app.artifacts import compile_artifacts, compiled_model_from_artifacts, load_artifacts
+from app.compiled_model import CompiledTreeEnsemble
+from tests.conftest import make_patients
+
+
+@pytest.fixture(scope="module")
+def features(triage_model):
+    return triage_model.encoder.encode(make_patients(triage_model.encoder, 500, seed=1))
+
+
+def test_probabilities_match_sklearn(triage_model, features):
+    compiled = CompiledTreeEnsemble.from_estimator(triage_model.model)
+    expected = triage_model.model.predict_proba(features)
+    np.testing.assert_allclose(compiled.predict_proba(features), expected, rtol=0, atol=1e-12)
+
+
+def test_labels_match_sklearn(triage_model, features):
+    labels, class_indices, probabilities = triage_model.compiled_model.predict_with_proba(features)
+    assert list(labels) == list(triage_model.model.predict(features))
+    assert list(class_indices) == list(probabilities.argmax(axis=1))
+
+
+def test_single_rows_match_batch(triage_model, features):
+    compiled = triage_model.compiled_model
+    batch = compiled.predict_proba(features[:20])
+    for row, expected in zip(features[:20], batch):
+        np.testing.assert_array_equal(compiled.predict_proba(row[np.newaxis, :])[0], expected)
+
+
+def test_artifacts_round_trip(triage_model, features, tmp_path):
+    compile_artifacts(triage_model.version.path, tmp_path)
+    artifacts = load_artifacts(tmp_path, triage_model.version.path)
+    assert artifacts is not None
+    loaded = compiled_model_from_artifacts(artifacts)
+    np.testing.assert_allclose(
+        loaded.predict_proba(features), triage_model.model.predict_proba(features), rtol=0, atol=1e-12,
+    )
+
+
+def test_stale_artifacts_are_ignored(triage_model, tmp_path):
+    compile_artifacts(triage_model.version.path, tmp_path)
+    meta = tmp_path / "meta.json"
+    meta.write_text(meta.read_text().replace('"format_version": ', '"format_version": 1000'))
+    assert load_artifacts(tmp_path, triage_model.version.path) is None
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+import pytest
+
+from app import executor as executor_module
+from app.executor import InferenceExecutor
+
+
+def test_ready_only_after_warm_up(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_warm_up(version, size):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(executor_module, "_warm_up_model", slow_warm_up)
+    inference = InferenceExecutor(backend="thread", workers=1)
+
+    async def scenario():
+        warm_up = asyncio.create_task(inference.warm_up())
+        await asyncio.to_thread(started.wait, 5)
+        during = inference.readiness()
+        release.set()
+        await warm_up
+        return during, inference.readiness()
+
+    try:
+        during, after = asyncio.run(scenario())
+    finally:
+        inference.shutdown()
+    assert during["status"] == "starting"
+    assert after["status"] == "ready"
+    assert after["warm_up_seconds"] is not None
+
+
+def test_failed_warm_up_is_reported(monkeypatch):
+    def broken_warm_up(version, size):
+        raise FileNotFoundError("triage_model.pkl")
+
+    monkeypatch.setattr(executor_module, "_warm_up_model", broken_warm_up)
+    inference = InferenceExecutor(backend="thread", workers=1)
+    try:
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(inference.warm_up())
+    finally:
+        inference.shutdown()
+    readiness = inference.readiness()
+    assert readiness["status"] == "failed"
+    assert "triage_model.pkl" in readiness["error"]
+
+
+def test_health_endpoints(client, monkeypatch):
+    from app.main import models
+
+    assert client.get("/health/live").json() == {"status": "alive"}
+    assert client.get("/health/ready").status_code == 200
+
+    monkeypatch.setattr(models.active.inference, "ready", False)
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+    # Liveness does not depend on the model.
+    assert client.get("/health/live").status_code == 200
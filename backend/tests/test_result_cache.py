@@ -0,0 +1,148 @@
+import os
+import time
+
+from app import deployment as deployment_module
+from app.registry import ModelVersion
+from app.result_cache import PredictionCache, feature_key
+
+TOKEN = os.environ["MODEL_ADMIN_TOKEN"]
+
+PATIENT = {
+    "age": 58, "gender": "Male", "blood_pressure": 160, "heart_rate": 110,
+    "temperature": 37.2, "symptoms": ["Chest Pain", "Fatigue"], "conditions": ["Hypertension"],
+}
+
+
+def _result(version="v1", explanation=("Age",)):
+    return {
+        "risk_level": "High", "confidence": 91.0, "recommended_department": "Cardiology",
+        "explanation": list(explanation), "model_version": version,
+    }
+
+
+# -------- PredictionCache --------
+def test_evicts_the_least_recently_used_entry():
+    cache = PredictionCache(max_entries=2, model_version="v1")
+    cache.put("a", "none", _result())
+    cache.put("b", "none", _result())
+    assert cache.get("a", "none") is not None  # "b" is now the oldest
+    cache.put("c", "none", _result())
+
+    assert cache.get("b", "none") is None
+    assert cache.get("a", "none") is not None and cache.get("c", "none") is not None
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+
+
+def test_zero_size_disables_the_cache():
+    cache = PredictionCache(max_entries=0, model_version="v1")
+    cache.put("a", "none", _result())
+    assert cache.get("a", "none") is None
+
+
+def test_top_k_entry_serves_none_without_the_explanation():
+    cache = PredictionCache(model_version="v1")
+    cache.put("a", "top_k", _result())
+    assert cache.get("a", "none")["explanation"] == []
+    assert cache.get("a", "top_k")["explanation"] == ["Age"]
+
+
+def test_none_entry_does_not_serve_top_k():
+    cache = PredictionCache(model_version="v1")
+    cache.put("a", "none", _result(explanation=()))
+    assert cache.get("a", "top_k") is None
+    assert cache.get("a", "none") is not None
+
+    # A later top_k result replaces it, and a none result never downgrades it.
+    cache.put("a", "top_k", _result())
+    cache.put("a", "none", _result(explanation=()))
+    assert cache.get("a", "top_k")["explanation"] == ["Age"]
+
+
+def test_returned_results_do_not_share_the_explanation_list():
+    cache = PredictionCache(model_version="v1")
+    cache.put("a", "top_k", _result())
+    cache.get("a", "top_k")["explanation"].append("mutated")
+    assert cache.get("a", "top_k")["explanation"] == ["Age"]
+
+
+def test_model_version_change_clears_the_cache():
+    cache = PredictionCache(model_version="v1")
+    cache.put("a", "top_k", _result())
+    cache.set_model_version("v1")
+    assert cache.get("a", "top_k") is not None
+
+    cache.set_model_version("v2")
+    assert cache.stats()["entries"] == 0
+    assert cache.get("a", "top_k") is None
+
+
+def test_results_from_another_version_are_not_stored():
+    cache = PredictionCache(model_version="v2")
+    # Scored by the old version while the swap happened.
+    cache.put("a", "top_k", _result(version="v1"))
+    assert cache.get("a", "none") is None
+    cache.put("a", "top_k", _result(version="v2"))
+    assert cache.get("a", "none") is not None
+
+
+# -------- feature_key --------
+def test_equivalent_inputs_share_a_key(triage_model):
+    encoder = triage_model.encoder
+    key = feature_key(PATIENT, encoder)
+    assert feature_key({**PATIENT, "symptoms": ["Fatigue", "Chest Pain"]}, encoder) == key
+    assert feature_key({**PATIENT, "symptoms": [" Chest Pain ", "Fatigue "]}, encoder) == key
+    assert feature_key({**PATIENT, "symptoms": ["Chest Pain", "Fatigue", "Fatigue"]}, encoder) == key
+
+    unknown = {**PATIENT, "symptoms": ["Chest Pain", "Hiccups"]}
+    assert feature_key(unknown, encoder) == feature_key({**unknown, "symptoms": ["Chest Pain", "Yawning"]}, encoder)
+
+
+def test_different_inputs_get_different_keys(triage_model):
+    encoder = triage_model.encoder
+    key = feature_key(PATIENT, encoder)
+    assert feature_key({**PATIENT, "age": 59}, encoder) != key
+    assert feature_key({**PATIENT, "symptoms": ["Chest Pain"]}, encoder) != key
+
+
+# -------- Endpoints --------
+def _wait_for_swap(client):
+    deadline = time.monotonic() + 120
+    while True:
+        status = client.get("/admin/models", headers={"X-Admin-Token": TOKEN}).json()
+        if status["swap"]["status"] in ("completed", "failed"):
+            return status
+        assert time.monotonic() < deadline, "model swap did not finish"
+        time.sleep(0.05)
+
+
+def test_cache_is_dropped_on_a_model_swap(client, monkeypatch):
+    from app import main
+
+    bundled = main.models.active.version
+    # The same pickles under another name, so no registry has to be written.
+    versions = {bundled.name: bundled, "cache-test": ModelVersion("cache-test", bundled.path)}
+    monkeypatch.setattr(deployment_module, "get_version", versions.__getitem__)
+    monkeypatch.setattr(deployment_module, "set_active", lambda name: None)
+    patient = {**PATIENT, "age": 61}
+
+    first = client.post("/predict", json=patient).json()
+    hits = client.get("/cache/stats").json()["hits"]
+    assert client.post("/predict", json=patient).json() == first
+    assert client.get("/cache/stats").json()["hits"] == hits + 1
+
+    try:
+        response = client.post("/admin/models/cache-test/activate", headers={"X-Admin-Token": TOKEN})
+        assert response.status_code == 202
+        assert _wait_for_swap(client)["swap"]["status"] == "completed"
+        assert client.get("/cache/stats").json()["entries"] == 0
+
+        misses = client.get("/cache/stats").json()["misses"]
+        swapped = client.post("/predict", json=patient).json()
+        assert client.get("/cache/stats").json()["misses"] == misses + 1
+        assert swapped["model_version"] == "cache-test"
+        assert {**swapped, "model_version": first["model_version"]} == first
+    finally:
+        client.post(f"/admin/models/{bundled.name}/activate", headers={"X-Admin-Token": TOKEN})
+        _wait_for_swap(client)
+    assert main.models.active.version == bundled
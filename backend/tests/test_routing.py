@@ -0,0 +1,123 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.routing import DepartmentRouter, RoutingRulesError, load_rules
+from tests.conftest import make_patients
+
+EMERGENCY_FLAGS = ["Severe Bleeding", "Trauma", "Sudden Collapse", "Loss of Consciousness"]
+SYMPTOM_DEPARTMENTS = [
+    ("Cardiology", ["Chest Pain", "Palpitations", "Shortness of Breath", "Swelling"]),
+    ("Neurology", ["Seizure", "Confusion", "Weakness", "Blurred Vision"]),
+    ("Pulmonology", ["Breathing Difficulty", "Wheezing", "Cough"]),
+    ("Gastroenterology", ["Abdominal Pain", "Nausea", "Vomiting", "Diarrhea", "Blood in Stool"]),
+]
+
+
+def reference_department(risk_level, symptoms, bp, hr):
+    """The hard-coded routing the rule table replaced."""
+    if risk_level == "High" or any(symptom in symptoms for symptom in EMERGENCY_FLAGS):
+        return "Emergency"
+    if bp > 180 or hr > 130:
+        return "Emergency"
+    for department, flags in SYMPTOM_DEPARTMENTS:
+        if any(symptom in symptoms for symptom in flags):
+            return department
+    return "General Medicine"
+
+
+@pytest.fixture(scope="module")
+def encoder(triage_model):
+    return triage_model.encoder
+
+
+@pytest.fixture(scope="module")
+def router(encoder):
+    return DepartmentRouter.load(encoder)
+
+
+def _route(router, encoder, patients, risk_levels):
+    return list(router.route(encoder.encode(patients), risk_levels))
+
+
+def _patient(symptoms=(), bp=120, hr=80):
+    return {
+        "age": 40, "gender": "Female", "blood_pressure": bp, "heart_rate": hr,
+        "temperature": 37.0, "symptoms": list(symptoms), "conditions": [],
+    }
+
+
+@pytest.mark.parametrize("risk_level, symptoms, bp, hr, expected", [
+    # Vital thresholds are strict: exactly 180 / 130 is not an emergency.
+    ("Low", [], 180, 80, "General Medicine"),
+    ("Low", [], 181, 80, "Emergency"),
+    ("Low", [], 120, 130, "General Medicine"),
+    ("Low", [], 120, 131, "Emergency"),
+    ("Medium", ["Cough"], 180, 130, "Pulmonology"),
+    # High risk wins over everything else.
+    ("High", ["Chest Pain"], 120, 80, "Emergency"),
+    # Emergency symptoms and vitals win over specialty symptoms.
+    ("Low", ["Chest Pain", "Trauma"], 120, 80, "Emergency"),
+    ("Low", ["Seizure"], 200, 80, "Emergency"),
+    # Specialty order: Cardiology, Neurology, Pulmonology, Gastroenterology.
+    ("Low", ["Nausea", "Cough", "Seizure", "Swelling"], 120, 80, "Cardiology"),
+    ("Low", ["Nausea", "Cough", "Confusion"], 120, 80, "Neurology"),
+    ("Medium", ["Diarrhea", "Wheezing"], 120, 80, "Pulmonology"),
+    ("Low", ["Blood in Stool", "Fever"], 120, 80, "Gastroenterology"),
+    # Labels are cleaned before routing; unknown ones never match.
+    ("Low", [" Palpitations "], 120, 80, "Cardiology"),
+    ("Low", ["Hiccups", "Fever"], 120, 80, "General Medicine"),
+])
+def test_rule_priority_and_thresholds(router, encoder, risk_level, symptoms, bp, hr, expected):
+    assert _route(router, encoder, [_patient(symptoms, bp, hr)], [risk_level]) == [expected]
+
+
+def test_matches_the_replaced_routing(router, encoder):
+    patients = make_patients(encoder, 5000, seed=7)
+    # Put a share of the vitals exactly on and next to the thresholds.
+    for i, patient in enumerate(patients[:600]):
+        patient["blood_pressure"] = (179, 180, 181)[i % 3]
+        patient["heart_rate"] = (129, 130, 131)[(i // 3) % 3]
+    rng = np.random.default_rng(7)
+    risk_levels = list(rng.choice(["Low", "Medium", "High"], size=len(patients)))
+
+    expected = [
+        reference_department(
+            risk, [symptom.strip() for symptom in patient["symptoms"]],
+            patient["blood_pressure"], patient["heart_rate"],
+        )
+        for risk, patient in zip(risk_levels, patients)
+    ]
+    assert _route(router, encoder, patients, risk_levels) == expected
+
+
+def test_rules_file_is_read_from_the_given_path(encoder, tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "default_department": "Triage Desk",
+        "rules": [{"department": "Fever Clinic", "symptoms": ["Fever"], "vitals": {"Temperature": {"ge": 39}}}],
+    }))
+    router = DepartmentRouter.load(encoder, path)
+    patients = [_patient(["Fever"]), {**_patient(), "temperature": 39.0}, _patient(["Cough"])]
+    assert _route(router, encoder, patients, ["Low"] * 3) == ["Fever Clinic", "Fever Clinic", "Triage Desk"]
+    assert load_rules(path)["default_department"] == "Triage Desk"
+
+
+@pytest.mark.parametrize("rules, message", [
+    ([], "'rules' list"),
+    ({"rules": {"department": "Emergency"}}, "'rules' list"),
+    ({"rules": [{"risk_levels": ["High"]}]}, "'department' is required"),
+    ({"rules": [{"department": "Emergency"}]}, "needs risk_levels, symptoms or vitals"),
+    ({"rules": [{"department": "Emergency", "risk_level": ["High"]}]}, "unknown keys"),
+    ({"rules": [{"department": "Emergency", "symptoms": "Trauma"}]}, "must be a list"),
+    ({"rules": [{"department": "Emergency", "symptoms": ["Traumaa"]}]}, "not in the model vocabulary"),
+    ({"rules": [{"department": "Emergency", "vitals": {"Pulse": {"gt": 130}}}]}, "unknown vital"),
+    ({"rules": [{"department": "Emergency", "vitals": {"Heart_Rate": {"above": 130}}}]}, "unknown operator"),
+    ({"rules": [{"department": "Emergency", "vitals": {"Heart_Rate": {"gt": "130"}}}]}, "must be a number"),
+    ({"rules": [{"department": "Emergency", "vitals": {"Heart_Rate": {"gt": True}}}]}, "must be a number"),
+    ({"rules": [{"department": "Emergency", "vitals": {"Heart_Rate": 130}}]}, "needs thresholds"),
+])
+def test_malformed_rules_are_rejected(encoder, rules, message):
+    with pytest.raises(RoutingRulesError, match=message):
+        DepartmentRouter(rules, encoder)
@@ -0,0 +1,96 @@
+"""
+Gateway -> AI backend client benchmark.
+
+Drives call_ai_predict-style requests at fixed intake rates against a
+local stub AI backend and compares the previous behaviour (a fresh
+httpx.AsyncClient, and TCP connection, per call) with the shared pooled
+client.
+
+Usage (from project/server/):
+    python -m benchmarks.bench_ai_client
+    python -m benchmarks.bench_ai_client --rates 10 50 200 --duration 5
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.stub_ai_server import BackgroundServer, create_stub_app
+from services import ai_service
+
+PAYLOAD = {
+    "age": 54,
+    "gender": "Male",
+    "blood_pressure": 150,
+    "heart_rate": 96,
+    "temperature": 37.4,
+    "symptoms": ["Chest Pain", "Shortness of Breath"],
+    "conditions": ["Hypertension"],
+}
+
+
+async def per_call_client(url):
+    async with httpx.AsyncClient(timeout=ai_service.AI_READ_TIMEOUT) as client:
+        response = await client.post(f"{url}/predict", json=PAYLOAD)
+        response.raise_for_status()
+        return response.json()
+
+
+async def pooled_client(url):
+    return await ai_service.call_ai_predict(PAYLOAD)
+
+
+async def open_loop(call, url, rate, duration):
+    """Send requests on a fixed schedule regardless of completions."""
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            await call(url)
+        except Exception:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    interval = 1.0 / rate
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        delay = start + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one()))
+    await asyncio.gather(*tasks)
+    return np.array(latencies), errors
+
+
+async def main(args):
+    with BackgroundServer(create_stub_app(args.latency_ms)) as server:
+        ai_service.AI_BACKEND_URLS[:] = [server.url]
+        ai_service._balancer = ai_service.BackendBalancer(ai_service.AI_BACKEND_URLS)
+        await ai_service.init_ai_client()
+
+        for rate in args.rates:
+            for label, call in (("per-call", per_call_client), ("pooled", pooled_client)):
+                latencies, errors = await open_loop(call, server.url, rate, args.duration)
+                latencies *= 1000
+                p50, p99 = np.percentile(latencies, [50, 99])
+                print(
+                    f"{label:<9} rate={rate:<5} mean={latencies.mean():8.2f} ms  "
+                    f"p50={p50:8.2f} ms  p99={p99:8.2f} ms  errors={errors}"
+                )
+
+        await ai_service.close_ai_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rates", type=int, nargs="+", default=[10, 25, 50, 100])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""
+Bytes and decode time per page of predictions: full documents vs projections.
+
+Builds realistic prediction documents (input_data copy, five-item
+explanation), applies each projection the way MongoDB would, and measures
+for a page of rows:
+  - BSON bytes on the wire (what the driver receives),
+  - BSON decode time (bson.decode_all, what the driver pays per page),
+  - JSON response bytes after ID stringification.
+
+Usage (from project/server/):
+    python -m benchmarks.bench_prediction_projections --page-size 100
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+
+from database.projections import prediction_projection
+from database.repositories import _stringify_prediction_ids
+
+SYMPTOMS = ["Chest Pain", "Shortness of Breath", "Fever", "Headache", "Dizziness", "Nausea"]
+CONDITIONS = ["Hypertension", "Diabetes", "Asthma", "Heart Disease"]
+
+
+def synthetic_prediction(rng: random.Random, created_at: datetime) -> dict:
+    symptoms = rng.sample(SYMPTOMS, rng.randint(1, 3))
+    conditions = rng.sample(CONDITIONS, rng.randint(0, 2))
+    return {
+        "_id": ObjectId(),
+        "patient_id": ObjectId(),
+        "risk_level": rng.choice(["Low", "Medium", "High", "Critical"]),
+        "recommended_department": rng.choice(["Cardiology", "Emergency", "General Medicine"]),
+        "confidence_score": round(rng.uniform(40, 99), 2),
+        "explanation": [
+            {"feature": name, "impact": round(rng.uniform(-0.3, 0.3), 4)}
+            for name in ["age", "heart_rate", "blood_pressure", "temperature", *symptoms][:5]
+        ],
+        "explanation_status": "complete",
+        "model_version": "1.0.0",
+        "input_data": {
+            "age": rng.randint(1, 95),
+            "gender": rng.choice(["Male", "Female"]),
+            "blood_pressure": rng.randint(90, 180),
+            "heart_rate": rng.randint(50, 130),
+            "temperature": round(rng.uniform(36.0, 40.0), 1),
+            "symptoms": symptoms,
+            "conditions": conditions,
+        },
+        "created_at": created_at,
+    }
+
+
+def project(document: dict, projection) -> dict:
+    if projection is None:
+        return dict(document)
+    return {key: value for key, value in document.items() if key in projection}
+
+
+def measure(documents, projection, repeats):
+    encoded = [bson.encode(project(doc, projection)) for doc in documents]
+    wire = b"".join(encoded)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        decoded = bson.decode_all(wire)
+    decode_ms = (time.perf_counter() - start) / repeats * 1000
+
+    for doc in decoded:
+        _stringify_prediction_ids(doc)
+    json_bytes = len(json.dumps(decoded, default=str))
+    return len(wire), decode_ms, json_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = datetime(2026, 1, 1)
+    documents = [synthetic_prediction(rng, now - timedelta(seconds=i)) for i in range(args.page_size)]
+
+    cases = [
+        ("full", prediction_projection()),
+        ("summary", prediction_projection(view="summary")),
+        ("fields=risk_level", prediction_projection(["risk_level"])),
+    ]
+
+    print(f"Per {args.page_size}-row page (decode averaged over {args.repeats} runs)")
+    baseline = None
+    for name, projection in cases:
+        bson_bytes, decode_ms, json_bytes = measure(documents, projection, args.repeats)
+        baseline = baseline or (bson_bytes, decode_ms)
+        print(
+            f"{name:<18} bson={bson_bytes:7d} B ({bson_bytes / baseline[0]:5.0%})  "
+            f"decode={decode_ms:7.3f} ms ({decode_ms / baseline[1]:5.0%})  json={json_bytes:7d} B"
+        )
+
+
+if __name__ == "__main__":
+    main()
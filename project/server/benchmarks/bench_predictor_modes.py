@@ -0,0 +1,84 @@
+"""
+End-to-end /triage latency: remote HTTP predictor vs local process pool.
+
+Boots the gateway in-process against an in-memory database. Remote mode
+starts the real AI backend (backend/app) with uvicorn on a local port;
+local mode loads backend/app/model_inference in the gateway's worker
+pool. Requests are sent one at a time so the numbers are per-request
+latency.
+
+Usage (from project/server/):
+    python -m benchmarks.bench_predictor_modes --requests 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_db import install_fake_db
+from benchmarks.stub_ai_server import BackgroundServer
+from services import ai_service
+
+TRIAGE_BODY = {
+    "age": 54,
+    "gender": "Male",
+    "symptoms": ["Chest Pain", "Shortness of Breath"],
+    "blood_pressure": "150/90",
+    "heart_rate": 96,
+    "temperature": 37.4,
+    "conditions": ["Hypertension"],
+}
+
+
+async def measure(app, requests, explain):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        body = {**TRIAGE_BODY, "explain": explain}
+        await client.post("/triage", json=body)  # warm-up
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.post("/triage", json=body)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def report(mode, explain, latencies):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{mode:<7} explain={explain:<6} mean={latencies.mean():8.2f} ms  p50={p50:8.2f} ms  p99={p99:8.2f} ms")
+
+
+async def run_mode(mode, predictor, args):
+    from main import app
+
+    ai_service.set_predictor(predictor)
+    await predictor.start()
+    install_fake_db()
+    try:
+        for explain in ("none", "top_k"):
+            report(mode, explain, await measure(app, args.requests, explain))
+    finally:
+        await predictor.close()
+
+
+async def main(args):
+    sys.path.insert(0, ai_service.AI_LOCAL_BACKEND_PATH)
+    from app.main import app as ai_app
+
+    with BackgroundServer(ai_app) as server:
+        ai_service.AI_BACKEND_URLS[:] = [server.url]
+        ai_service._balancer = ai_service.BackendBalancer(ai_service.AI_BACKEND_URLS)
+        await run_mode("remote", ai_service.RemotePredictor(), args)
+
+    await run_mode("local", ai_service.LocalPredictor(workers=args.workers), args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""
+In-memory stand-in for the Motor database used by the gateway benchmarks.
+
+Implements only the collection methods the triage write path needs, with
+the same call shapes as Motor (awaitable inserts/updates returning result
+objects).
+"""
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = {}
+
+    async def insert_one(self, document):
+        document.setdefault("_id", ObjectId())
+        self.documents[document["_id"]] = document
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def insert_many(self, documents, ordered=True):
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            self.documents[document["_id"]] = document
+        return SimpleNamespace(inserted_ids=[d["_id"] for d in documents])
+
+    async def find_one(self, query, projection=None):
+        if "_id" in query:
+            return self.documents.get(query["_id"])
+        for document in self.documents.values():
+            if all(document.get(k) == v for k, v in query.items()):
+                return document
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        document = await self.find_one(query)
+        if document is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+            document = {**query, **update.get("$setOnInsert", {})}
+            await self.insert_one(document)
+            upserted_id = document["_id"]
+        else:
+            upserted_id = None
+        document.update(update.get("$set", {}))
+        # Dotted $inc paths, as used by the statistics rollups.
+        for path, amount in update.get("$inc", {}).items():
+            *parents, leaf = path.split(".")
+            target = document
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = target.get(leaf, 0) + amount
+        matched = 0 if upserted_id is not None else 1
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_id=upserted_id)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        return self._collections.setdefault(name, FakeCollection())
+
+
+def install_fake_db() -> FakeDatabase:
+    """Point database.connection at a fresh in-memory database."""
+    from database import connection
+
+    connection.db = FakeDatabase()
+    return connection.db
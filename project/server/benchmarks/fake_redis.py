@@ -0,0 +1,35 @@
+"""
+In-memory stand-in for a redis.asyncio client.
+
+Implements the get/set(ex=)/delete calls used by database.cache, so the
+Redis cache backend can be exercised without a Redis server:
+
+    from database.cache import RedisCacheBackend, cache
+    cache.set_backend(RedisCacheBackend(FakeRedis()))
+"""
+import time
+
+
+class FakeRedis:
+    def __init__(self):
+        self._values = {}
+
+    async def get(self, key):
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def set(self, key, value, ex=None):
+        self._values[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    async def delete(self, *keys):
+        return sum(self._values.pop(key, None) is not None for key in keys)
+
+    async def aclose(self):
+        self._values.clear()
@@ -0,0 +1,354 @@
+"""
+Open-loop load test for the gateway and the AI backend.
+
+Each service runs in its own process:
+  gateway  project/server main:app against the in-memory database
+           (benchmarks.fake_db), or a local MongoDB with --mongo-uri
+  AI       the stub backend (benchmarks.stub_ai_server) with --stub-latency-ms
+           of artificial latency, or the real backend/app with --ai real
+
+Requests are sent at a fixed rate whether or not earlier ones have been
+answered (open loop), so an overloaded service shows up as growing latency
+instead of a quietly lower request rate. Latency is measured from each
+request's scheduled send time.
+
+Targets:
+  triage          POST /triage on the gateway
+  triage_predict  POST /api/triage/predict on the gateway
+  predict         POST /predict on the AI service directly
+
+Throughput, errors and p50/p95/p99/p99.9 latency for every target and rate
+are printed and written to --output as JSON. --compare prints the change
+against an earlier results file. The services inherit this process's
+environment, so their settings apply as usual (e.g. RESULT_CACHE_SIZE=0 to
+turn off the AI backend's result cache).
+
+Usage (from project/server/):
+    python -m benchmarks.loadtest --rates 50,100,200 --duration 20
+    python -m benchmarks.loadtest --ai real --targets predict,triage --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmarks.stub_ai_server import free_port
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = Path(os.getenv(
+    "AI_LOCAL_BACKEND_PATH", str(SERVER_DIR.parent.parent / "backend")
+))
+
+TARGETS = {
+    # name: (service, path)
+    "triage": ("gateway", "/triage"),
+    "triage_predict": ("gateway", "/api/triage/predict"),
+    "predict": ("ai", "/predict"),
+}
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99, "p99.9": 99.9}
+
+SYMPTOMS = [
+    "Chest Pain", "Shortness of Breath", "Palpitations", "Fever", "Cough",
+    "Headache", "Nausea", "Abdominal Pain", "Fatigue", "Confusion",
+    "Wheezing", "Sore Throat", "Vomiting", "Blurred Vision", "Chills",
+]
+CONDITIONS = ["Hypertension", "Diabetes", "Asthma", "Heart Disease", "COPD", "Obesity", "Smoking"]
+
+
+# ============================================
+# REQUEST BODIES
+# ============================================
+
+def synthetic_bodies(n: int, explain: str, seed: int = 0) -> list[dict]:
+    """Varied triage requests, so caches and request coalescing see realistic inputs."""
+    rng = random.Random(seed)
+    return [
+        {
+            "age": rng.randint(1, 95),
+            "gender": rng.choice(["Male", "Female"]),
+            "symptoms": rng.sample(SYMPTOMS, rng.randint(1, 4)),
+            "blood_pressure": f"{rng.randint(90, 200)}/{rng.randint(55, 110)}",
+            "heart_rate": rng.randint(45, 150),
+            "temperature": round(rng.uniform(35.5, 40.5), 1),
+            "conditions": rng.sample(CONDITIONS, rng.randint(0, 2)),
+            "explain": explain,
+        }
+        for _ in range(n)
+    ]
+
+
+def ai_payload(body: dict) -> dict:
+    """The same patient in the AI backend's PatientInput shape."""
+    payload = {key: value for key, value in body.items() if key != "explain"}
+    payload["blood_pressure"] = int(body["blood_pressure"].split("/")[0])
+    return payload
+
+
+# ============================================
+# SERVICES
+# ============================================
+
+def serve(kind: str, port: int, args) -> None:
+    """Entry point of the service subprocesses (--serve)."""
+    import uvicorn
+
+    if kind == "stub":
+        from benchmarks.stub_ai_server import create_stub_app
+
+        app = create_stub_app(latency_ms=args.stub_latency_ms)
+    else:
+        import main
+        from benchmarks.fake_db import install_fake_db
+
+        if not args.mongo_uri:
+            async def connect_fake_db():
+                install_fake_db()
+
+            main.connect_db = connect_fake_db
+        app = main.app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_service(command: list[str], cwd: Path, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(command, cwd=cwd, env={**os.environ, **env})
+
+
+async def wait_ready(url: str, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} was not ready after {timeout:.0f}s")
+
+
+def start_services(args) -> tuple[dict, dict, list[subprocess.Popen]]:
+    ai_port, gateway_port = free_port(), free_port()
+    ai_url = f"http://127.0.0.1:{ai_port}"
+    gateway_url = f"http://127.0.0.1:{gateway_port}"
+    serve_self = [sys.executable, "-m", "benchmarks.loadtest"]
+
+    if args.ai == "stub":
+        ai = start_service(
+            serve_self + ["--serve", "stub", "--port", str(ai_port),
+                          "--stub-latency-ms", str(args.stub_latency_ms)],
+            SERVER_DIR, {},
+        )
+        ai_ready = f"{ai_url}/openapi.json"
+    else:
+        ai = start_service(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--port", str(ai_port), "--log-level", "warning"],
+            BACKEND_DIR, {},
+        )
+        ai_ready = f"{ai_url}/health/ready"
+
+    gateway_env = {"AI_PREDICTOR": "remote", "AI_BACKEND_URLS": ai_url}
+    if args.mongo_uri:
+        gateway_env["MONGO_URI"] = args.mongo_uri
+    command = serve_self + ["--serve", "gateway", "--port", str(gateway_port)]
+    if args.mongo_uri:
+        command += ["--mongo-uri", args.mongo_uri]
+    gateway = start_service(command, SERVER_DIR, gateway_env)
+
+    urls = {"ai": ai_url, "gateway": gateway_url}
+    readiness = {"ai": ai_ready, "gateway": f"{gateway_url}/"}
+    return urls, readiness, [gateway, ai]
+
+
+# ============================================
+# LOAD GENERATION
+# ============================================
+
+async def open_loop(client: httpx.AsyncClient, url: str, bodies: list[dict],
+                    params: dict, rate: float, duration: float) -> dict:
+    """Send rate requests per second for duration seconds; latency counts from the scheduled time."""
+    loop = asyncio.get_running_loop()
+    total = max(1, int(rate * duration))
+    latencies, errors = [], {}
+
+    async def send(body, scheduled):
+        try:
+            response = await client.post(url, json=body, params=params)
+            outcome = None if response.is_success else f"HTTP {response.status_code}"
+        except httpx.HTTPError as exc:
+            outcome = type(exc).__name__
+        if outcome is None:
+            latencies.append(loop.time() - scheduled)
+        else:
+            errors[outcome] = errors.get(outcome, 0) + 1
+
+    start = loop.time()
+    tasks = []
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(bodies[i % len(bodies)], scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+
+    result = {
+        "sent": total,
+        "completed": len(latencies),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {},
+    }
+    if latencies:
+        latency_ms = np.array(latencies) * 1000
+        result["latency_ms"] = {
+            name: round(float(np.percentile(latency_ms, q)), 3) for name, q in PERCENTILES.items()
+        }
+        result["latency_ms"]["mean"] = round(float(latency_ms.mean()), 3)
+        result["latency_ms"]["max"] = round(float(latency_ms.max()), 3)
+    return result
+
+
+def print_result(result: dict) -> None:
+    latency = result["latency_ms"]
+    errors = sum(result["errors"].values())
+    line = (
+        f"{result['target']:<15} rate={result['rate']:>7.1f}/s  "
+        f"throughput={result['throughput_rps']:>8.1f}/s  errors={errors:<5}"
+    )
+    if latency:
+        line += "  " + "  ".join(f"{name}={latency[name]:8.2f}" for name in PERCENTILES) + " ms"
+    print(line)
+
+
+def compare(meta: dict, results: list[dict], baseline_path: str) -> None:
+    """Print throughput and latency changes against a previous run, matched by target and rate."""
+    with open(baseline_path) as handle:
+        previous = json.load(handle)
+    baseline = {(r["target"], r["rate"]): r for r in previous["results"]}
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+7.1f}%" if old else "    n/a"
+
+    print(f"\nCompared with {baseline_path}:")
+    differing = [
+        key for key in ("ai", "stub_latency_ms", "database", "explain", "cpu_count")
+        if previous["meta"].get(key) != meta.get(key)
+    ]
+    if differing:
+        print(f"(runs differ in {', '.join(differing)})")
+    for result in results:
+        old = baseline.get((result["target"], result["rate"]))
+        if old is None or not result["latency_ms"] or not old["latency_ms"]:
+            continue
+        print(
+            f"{result['target']:<15} rate={result['rate']:>7.1f}/s  "
+            f"throughput {change(result['throughput_rps'], old['throughput_rps'])}  "
+            + "  ".join(
+                f"{name} {change(result['latency_ms'][name], old['latency_ms'][name])}"
+                for name in ("p50", "p99", "p99.9")
+            )
+        )
+
+
+async def run(args) -> dict:
+    targets = [target.strip() for target in args.targets.split(",") if target.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        raise SystemExit(f"Unknown targets {sorted(unknown)}, expected some of {sorted(TARGETS)}")
+    rates = [float(rate) for rate in args.rates.split(",")]
+
+    urls, readiness, processes = start_services(args)
+    try:
+        for url in readiness.values():
+            await wait_ready(url)
+
+        bodies = synthetic_bodies(args.distinct, args.explain, seed=args.seed)
+        limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+        results = []
+        async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+            for target in targets:
+                service, path = TARGETS[target]
+                url = urls[service] + path
+                if service == "ai":
+                    # The gateway reads explain from the body, the AI service from the query.
+                    target_bodies = [ai_payload(body) for body in bodies]
+                    params = {"explain": "none" if args.explain == "deferred" else args.explain}
+                else:
+                    target_bodies, params = bodies, {}
+                if args.warmup:
+                    await open_loop(client, url, target_bodies, params, rates[0], args.warmup)
+                for rate in rates:
+                    result = {"target": target, "rate": rate,
+                              **await open_loop(client, url, target_bodies, params, rate, args.duration)}
+                    print_result(result)
+                    results.append(result)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "ai": args.ai,
+            "stub_latency_ms": args.stub_latency_ms if args.ai == "stub" else None,
+            "database": "mongodb" if args.mongo_uri else "in-memory",
+            "explain": args.explain,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "distinct_patients": args.distinct,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default="triage,triage_predict,predict")
+    parser.add_argument("--rates", default="25,50,100", help="comma-separated requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per rate")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds at the first rate before measuring")
+    parser.add_argument("--ai", choices=["stub", "real"], default="stub")
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0)
+    parser.add_argument("--mongo-uri", default=None, help="use this MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--explain", choices=["none", "top_k", "deferred"], default="none")
+    parser.add_argument("--distinct", type=int, default=1000, help="distinct patients cycled through")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--output", default="loadtest_results.json")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    parser.add_argument("--serve", choices=["gateway", "stub"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args)
+        return
+
+    report = asyncio.run(run(args))
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(report["meta"], report["results"], args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Minimal stand-in for the AI backend used by the gateway benchmarks.
+
+Serves POST /predict (and /predict/batch) with a canned prediction after
+an optional artificial delay, so gateway overhead can be measured
+without loading the model.
+"""
+import asyncio
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI
+
+CANNED_PREDICTION = {
+    "risk_level": "Medium",
+    "confidence": 72.5,
+    "recommended_department": "Cardiology",
+    "explanation": [
+        {"feature": "Chest Pain", "impact": 0.21},
+        {"feature": "Heart_Rate", "impact": 0.12},
+    ],
+    "model_version": "stub",
+}
+
+
+def create_stub_app(latency_ms: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    delay = latency_ms / 1000.0
+
+    @app.post("/predict")
+    async def predict(patient: dict, explain: str = "top_k"):
+        if delay:
+            await asyncio.sleep(delay)
+        return CANNED_PREDICTION if explain != "none" else {**CANNED_PREDICTION, "explanation": []}
+
+    @app.post("/predict/batch")
+    async def predict_batch(patients: list[dict], explain: str = "top_k"):
+        if delay:
+            await asyncio.sleep(delay)
+        return [CANNED_PREDICTION for _ in patients]
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Run an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app, port: int | None = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
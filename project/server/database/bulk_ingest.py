@@ -0,0 +1,73 @@
+"""
+Bulk import historical triage records from NDJSON or CSV.
+
+Records are streamed from disk, optionally scored through the AI backend's
+batch endpoint, and written with unordered insert_many in chunks. A
+throughput report is printed at the end.
+
+NDJSON: one object per line with patient fields (age, gender,
+blood_pressure "120/80", heart_rate, temperature, symptoms, conditions,
+notes, created_at) and optionally a stored prediction (risk_level,
+recommended_department, confidence_score, explanation, model_version).
+CSV: the same columns; symptoms/conditions are ';'-separated.
+
+Usage:
+    python -m database.bulk_ingest encounters.ndjson
+    python -m database.bulk_ingest encounters.csv --score --chunk-size 2000
+"""
+import argparse
+import asyncio
+
+
+def _detect_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+async def run_ingest(args) -> None:
+    from database.connection import connect_db, close_db
+    from services.ai_service import init_ai_client, close_ai_client
+    from services.ingest_service import IngestAborted, ingest_records, iter_file_lines, parse_records
+
+    fmt = args.format or _detect_format(args.path)
+    await connect_db()
+    if args.score:
+        await init_ai_client()
+
+    print(f"🚀 Ingesting {args.path} ({fmt}, chunk size {args.chunk_size})...")
+    try:
+        report = await ingest_records(
+            parse_records(iter_file_lines(args.path), fmt),
+            chunk_size=args.chunk_size,
+            score=args.score,
+            explain=args.explain,
+        )
+        print("✅ Ingest complete")
+    except IngestAborted as exc:
+        report = exc.report
+        print(f"❌ Ingest stopped: {report.error}")
+        print(f"   Everything up to record {report.last_committed_record} is stored; resume after it.")
+    finally:
+        if args.score:
+            await close_ai_client()
+        await close_db()
+
+    for field, value in report.model_dump().items():
+        print(f"   {field:<22} {value}")
+    if report.error:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from services.ingest_service import INGEST_CHUNK_SIZE
+
+    parser = argparse.ArgumentParser(description="Bulk import historical triage records.")
+    parser.add_argument("path", help="NDJSON or CSV file")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument("--score", action="store_true", help="Score records without a stored prediction")
+    parser.add_argument("--explain", choices=["none", "top_k"], default="none")
+
+    asyncio.run(run_ingest(parser.parse_args()))
@@ -0,0 +1,248 @@
+"""
+Read-through cache for single-document repository lookups.
+
+Point lookups (patient, prediction and user by ID, user by email) are
+served from a cache before falling back to MongoDB. Repository write
+methods invalidate the affected keys. Only found documents are cached.
+
+Backends:
+  - memory (default): per-process TTL + LRU cache
+  - redis: any redis.asyncio-compatible client, shared across processes
+  - none: caching disabled
+
+Values are stored BSON-encoded, so callers always get a private copy they
+may mutate, and the same encoding works for both backends.
+"""
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from typing import Awaitable, Callable, Optional
+
+import bson
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "triage:")
+
+
+class MemoryCacheBackend:
+    """In-process cache with a per-entry TTL and least-recently-used eviction."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Cache stored in Redis. `client` is any object with the redis.asyncio
+    get/set(ex=)/delete API, so a local stand-in can be used in tests.
+    """
+
+    name = "redis"
+
+    def __init__(self, client=None, ttl: float = CACHE_TTL_SECONDS, prefix: str = CACHE_KEY_PREFIX):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(CACHE_REDIS_URL)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl)))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+
+def create_backend(name: str = CACHE_BACKEND):
+    if name == "none":
+        return None
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "redis":
+        return RedisCacheBackend()
+    raise ValueError(f"Unknown CACHE_BACKEND '{name}', expected memory, redis or none")
+
+
+class ReadThroughCache:
+    """Wraps a backend with read-through loading, invalidation and hit/miss counters."""
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._configured = backend is not None
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.invalidations = defaultdict(int)
+        self.errors = 0
+        # Bumped on every invalidation; a load that overlaps one is not cached
+        # because it may have read the document before the write.
+        self._invalidation_seq = 0
+
+    @property
+    def backend(self):
+        if not self._configured:
+            self._backend = create_backend()
+            self._configured = True
+        return self._backend
+
+    def set_backend(self, backend) -> None:
+        """Replace the backend (None disables caching) and reset counters."""
+        self._backend = backend
+        self._configured = True
+        self.hits.clear()
+        self.misses.clear()
+        self.invalidations.clear()
+        self.errors = 0
+
+    @staticmethod
+    def _namespace(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Cached document for key, or None. Backend errors count as misses."""
+        backend = self.backend
+        if backend is None:
+            return None
+        try:
+            value = await backend.get(key)
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("Cache get failed for %s: %s", key, exc)
+            return None
+        namespace = self._namespace(key)
+        if value is None:
+            self.misses[namespace] += 1
+            return None
+        self.hits[namespace] += 1
+        return bson.decode(value)
+
+    @property
+    def invalidation_seq(self) -> int:
+        return self._invalidation_seq
+
+    async def set(self, key: str, document: dict, loaded_at_seq: Optional[int] = None) -> None:
+        """Cache a document; with loaded_at_seq, skip it if an invalidation happened since."""
+        backend = self.backend
+        if backend is None:
+            return
+        if loaded_at_seq is not None and loaded_at_seq != self._invalidation_seq:
+            return
+        try:
+            await backend.set(key, bson.encode(document))
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("Cache set failed for %s: %s", key, exc)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """Return the cached document, or load it, cache it if found, and return it."""
+        document = await self.get(key)
+        if document is not None:
+            return document
+        seq = self._invalidation_seq
+        document = await loader()
+        if document is not None:
+            await self.set(key, document, loaded_at_seq=seq)
+        return document
+
+    async def invalidate(self, *keys: str) -> None:
+        backend = self.backend
+        if backend is None or not keys:
+            return
+        self._invalidation_seq += 1
+        try:
+            await backend.delete(*keys)
+            for key in keys:
+                self.invalidations[self._namespace(key)] += 1
+        except Exception as exc:
+            self.errors += 1
+            logger.error("Cache invalidation failed for %s: %s", keys, exc)
+
+    async def close(self) -> None:
+        if self._backend is not None:
+            await self._backend.close()
+
+    def stats(self) -> dict:
+        backend = self._backend if self._configured else None
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        namespaces = sorted(set(self.hits) | set(self.misses) | set(self.invalidations))
+        return {
+            "backend": backend.name if backend is not None else "none",
+            "entries": len(backend) if isinstance(backend, MemoryCacheBackend) else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "errors": self.errors,
+            "by_namespace": {
+                namespace: {
+                    "hits": self.hits[namespace],
+                    "misses": self.misses[namespace],
+                    "invalidations": self.invalidations[namespace],
+                }
+                for namespace in namespaces
+            },
+        }
+
+
+def patient_key(patient_id: str) -> str:
+    return f"patient:{patient_id}"
+
+
+def prediction_key(prediction_id: str) -> str:
+    return f"prediction:{prediction_id}"
+
+
+def user_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def user_email_key(email: str) -> str:
+    return f"user_email:{email}"
+
+
+cache = ReadThroughCache()
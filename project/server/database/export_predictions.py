@@ -0,0 +1,62 @@
+"""
+Export predictions joined with their patients to NDJSON or Arrow IPC.
+
+Rows are streamed from an aggregation cursor and written batch by batch,
+so memory stays flat regardless of how many records are exported.
+
+Usage:
+    python -m database.export_predictions predictions.ndjson
+    python -m database.export_predictions predictions.arrows --format arrow \\
+        --start 2026-01-01 --end 2026-04-01 --risk-level High --risk-level Critical
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+
+def _detect_format(path: str) -> str:
+    return "arrow" if path.lower().endswith((".arrow", ".arrows")) else "ndjson"
+
+
+async def run_export(args) -> None:
+    from database.connection import connect_db, close_db
+    from services.export_service import export_predictions
+
+    fmt = args.format or _detect_format(args.path)
+    await connect_db()
+    start = time.perf_counter()
+    written = 0
+    try:
+        chunks = export_predictions(fmt, args.start, args.end, args.risk_level, args.batch_size)
+        output = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+        try:
+            async for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+    finally:
+        await close_db()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Exported {written / 1e6:.1f} MB ({fmt}) in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from services.export_service import EXPORT_BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description="Export predictions joined with patients.")
+    parser.add_argument("path", help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=["ndjson", "arrow"], help="Defaults to the file extension")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Created at or after (ISO date)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Created before (ISO date)")
+    parser.add_argument("--risk-level", action="append", help="Repeat to include several levels")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+
+    asyncio.run(run_export(parser.parse_args()))
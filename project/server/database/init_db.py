@@ -24,6 +24,7 @@ async def create_indexes():
     
     # PATIENTS INDEXES
     await db.patients.create_index([("created_at", -1)])
+    await db.patients.create_index([("created_at", -1), ("_id", -1)])
     await db.patients.create_index([("age", 1)])
     await db.patients.create_index([("gender", 1)])
     print("✅ Patient indexes created")
@@ -35,14 +36,26 @@ async def create_indexes():
     await db.predictions.create_index([("recommended_department", 1)])
     await db.predictions.create_index([("confidence_score", -1)])
     await db.predictions.create_index([("patient_id", 1), ("created_at", -1)])
+    # Keyset pagination: (created_at, _id) order, optionally within a filter
+    await db.predictions.create_index([("created_at", -1), ("_id", -1)])
+    await db.predictions.create_index([("patient_id", 1), ("created_at", -1), ("_id", -1)])
+    await db.predictions.create_index([("risk_level", 1), ("created_at", -1), ("_id", -1)])
     print("✅ Prediction indexes created")
     
     # USERS INDEXES
     await db.users.create_index([("email", 1)], unique=True)
     await db.users.create_index([("role", 1)])
     await db.users.create_index([("is_active", 1)])
+    await db.users.create_index([("created_at", -1), ("_id", -1)])
     print("✅ User indexes created")
     
+    # IDEMPOTENCY KEYS: expire stored responses after IDEMPOTENCY_TTL_SECONDS
+    await db.idempotency_keys.create_index(
+        [("created_at", 1)],
+        expireAfterSeconds=int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")),
+    )
+    print("✅ Idempotency key indexes created")
+    
     client.close()
 
 
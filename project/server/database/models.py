@@ -5,6 +5,7 @@ These define the structure and validation for database collections.
 from datetime import datetime
 from typing import Optional, List, Dict
 from pydantic import BaseModel, Field, EmailStr
+from pydantic_core import core_schema
 from bson import ObjectId
 
 
@@ -12,8 +13,11 @@ class PyObjectId(ObjectId):
     """Custom type for MongoDB ObjectId serialization."""
     
     @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        return core_schema.no_info_plain_validator_function(
+            cls.validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(str),
+        )
 
     @classmethod
     def validate(cls, v):
@@ -22,8 +26,8 @@ class PyObjectId(ObjectId):
         return ObjectId(v)
 
     @classmethod
-    def __modify_schema__(cls, field_schema):
-        field_schema.update(type="string")
+    def __get_pydantic_json_schema__(cls, schema, handler):
+        return {"type": "string"}
 
 
 class PatientDocument(BaseModel):
@@ -63,6 +67,7 @@ class PredictionDocument(BaseModel):
     recommended_department: str
     confidence_score: float = Field(..., ge=0.0, le=100.0)
     explanation: List[FeatureExplanationDocument] = Field(default_factory=list)
+    explanation_status: Optional[str] = Field(default=None, pattern="^(none|pending|complete|failed)$")
     model_version: Optional[str] = "1.0.0"
     input_data: Dict = Field(default_factory=dict)
     created_at: datetime = Field(default_factory=datetime.utcnow)
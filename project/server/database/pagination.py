@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are ordered by (created_at, _id) descending. The cursor handed to
+clients is an opaque base64 token holding the sort key of the last row on
+the page; the next page starts strictly after it, so MongoDB seeks
+straight to it through the (created_at, _id) index instead of skipping
+every earlier document.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+KEYSET_SORT = [("created_at", -1), ("_id", -1)]
+# Largest page a list endpoint returns.
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(document: dict) -> str:
+    payload = {"t": document["created_at"].isoformat(), "id": str(document["_id"])}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId) as exc:
+        raise InvalidCursorError("Invalid pagination cursor") from exc
+
+
+def keyset_query(query: dict, cursor: Optional[str]) -> dict:
+    """Restrict query to documents that sort after the cursor."""
+    if not cursor:
+        return query
+    created_at, last_id = decode_cursor(cursor)
+    after_cursor = {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]
+    }
+    return {"$and": [query, after_cursor]} if query else after_cursor
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[dict] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fetch one page in (created_at, _id) descending order.
+
+    Returns:
+        Tuple of (documents, next_cursor); next_cursor is None on the last page.
+
+    Raises:
+        ValueError: if limit is not between 1 and MAX_PAGE_SIZE.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    find_cursor = collection.find(keyset_query(query, cursor), projection)
+    # One extra row tells us whether another page exists.
+    documents = await find_cursor.sort(KEYSET_SORT).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1])
+    return documents, next_cursor
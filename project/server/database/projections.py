@@ -0,0 +1,76 @@
+"""
+Field projections for prediction listings.
+
+List views rarely need the nested input_data copy or the full explanation
+array. Projections are pushed down to MongoDB so unneeded fields are never
+sent over the wire or decoded. _id and created_at are always included
+because the pagination cursor is built from them.
+"""
+from typing import Iterable, Optional
+
+PREDICTION_FIELDS = (
+    "patient_id",
+    "risk_level",
+    "recommended_department",
+    "confidence_score",
+    "explanation",
+    "explanation_status",
+    "model_version",
+    "input_data",
+    "created_at",
+    "reviewed_by",
+    "review_notes",
+)
+
+# Compact view for list screens: what a row in a table shows.
+PREDICTION_SUMMARY_FIELDS = (
+    "patient_id",
+    "risk_level",
+    "recommended_department",
+    "confidence_score",
+)
+
+PREDICTION_VIEWS = ("full", "summary")
+
+# Fields the pagination cursor depends on.
+CURSOR_FIELDS = ("_id", "created_at")
+
+
+class InvalidProjectionError(ValueError):
+    """Raised when a requested field or view is not allowed."""
+
+
+def parse_fields(fields: Optional[str]) -> Optional[list]:
+    """Split a comma-separated fields parameter into a list (None if empty)."""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return names or None
+
+
+def prediction_projection(fields: Optional[Iterable[str]] = None, view: str = "full") -> Optional[dict]:
+    """
+    Build a MongoDB projection for prediction queries.
+
+    Args:
+        fields: Explicit field names; takes precedence over view
+        view: "full" (whole document) or "summary" (PREDICTION_SUMMARY_FIELDS)
+
+    Returns:
+        Projection dict, or None to return whole documents
+    """
+    if view not in PREDICTION_VIEWS:
+        raise InvalidProjectionError(f"Unknown view '{view}', expected one of {PREDICTION_VIEWS}")
+
+    if fields is None:
+        if view == "full":
+            return None
+        fields = PREDICTION_SUMMARY_FIELDS
+
+    unknown = sorted(set(fields) - set(PREDICTION_FIELDS) - set(CURSOR_FIELDS))
+    if unknown:
+        raise InvalidProjectionError(f"Unknown prediction fields: {', '.join(unknown)}")
+
+    projection = {name: 1 for name in CURSOR_FIELDS}
+    projection.update({name: 1 for name in fields})
+    return projection
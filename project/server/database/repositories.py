@@ -2,11 +2,34 @@
 Database repository layer for CRUD operations.
 Handles all MongoDB interactions for the Smart Patient Triage System.
 """
-from datetime import datetime
-from typing import Optional, List, Dict
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Tuple
 from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from database.connection import get_db
+from database.write_behind import write_behind
+from database.pagination import fetch_page
+from database.projections import prediction_projection
+from database.rollups import record_stored_predictions
+from database.cache import cache, patient_key, prediction_key, user_email_key, user_key
 from database.models import PatientDocument, PredictionDocument, UserDocument
+from services.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# "sync": the patient and prediction are written (concurrently) before the
+# triage response is returned. "async_batched": they are queued and
+# flushed to MongoDB in batches by the write-behind queue.
+PERSISTENCE_MODE = os.getenv("PERSISTENCE_MODE", "sync").lower()
+
+# How long an in-progress Idempotency-Key claim is held before a retry may
+# take it over; longer than any request should take.
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+# Insert attempts when a conflicting claim disappears before it can be read.
+IDEMPOTENCY_CLAIM_ATTEMPTS = 3
 
 
 class PatientRepository:
@@ -32,24 +55,26 @@ class PatientRepository:
     
     @staticmethod
     async def find_by_id(patient_id: str) -> Optional[dict]:
-        """Find patient by ID."""
-        db = get_db()
-        patient = await db.patients.find_one({"_id": ObjectId(patient_id)})
-        if patient:
-            patient["_id"] = str(patient["_id"])
-        return patient
+        """Find patient by ID (read-through cached)."""
+        async def load():
+            db = get_db()
+            patient = await db.patients.find_one({"_id": ObjectId(patient_id)})
+            if patient:
+                patient["_id"] = str(patient["_id"])
+            return patient
+        
+        return await cache.get_or_load(patient_key(patient_id), load)
     
     @staticmethod
-    async def find_all(limit: int = 100, skip: int = 0) -> List[dict]:
-        """Get all patients with pagination."""
+    async def find_all(limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Get all patients, newest first, with cursor pagination."""
         db = get_db()
-        cursor = db.patients.find().sort("created_at", -1).skip(skip).limit(limit)
-        patients = await cursor.to_list(length=limit)
+        patients, next_cursor = await fetch_page(db.patients, {}, limit, cursor)
         
         for patient in patients:
             patient["_id"] = str(patient["_id"])
         
-        return patients
+        return patients, next_cursor
     
     @staticmethod
     async def update(patient_id: str, update_data: dict) -> bool:
@@ -61,6 +86,7 @@ class PatientRepository:
             {"_id": ObjectId(patient_id)},
             {"$set": update_data}
         )
+        await cache.invalidate(patient_key(patient_id))
         return result.modified_count > 0
     
     @staticmethod
@@ -68,9 +94,17 @@ class PatientRepository:
         """Delete patient by ID."""
         db = get_db()
         result = await db.patients.delete_one({"_id": ObjectId(patient_id)})
+        await cache.invalidate(patient_key(patient_id))
         return result.deleted_count > 0
 
 
+def _stringify_prediction_ids(prediction: dict) -> None:
+    """Convert ObjectId fields to strings in place; projected-out fields are skipped."""
+    prediction["_id"] = str(prediction["_id"])
+    if "patient_id" in prediction:
+        prediction["patient_id"] = str(prediction["patient_id"])
+
+
 class PredictionRepository:
     """Repository for prediction data operations."""
     
@@ -93,62 +127,100 @@ class PredictionRepository:
             prediction_data["patient_id"] = ObjectId(prediction_data["patient_id"])
         
         result = await db.predictions.insert_one(prediction_data)
+        await record_stored_predictions([prediction_data])
         return str(result.inserted_id)
     
     @staticmethod
     async def find_by_id(prediction_id: str) -> Optional[dict]:
-        """Find prediction by ID."""
-        db = get_db()
-        prediction = await db.predictions.find_one({"_id": ObjectId(prediction_id)})
-        if prediction:
-            prediction["_id"] = str(prediction["_id"])
-            prediction["patient_id"] = str(prediction["patient_id"])
-        return prediction
+        """Find prediction by ID (read-through cached)."""
+        async def load():
+            db = get_db()
+            prediction = await db.predictions.find_one({"_id": ObjectId(prediction_id)})
+            if prediction:
+                prediction["_id"] = str(prediction["_id"])
+                prediction["patient_id"] = str(prediction["patient_id"])
+            return prediction
+        
+        return await cache.get_or_load(prediction_key(prediction_id), load)
     
     @staticmethod
-    async def find_by_patient_id(patient_id: str, limit: int = 50) -> List[dict]:
-        """Get all predictions for a specific patient."""
+    async def find_by_patient_id(
+        patient_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        view: str = "full",
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get all predictions for a specific patient, newest first, with cursor pagination."""
         db = get_db()
-        cursor = db.predictions.find(
-            {"patient_id": ObjectId(patient_id)}
-        ).sort("created_at", -1).limit(limit)
-        
-        predictions = await cursor.to_list(length=limit)
+        predictions, next_cursor = await fetch_page(
+            db.predictions, {"patient_id": ObjectId(patient_id)}, limit, cursor,
+            projection=prediction_projection(fields, view),
+        )
         
         for pred in predictions:
-            pred["_id"] = str(pred["_id"])
-            pred["patient_id"] = str(pred["patient_id"])
+            _stringify_prediction_ids(pred)
         
-        return predictions
+        return predictions, next_cursor
     
     @staticmethod
-    async def find_all(limit: int = 100, skip: int = 0) -> List[dict]:
-        """Get all predictions with pagination."""
+    async def find_all(
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        view: str = "full",
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Get all predictions, newest first, with cursor pagination.
+
+        fields / view restrict the returned fields (see database.projections).
+        """
         db = get_db()
-        cursor = db.predictions.find().sort("created_at", -1).skip(skip).limit(limit)
-        predictions = await cursor.to_list(length=limit)
+        predictions, next_cursor = await fetch_page(
+            db.predictions, {}, limit, cursor,
+            projection=prediction_projection(fields, view),
+        )
         
         for pred in predictions:
-            pred["_id"] = str(pred["_id"])
-            pred["patient_id"] = str(pred["patient_id"])
+            _stringify_prediction_ids(pred)
         
-        return predictions
+        return predictions, next_cursor
     
     @staticmethod
-    async def find_by_risk_level(risk_level: str, limit: int = 100) -> List[dict]:
-        """Find predictions by risk level."""
+    async def find_by_risk_level(
+        risk_level: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        view: str = "full",
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Find predictions by risk level, newest first, with cursor pagination."""
         db = get_db()
-        cursor = db.predictions.find(
-            {"risk_level": risk_level}
-        ).sort("created_at", -1).limit(limit)
-        
-        predictions = await cursor.to_list(length=limit)
+        predictions, next_cursor = await fetch_page(
+            db.predictions, {"risk_level": risk_level}, limit, cursor,
+            projection=prediction_projection(fields, view),
+        )
         
         for pred in predictions:
-            pred["_id"] = str(pred["_id"])
-            pred["patient_id"] = str(pred["patient_id"])
+            _stringify_prediction_ids(pred)
         
-        return predictions
+        return predictions, next_cursor
+    
+    @staticmethod
+    async def update_explanation(prediction_id: str, explanation: List[dict], status: str = "complete") -> bool:
+        """Attach a (deferred) explanation to an existing prediction."""
+        db = get_db()
+        result = await db.predictions.update_one(
+            {"_id": ObjectId(prediction_id)},
+            {
+                "$set": {
+                    "explanation": explanation,
+                    "explanation_status": status
+                }
+            }
+        )
+        await cache.invalidate(prediction_key(prediction_id))
+        return result.modified_count > 0
     
     @staticmethod
     async def update_review(prediction_id: str, reviewer_id: str, notes: str) -> bool:
@@ -163,9 +235,117 @@ class PredictionRepository:
                 }
             }
         )
+        await cache.invalidate(prediction_key(prediction_id))
         return result.modified_count > 0
 
 
+async def _insert_many_unordered(collection, documents: List[dict]) -> Tuple[List[dict], int]:
+    """Insert documents without stopping at the first failure; returns (inserted documents, failed)."""
+    if not documents:
+        return [], 0
+    try:
+        await collection.insert_many(documents, ordered=False)
+        return documents, 0
+    except BulkWriteError as exc:
+        failed_indexes = {error["index"] for error in exc.details.get("writeErrors", [])}
+        logger.warning("Bulk insert into %s had %s write errors", collection.name, len(failed_indexes))
+        inserted = [doc for i, doc in enumerate(documents) if i not in failed_indexes]
+        return inserted, len(failed_indexes)
+
+
+class TriageRecordRepository:
+    """Repository for writing a patient together with its prediction."""
+    
+    @staticmethod
+    async def create(patient_data: dict, prediction_data: dict) -> Tuple[str, str]:
+        """
+        Insert a patient and its prediction in a single round trip.
+        
+        IDs are generated client-side so both inserts can be issued at once
+        (or queued, in async_batched mode) without waiting for the patient
+        insert to return its ID.
+        
+        Args:
+            patient_data: Dictionary containing patient information
+            prediction_data: Dictionary containing prediction information
+            
+        Returns:
+            Tuple[str, str]: (patient ID, prediction ID)
+        """
+        now = datetime.utcnow()
+        patient_id = ObjectId()
+        prediction_id = ObjectId()
+        
+        patient_data.update({"_id": patient_id, "created_at": now, "updated_at": now})
+        prediction_data.update({"_id": prediction_id, "patient_id": patient_id, "created_at": now})
+        
+        if PERSISTENCE_MODE == "async_batched":
+            await write_behind.enqueue(patient_data, prediction_data)
+        else:
+            await TriageRecordRepository._insert_pair(patient_data, prediction_data)
+        
+        return str(patient_id), str(prediction_id)
+    
+    @staticmethod
+    async def _insert_pair(patient_data: dict, prediction_data: dict) -> None:
+        """
+        Write a patient and its prediction as two concurrent inserts.
+        
+        They live in separate collections and MongoDB has no single write
+        that spans two collections. A multi-document transaction would make
+        the pair atomic, but it needs a replica set (the standalone servers
+        used in development reject it) and costs extra round trips on every
+        triage request. Instead, if either insert fails the other one is
+        deleted again; if that delete also fails, the leftover document is
+        logged so it can be removed by hand.
+        """
+        db = get_db()
+        results = await asyncio.gather(
+            timed("mongo_insert_patient", db.patients.insert_one(patient_data)),
+            timed("mongo_insert_prediction", db.predictions.insert_one(prediction_data)),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        if not errors:
+            await record_stored_predictions([prediction_data])
+            return
+        
+        for collection, document, result in (
+            (db.patients, patient_data, results[0]),
+            (db.predictions, prediction_data, results[1]),
+        ):
+            if isinstance(result, Exception):
+                continue
+            try:
+                await collection.delete_one({"_id": document["_id"]})
+            except Exception as exc:
+                logger.error(
+                    "Could not roll back %s %s after a failed triage write: %s",
+                    collection.name, document["_id"], exc,
+                )
+        raise errors[0]
+    
+    @staticmethod
+    async def insert_many(patient_docs: List[dict], prediction_docs: List[dict]) -> Tuple[int, int, int]:
+        """
+        Bulk insert pre-built patient and prediction documents (with their
+        _id and created_at already set) using unordered insert_many.
+        
+        Returns:
+            Tuple[int, int, int]: (patients inserted, predictions inserted, write errors)
+        """
+        db = get_db()
+        patients_inserted, patients_failed = await _insert_many_unordered(db.patients, patient_docs)
+        predictions_inserted, predictions_failed = await _insert_many_unordered(db.predictions, prediction_docs)
+        await record_stored_predictions(predictions_inserted)
+        return len(patients_inserted), len(predictions_inserted), patients_failed + predictions_failed
+    
+    @staticmethod
+    async def wait_persisted(prediction_id: str) -> None:
+        """Wait until a write-behind prediction is in MongoDB (no-op in sync mode)."""
+        await write_behind.wait_persisted(prediction_id)
+
+
 class UserRepository:
     """Repository for user data operations."""
     
@@ -181,33 +361,51 @@ class UserRepository:
     
     @staticmethod
     async def find_by_id(user_id: str) -> Optional[dict]:
-        """Find user by ID."""
-        db = get_db()
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
-        if user:
-            user["_id"] = str(user["_id"])
-        return user
+        """Find user by ID (read-through cached)."""
+        async def load():
+            db = get_db()
+            user = await db.users.find_one({"_id": ObjectId(user_id)})
+            if user:
+                user["_id"] = str(user["_id"])
+            return user
+        
+        return await cache.get_or_load(user_key(user_id), load)
     
     @staticmethod
     async def find_by_email(email: str) -> Optional[dict]:
-        """Find user by email address."""
+        """
+        Find user by email address (read-through cached).
+        
+        The email key only maps to the user ID; the user itself is cached
+        once under its ID key, so invalidating by ID covers both lookups.
+        """
+        mapping = await cache.get(user_email_key(email))
+        if mapping is not None:
+            user = await UserRepository.find_by_id(mapping["user_id"])
+            # The mapping is stale if the user was deleted or changed email.
+            if user is not None and user.get("email") == email:
+                return user
+            await cache.invalidate(user_email_key(email))
+        
+        seq = cache.invalidation_seq
         db = get_db()
         user = await db.users.find_one({"email": email})
         if user:
             user["_id"] = str(user["_id"])
+            await cache.set(user_key(user["_id"]), user, loaded_at_seq=seq)
+            await cache.set(user_email_key(email), {"user_id": user["_id"]}, loaded_at_seq=seq)
         return user
     
     @staticmethod
-    async def find_all(limit: int = 100, skip: int = 0) -> List[dict]:
-        """Get all users with pagination."""
+    async def find_all(limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Get all users, newest first, with cursor pagination."""
         db = get_db()
-        cursor = db.users.find().sort("created_at", -1).skip(skip).limit(limit)
-        users = await cursor.to_list(length=limit)
+        users, next_cursor = await fetch_page(db.users, {}, limit, cursor)
         
         for user in users:
             user["_id"] = str(user["_id"])
         
-        return users
+        return users, next_cursor
     
     @staticmethod
     async def update_last_login(user_id: str) -> bool:
@@ -217,6 +415,7 @@ class UserRepository:
             {"_id": ObjectId(user_id)},
             {"$set": {"last_login": datetime.utcnow()}}
         )
+        await cache.invalidate(user_key(user_id))
         return result.modified_count > 0
     
     @staticmethod
@@ -227,6 +426,7 @@ class UserRepository:
             {"_id": ObjectId(user_id)},
             {"$set": update_data}
         )
+        await cache.invalidate(user_key(user_id))
         return result.modified_count > 0
     
     @staticmethod
@@ -234,4 +434,85 @@ class UserRepository:
         """Delete user by ID."""
         db = get_db()
         result = await db.users.delete_one({"_id": ObjectId(user_id)})
+        await cache.invalidate(user_key(user_id))
         return result.deleted_count > 0
+
+
+class IdempotencyRepository:
+    """
+    Records of requests sent with an Idempotency-Key header.
+    
+    A key is claimed before the request is processed and completed with the
+    response afterwards; a TTL index on created_at expires old keys. A claim
+    is a lease: if its holder has not completed it by lease_expires_at (the
+    process crashed or lost its connection), the next request with the same
+    key and body takes it over instead of getting 409 until the key expires.
+    Each claim carries an owner token, so a holder whose lease was taken
+    over cannot complete or release the new claim.
+    """
+    
+    @staticmethod
+    async def claim(key: str, request_hash: str, owner: str) -> Optional[dict]:
+        """
+        Claim a key for processing.
+        
+        Returns:
+            None if the key was claimed (or a stale claim taken over) by this
+            call, otherwise the existing record (status "in_progress" or
+            "completed"). A claim released or expired between the failed
+            insert and the read is retried; if the key keeps changing hands
+            an "in_progress" record is returned.
+        """
+        db = get_db()
+        for _ in range(IDEMPOTENCY_CLAIM_ATTEMPTS):
+            now = datetime.utcnow()
+            lease_expires_at = now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+            try:
+                await db.idempotency_keys.insert_one({
+                    "_id": key,
+                    "request_hash": request_hash,
+                    "status": "in_progress",
+                    "owner": owner,
+                    "lease_expires_at": lease_expires_at,
+                    "created_at": now,
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+            
+            # Conditional, so only one of several concurrent retries wins a stale claim.
+            taken_over = await db.idempotency_keys.find_one_and_update(
+                {
+                    "_id": key,
+                    "request_hash": request_hash,
+                    "status": "in_progress",
+                    "lease_expires_at": {"$lte": now},
+                },
+                {"$set": {"owner": owner, "lease_expires_at": lease_expires_at}},
+            )
+            if taken_over is not None:
+                logger.warning("Took over stale idempotency claim %s from %s", key, taken_over.get("owner"))
+                return None
+            existing = await db.idempotency_keys.find_one({"_id": key})
+            if existing is not None:
+                return existing
+            # Released or expired since the insert failed: try to claim it again.
+        
+        # Still changing hands; report it as in progress so the client retries.
+        logger.warning("Could not claim idempotency key %s after %s attempts", key, IDEMPOTENCY_CLAIM_ATTEMPTS)
+        return {"_id": key, "request_hash": request_hash, "status": "in_progress"}
+    
+    @staticmethod
+    async def complete(key: str, owner: str, response: dict) -> None:
+        """Store the response for a key this owner still holds."""
+        db = get_db()
+        await db.idempotency_keys.update_one(
+            {"_id": key, "owner": owner, "status": "in_progress"},
+            {"$set": {"status": "completed", "response": response}, "$unset": {"lease_expires_at": ""}}
+        )
+    
+    @staticmethod
+    async def release(key: str, owner: str) -> None:
+        """Drop a claim whose request failed so the client can retry it."""
+        db = get_db()
+        await db.idempotency_keys.delete_one({"_id": key, "owner": owner, "status": "in_progress"})
@@ -0,0 +1,228 @@
+"""
+Incremental daily rollups of prediction statistics.
+
+Every stored prediction bumps counters on one document per UTC day in the
+prediction_rollups collection ($inc upserts), so dashboard statistics are
+read from at most one small document per day instead of scanning
+predictions. A rollup update that fails after its predictions were stored
+does not fail the write (retrying it would store the records twice); it is
+logged and counted in gateway_rollup_errors_total, and a rebuild repairs
+the counts.
+
+Rebuild from existing predictions (e.g. after first deploying rollups, or
+after rollup errors):
+    python -m database.rollups --rebuild
+"""
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from database.connection import get_db
+from services.metrics import ROLLUP_ERRORS
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "prediction_rollups"
+# Rollups are rebuilt here and then renamed over ROLLUP_COLLECTION.
+REBUILD_COLLECTION = f"{ROLLUP_COLLECTION}_rebuild"
+BUCKET_FORMAT = "%Y-%m-%d"
+# Confidence scores (0-100) are counted in bins of this width.
+CONFIDENCE_BIN_WIDTH = 10
+MAX_STATS_DAYS = 366
+
+
+def _bucket_id(created_at: datetime) -> str:
+    return created_at.strftime(BUCKET_FORMAT)
+
+
+def _field_key(value) -> str:
+    """Make a value safe to use as a MongoDB field name."""
+    return str(value).replace(".", "_").replace("$", "_") or "unknown"
+
+
+def _confidence_bin(score: float) -> str:
+    lower = int(min(max(score, 0.0), 100.0) // CONFIDENCE_BIN_WIDTH) * CONFIDENCE_BIN_WIDTH
+    return str(min(lower, 100 - CONFIDENCE_BIN_WIDTH))
+
+
+def rollup_increments(predictions: Iterable[dict]) -> dict:
+    """Merge the $inc counters for a set of predictions, keyed by day bucket."""
+    buckets = defaultdict(lambda: defaultdict(int))
+    for prediction in predictions:
+        increments = buckets[_bucket_id(prediction["created_at"])]
+        score = float(prediction.get("confidence_score") or 0.0)
+        increments["total"] += 1
+        increments["confidence_sum"] += score
+        increments[f"risk_level.{_field_key(prediction.get('risk_level'))}"] += 1
+        increments[f"department.{_field_key(prediction.get('recommended_department'))}"] += 1
+        increments[f"confidence.{_confidence_bin(score)}"] += 1
+    return buckets
+
+
+async def record_predictions(predictions: List[dict], collection: str = ROLLUP_COLLECTION) -> None:
+    """Apply predictions to the daily rollups with one upsert per day; raises if an upsert fails."""
+    if not predictions:
+        return
+    rollups = get_db()[collection]
+    # Almost every batch falls on a single day, so this is usually one update.
+    await asyncio.gather(*(
+        rollups.update_one(
+            {"_id": bucket},
+            {
+                "$inc": dict(increments),
+                "$setOnInsert": {"date": datetime.strptime(bucket, BUCKET_FORMAT)},
+            },
+            upsert=True,
+        )
+        for bucket, increments in rollup_increments(predictions).items()
+    ))
+
+
+async def record_stored_predictions(predictions: List[dict]) -> None:
+    """
+    record_predictions for predictions that are already stored. A failure is
+    logged and counted rather than raised: the write succeeded, and failing
+    it would make the caller retry and store the records again.
+    """
+    try:
+        await record_predictions(predictions)
+    except Exception as exc:
+        ROLLUP_ERRORS.inc()
+        logger.error(
+            "Failed to update prediction rollups for %s predictions (run `python -m database.rollups --rebuild`): %s",
+            len(predictions), exc,
+        )
+
+
+# ============================================
+# QUERIES
+# ============================================
+
+def _window(days: int, end: Optional[datetime] = None) -> List[str]:
+    end = end or datetime.utcnow()
+    return [_bucket_id(end - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+
+
+def _confidence_distribution(counts: dict) -> List[dict]:
+    return [
+        {"range": f"{lower}-{lower + CONFIDENCE_BIN_WIDTH}", "count": int(counts.get(str(lower), 0))}
+        for lower in range(0, 100, CONFIDENCE_BIN_WIDTH)
+    ]
+
+
+def _bucket_summary(total: int, confidence_sum: float, risk: dict, department: dict, confidence: dict) -> dict:
+    return {
+        "total": int(total),
+        "average_confidence": round(confidence_sum / total, 2) if total else 0.0,
+        "by_risk_level": {key: int(value) for key, value in risk.items()},
+        "by_department": {key: int(value) for key, value in department.items()},
+        "confidence_distribution": _confidence_distribution(confidence),
+    }
+
+
+async def _load_buckets(days: int) -> tuple:
+    days = max(1, min(days, MAX_STATS_DAYS))
+    window = _window(days)
+    cursor = get_db()[ROLLUP_COLLECTION].find({"_id": {"$gte": window[0], "$lte": window[-1]}})
+    documents = {doc["_id"]: doc for doc in await cursor.to_list(length=days)}
+    return window, documents
+
+
+async def get_stats(days: int = 90) -> dict:
+    """Totals, breakdowns and confidence distribution over the last `days` days."""
+    window, documents = await _load_buckets(days)
+    total, confidence_sum = 0, 0.0
+    risk, department, confidence = defaultdict(int), defaultdict(int), defaultdict(int)
+    for doc in documents.values():
+        total += doc.get("total", 0)
+        confidence_sum += doc.get("confidence_sum", 0.0)
+        for target, field in ((risk, "risk_level"), (department, "department"), (confidence, "confidence")):
+            for key, value in doc.get(field, {}).items():
+                target[key] += value
+    return {
+        "start": window[0],
+        "end": window[-1],
+        "days": len(window),
+        **_bucket_summary(total, confidence_sum, risk, department, confidence),
+    }
+
+
+async def get_daily_stats(days: int = 30) -> dict:
+    """Per-day breakdown over the last `days` days (empty days are zero-filled)."""
+    window, documents = await _load_buckets(days)
+    buckets = []
+    for bucket in window:
+        doc = documents.get(bucket, {})
+        buckets.append({
+            "date": bucket,
+            **_bucket_summary(
+                doc.get("total", 0),
+                doc.get("confidence_sum", 0.0),
+                doc.get("risk_level", {}),
+                doc.get("department", {}),
+                doc.get("confidence", {}),
+            ),
+        })
+    return {"start": window[0], "end": window[-1], "days": len(window), "buckets": buckets}
+
+
+# ============================================
+# REBUILD
+# ============================================
+
+async def rebuild_rollups(batch_size: int = 5000) -> int:
+    """
+    Recompute all rollups from the predictions collection; returns predictions counted.
+
+    The counts are built in REBUILD_COLLECTION and renamed over the live
+    rollups in one step, so readers see either the old or the new rollups,
+    never a partly rebuilt set, and $inc upserts from concurrent writes do
+    not mix with the recount. A prediction stored while the rebuild runs is
+    counted only if the scan reaches it, so run it while writes are quiet.
+    Errors are raised and leave the live rollups untouched.
+    """
+    db = get_db()
+    await db[REBUILD_COLLECTION].drop()
+    projection = {"risk_level": 1, "recommended_department": 1, "confidence_score": 1, "created_at": 1}
+    counted, batch = 0, []
+    async for prediction in db.predictions.find({}, projection):
+        batch.append(prediction)
+        if len(batch) >= batch_size:
+            await record_predictions(batch, REBUILD_COLLECTION)
+            counted += len(batch)
+            batch = []
+    await record_predictions(batch, REBUILD_COLLECTION)
+    counted += len(batch)
+
+    if counted:
+        await db[REBUILD_COLLECTION].rename(ROLLUP_COLLECTION, dropTarget=True)
+    else:
+        await db[ROLLUP_COLLECTION].drop()
+    return counted
+
+
+async def _run_rebuild() -> None:
+    from database.connection import connect_db, close_db
+
+    await connect_db()
+    try:
+        print("🔧 Rebuilding prediction rollups...")
+        counted = await rebuild_rollups()
+        print(f"✅ Rolled up {counted} predictions")
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Maintain prediction statistics rollups.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute rollups from all predictions")
+    if parser.parse_args().rebuild:
+        asyncio.run(_run_rebuild())
+    else:
+        parser.print_help()
@@ -0,0 +1,232 @@
+"""
+Write-behind queue for triage records.
+
+In async-batched persistence mode the triage path enqueues the patient and
+prediction documents (with client-generated ObjectIds) and returns as soon
+as the prediction is ready. A background task flushes the queue to MongoDB
+with unordered insert_many calls in batches, retrying failed flushes.
+Records the server rejects individually are dropped without holding up
+(or retrying) the rest of their batch.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from pymongo.errors import BulkWriteError, WriteError
+from database.connection import get_db
+from database.rollups import record_stored_predictions
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL_MS = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", "50"))
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))
+WRITE_BEHIND_RETRY_BACKOFF_MS = float(os.getenv("WRITE_BEHIND_RETRY_BACKOFF_MS", "100"))
+# Dropped records remembered so wait_persisted can still report them after the flush.
+WRITE_BEHIND_FAILURE_HISTORY = int(os.getenv("WRITE_BEHIND_FAILURE_HISTORY", "10000"))
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+async def _insert_many_idempotent(collection, documents: list) -> dict:
+    """
+    Unordered insert that treats duplicate-key errors as success, so a retry
+    after a partially applied flush does not fail on documents that made it.
+
+    Returns the other write errors by document index. Those documents are
+    rejected by the server (validation, size) and would fail the same way
+    on a retry, so the caller drops them instead of retrying the batch.
+    """
+    if not documents:
+        return {}
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as exc:
+        if exc.details.get("writeConcernErrors"):
+            raise
+        return {
+            error["index"]: error
+            for error in exc.details.get("writeErrors", [])
+            if error.get("code") != DUPLICATE_KEY_ERROR
+        }
+    return {}
+
+
+class WriteBehindQueue:
+    """Batches patient + prediction inserts and flushes them in the background."""
+
+    def __init__(
+        self,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval_ms: float = WRITE_BEHIND_FLUSH_INTERVAL_MS,
+        max_queue: int = WRITE_BEHIND_MAX_QUEUE,
+        max_retries: int = WRITE_BEHIND_MAX_RETRIES,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: dict[str, asyncio.Future] = {}
+        # Prediction ID -> error, for the most recently dropped records.
+        self._failed: OrderedDict[str, BaseException] = OrderedDict()
+
+        # Metrics
+        self.flushed_records = 0
+        self.failed_records = 0
+        self.flush_count = 0
+        self.flush_retries = 0
+        self.last_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued, then stop the background task."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def enqueue(self, patient_doc: dict, prediction_doc: dict) -> None:
+        """Queue one record; waits only when the queue is full (backpressure)."""
+        self.start()
+        prediction_id = str(prediction_doc["_id"])
+        self._pending[prediction_id] = asyncio.get_running_loop().create_future()
+        await self._queue.put((patient_doc, prediction_doc))
+
+    async def wait_persisted(self, prediction_id: str) -> None:
+        """
+        Wait until a queued prediction has been flushed. Raises the write
+        error if it was dropped, also when that happened before this call;
+        returns at once for a stored prediction or one never queued here.
+        """
+        future = self._pending.get(prediction_id)
+        if future is not None:
+            await asyncio.shield(future)
+            return
+        error = self._failed.get(prediction_id)
+        if error is not None:
+            raise error
+
+    def _remember_failure(self, prediction_id: str, exc: BaseException) -> None:
+        self._failed[prediction_id] = exc
+        while len(self._failed) > WRITE_BEHIND_FAILURE_HISTORY:
+            self._failed.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "flushed_records": self.flushed_records,
+            "failed_records": self.failed_records,
+            "flush_count": self.flush_count,
+            "flush_retries": self.flush_retries,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+            "avg_flush_ms": round(
+                self.total_flush_seconds / self.flush_count * 1000, 3
+            ) if self.flush_count else 0.0,
+        }
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: list) -> dict:
+        """
+        Write one batch; returns {position in batch: write error} for the
+        records MongoDB rejected. Raises on errors that may be transient.
+        """
+        db = get_db()
+        # Patients first, and only predictions whose patient is stored, so no
+        # flushed prediction references a missing patient.
+        failed = await _insert_many_idempotent(db.patients, [patient for patient, _ in batch])
+        positions = [position for position in range(len(batch)) if position not in failed]
+        rejected = await _insert_many_idempotent(db.predictions, [batch[position][1] for position in positions])
+        if rejected:
+            orphans = [positions[index] for index in rejected]
+            await db.patients.delete_many({"_id": {"$in": [batch[position][0]["_id"] for position in orphans]}})
+            failed.update({positions[index]: error for index, error in rejected.items()})
+        return failed
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            failed, error = {}, None
+            start = time.perf_counter()
+
+            for attempt in range(self.max_retries + 1):
+                try:
+                    failed = await self._flush(batch)
+                    error = None
+                    break
+                except Exception as exc:
+                    error = exc
+                    logger.warning("Write-behind flush failed (attempt %s): %s", attempt + 1, exc)
+                    if attempt < self.max_retries:
+                        self.flush_retries += 1
+                        await asyncio.sleep(WRITE_BEHIND_RETRY_BACKOFF_MS / 1000.0 * 2 ** attempt)
+
+            elapsed = time.perf_counter() - start
+            self.flush_count += 1
+            self.last_flush_seconds = elapsed
+            self.total_flush_seconds += elapsed
+
+            if error is not None:
+                logger.error("Dropping %s triage records after retries: %s", len(batch), error)
+                errors = [error] * len(batch)
+            else:
+                if failed:
+                    logger.error(
+                        "Dropping %s triage records rejected by MongoDB: %s",
+                        len(failed), next(iter(failed.values())).get("errmsg"),
+                    )
+                errors = [
+                    WriteError(failed[position].get("errmsg"), failed[position].get("code"), failed[position])
+                    if position in failed else None
+                    for position in range(len(batch))
+                ]
+            stored = [prediction for (_, prediction), exc in zip(batch, errors) if exc is None]
+            self.flushed_records += len(stored)
+            self.failed_records += len(batch) - len(stored)
+            # Outside the retry loop, so a retried flush never double counts.
+            await record_stored_predictions(stored)
+
+            for (_, prediction), exc in zip(batch, errors):
+                future = self._pending.pop(str(prediction["_id"]), None)
+                if future is not None and not future.done():
+                    if exc is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(exc)
+                        # Nobody may await this; avoid "exception never retrieved".
+                        future.exception()
+                if exc is not None:
+                    self._remember_failure(str(prediction["_id"]), exc)
+                self._queue.task_done()
+
+
+write_behind = WriteBehindQueue()
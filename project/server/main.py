@@ -1,8 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from routes.triage import router as triage_router
 from routes.data import router as data_router
+from routes.ops import router as ops_router
+from routes.ingest import router as ingest_router
+from routes.stats import router as stats_router
+from routes.export import router as export_router
 from database.connection import connect_db, close_db
+from database.repositories import PERSISTENCE_MODE
+from database.write_behind import write_behind
+from database.cache import cache
+from services.ai_service import init_ai_client, close_ai_client
+from services.live_feed import live_feed
+from services.metrics import CONTENT_TYPE, HTTP_METRICS, MetricsMiddleware, current_trace_id, render_metrics
+from observability.profiling import RequestProfilingMiddleware
 
 app = FastAPI(title="Smart Patient Triage API")
 
@@ -12,22 +24,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
+# Per-request samples for GET /api/ops/profile/slow-requests (idle otherwise).
+app.add_middleware(RequestProfilingMiddleware, trace_id=current_trace_id)
+# Request metrics for GET /metrics and the X-Trace-Id header.
+app.add_middleware(MetricsMiddleware, metrics=HTTP_METRICS, service="gateway")
 
 app.include_router(triage_router)
 app.include_router(data_router)
+app.include_router(ops_router)
+app.include_router(ingest_router)
+app.include_router(stats_router)
+app.include_router(export_router)
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database connection on application startup."""
+    """Initialize database connection and AI client on application startup."""
     await connect_db()
     print("✅ Connected to MongoDB")
+    if PERSISTENCE_MODE == "async_batched":
+        write_behind.start()
+    await init_ai_client()
+    await live_feed.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close database connection on application shutdown."""
+    """End live feed streams, close AI client, flush queued writes, close the cache and the database connection on shutdown."""
+    await live_feed.stop()
+    await close_ai_client()
+    await write_behind.stop()
+    await cache.close()
     await close_db()
     print("❌ Disconnected from MongoDB")
 
@@ -35,3 +64,9 @@ async def shutdown_event():
 @app.get("/")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this gateway (all its processes in multiprocess mode)."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,9 +1,13 @@
 """
 API routes for patient and prediction data access.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from database.repositories import PatientRepository, PredictionRepository, UserRepository
+from database.pagination import MAX_PAGE_SIZE, InvalidCursorError
+from database.projections import InvalidProjectionError, parse_fields
+from services.live_feed import event_stream, live_feed
 
 router = APIRouter(prefix="/api", tags=["data"])
 
@@ -13,11 +17,13 @@ router = APIRouter(prefix="/api", tags=["data"])
 # ============================================
 
 @router.get("/patients")
-async def get_patients(limit: int = 100, skip: int = 0):
-    """Get all patients with pagination."""
+async def get_patients(limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    """Get all patients with cursor pagination (pass next_cursor to get the next page)."""
     try:
-        patients = await PatientRepository.find_all(limit=limit, skip=skip)
-        return {"patients": patients, "count": len(patients)}
+        patients, next_cursor = await PatientRepository.find_all(limit=limit, cursor=cursor)
+        return {"patients": patients, "count": len(patients), "next_cursor": next_cursor}
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -39,15 +45,50 @@ async def get_patient(patient_id: str):
 # ============================================
 
 @router.get("/predictions")
-async def get_predictions(limit: int = 100, skip: int = 0):
-    """Get all predictions with pagination."""
+async def get_predictions(
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: str = "full",
+):
+    """
+    Get all predictions with cursor pagination (pass next_cursor to get the next page).
+
+    fields is a comma-separated list of fields to return; view=summary returns
+    a compact row per prediction. _id and created_at are always included.
+    """
     try:
-        predictions = await PredictionRepository.find_all(limit=limit, skip=skip)
-        return {"predictions": predictions, "count": len(predictions)}
+        predictions, next_cursor = await PredictionRepository.find_all(
+            limit=limit, cursor=cursor, fields=parse_fields(fields), view=view
+        )
+        return {"predictions": predictions, "count": len(predictions), "next_cursor": next_cursor}
+    except (InvalidCursorError, InvalidProjectionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/predictions/stream")
+async def stream_predictions(
+    risk_level: Optional[str] = None,
+    department: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-sent events: each new prediction (summary fields) as soon as it is
+    stored, optionally only for one risk level and/or recommended department.
+    Reconnecting with Last-Event-ID replays the predictions missed meanwhile.
+    """
+    if live_feed.is_full():
+        raise HTTPException(status_code=503, detail="Too many live feed clients, retry later")
+    return StreamingResponse(
+        event_stream(risk_level, department, last_event_id),
+        media_type="text/event-stream",
+        # No proxy buffering, so events are not held back by nginx and friends.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/predictions/{prediction_id}")
 async def get_prediction(prediction_id: str):
     """Get a specific prediction by ID."""
@@ -61,21 +102,41 @@ async def get_prediction(prediction_id: str):
 
 
 @router.get("/predictions/patient/{patient_id}")
-async def get_patient_predictions(patient_id: str, limit: int = 50):
+async def get_patient_predictions(
+    patient_id: str,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: str = "full",
+):
     """Get all predictions for a specific patient."""
     try:
-        predictions = await PredictionRepository.find_by_patient_id(patient_id, limit=limit)
-        return {"predictions": predictions, "count": len(predictions)}
+        predictions, next_cursor = await PredictionRepository.find_by_patient_id(
+            patient_id, limit=limit, cursor=cursor, fields=parse_fields(fields), view=view
+        )
+        return {"predictions": predictions, "count": len(predictions), "next_cursor": next_cursor}
+    except (InvalidCursorError, InvalidProjectionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/predictions/risk/{risk_level}")
-async def get_predictions_by_risk(risk_level: str, limit: int = 100):
+async def get_predictions_by_risk(
+    risk_level: str,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: str = "full",
+):
     """Get predictions filtered by risk level."""
     try:
-        predictions = await PredictionRepository.find_by_risk_level(risk_level, limit=limit)
-        return {"predictions": predictions, "count": len(predictions)}
+        predictions, next_cursor = await PredictionRepository.find_by_risk_level(
+            risk_level, limit=limit, cursor=cursor, fields=parse_fields(fields), view=view
+        )
+        return {"predictions": predictions, "count": len(predictions), "next_cursor": next_cursor}
+    except (InvalidCursorError, InvalidProjectionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -85,11 +146,13 @@ async def get_predictions_by_risk(risk_level: str, limit: int = 100):
 # ============================================
 
 @router.get("/users")
-async def get_users(limit: int = 100, skip: int = 0):
-    """Get all users with pagination."""
+async def get_users(limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    """Get all users with cursor pagination (pass next_cursor to get the next page)."""
     try:
-        users = await UserRepository.find_all(limit=limit, skip=skip)
-        return {"users": users, "count": len(users)}
+        users, next_cursor = await UserRepository.find_all(limit=limit, cursor=cursor)
+        return {"users": users, "count": len(users), "next_cursor": next_cursor}
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,44 @@
+"""
+API route for streaming exports of predictions joined with patients.
+"""
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from services.export_service import (
+    EXPORT_BATCH_SIZE,
+    EXPORT_MEDIA_TYPES,
+    ExportUnavailableError,
+    export_predictions,
+)
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+
+@router.get("/predictions")
+async def export_predictions_stream(
+    format: Literal["ndjson", "arrow"] = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    risk_level: Optional[List[str]] = Query(None),
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    """
+    Stream predictions (joined with their patient) as NDJSON or an Arrow IPC stream.
+
+    Filter with start/end (created_at, end exclusive) and one or more
+    risk_level parameters. Rows are read and sent batch_size at a time.
+    """
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be at least 1")
+    try:
+        body = export_predictions(format, start, end, risk_level, batch_size)
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    extension = "ndjson" if format == "ndjson" else "arrows"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="predictions.{extension}"'},
+    )
@@ -0,0 +1,49 @@
+"""
+API route for streaming bulk ingest of historical triage records.
+"""
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query, Request
+from schemas.ingest_schema import IngestReport
+from services.ingest_service import (
+    INGEST_CHUNK_SIZE,
+    INGEST_MAX_CHUNK_SIZE,
+    IngestAborted,
+    ingest_records,
+    iter_stream_lines,
+    parse_records,
+)
+
+router = APIRouter(prefix="/api", tags=["ingest"])
+
+
+@router.post("/ingest", response_model=IngestReport)
+async def bulk_ingest(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    score: bool = False,
+    explain: Literal["none", "top_k"] = "none",
+    chunk_size: int = Query(INGEST_CHUNK_SIZE, ge=1, le=INGEST_MAX_CHUNK_SIZE),
+):
+    """
+    Stream NDJSON or CSV records in the request body into MongoDB.
+
+    The body is consumed incrementally, so arbitrarily large uploads are
+    processed with bounded memory. If the ingest stops part way, the error
+    response carries the partial report; records up to its
+    last_committed_record are stored.
+    """
+    lines = iter_stream_lines(request.stream())
+    try:
+        return await ingest_records(
+            parse_records(lines, format),
+            chunk_size=chunk_size,
+            score=score,
+            explain=explain,
+        )
+    except IngestAborted as exc:
+        cause = exc.cause if isinstance(exc.cause, HTTPException) else None
+        raise HTTPException(
+            status_code=cause.status_code if cause else 500,
+            detail={"message": exc.report.error, "report": exc.report.model_dump()},
+            headers=cause.headers if cause else None,
+        )
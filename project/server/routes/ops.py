@@ -0,0 +1,85 @@
+"""
+Operational endpoints: runtime statistics and profiling for gateway internals.
+"""
+import os
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from database.repositories import PERSISTENCE_MODE
+from database.write_behind import write_behind
+from database.cache import cache
+from services.live_feed import live_feed
+from observability.profiling import PROFILE_INTERVAL_MS, ProfilerBusy, profile
+from services.triage_service import ai_calls, idempotent_requests
+
+# Required in the X-Admin-Token header by the profiling endpoints, which
+# are disabled while it is unset.
+OPS_ADMIN_TOKEN = os.getenv("OPS_ADMIN_TOKEN", "")
+
+router = APIRouter(prefix="/api/ops", tags=["ops"])
+
+
+@router.get("/persistence")
+async def get_persistence_stats():
+    """Persistence mode plus write-behind queue depth and flush latency."""
+    return {"mode": PERSISTENCE_MODE, **write_behind.stats()}
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Read-through cache backend, size and hit/miss counters per key namespace."""
+    return cache.stats()
+
+
+@router.get("/coalescing")
+async def get_coalescing_stats():
+    """Single-flight counters: executed calls vs. callers that shared one."""
+    return {
+        "ai_predict": ai_calls.stats(),
+        "idempotency": idempotent_requests.stats(),
+    }
+
+
+@router.get("/live-feed")
+async def get_live_feed_stats():
+    """Live feed source, connected clients and delivery counters."""
+    return live_feed.stats()
+
+
+def _check_admin_token(token: Optional[str]) -> None:
+    if not OPS_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Profiling is disabled, set OPS_ADMIN_TOKEN to enable it")
+    if not secrets.compare_digest(token or "", OPS_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+async def _run_profile(seconds: float, interval_ms: float, include_idle: bool = False,
+                       slow_ms: Optional[float] = None) -> PlainTextResponse:
+    try:
+        sampler, _ = await profile(seconds, interval_ms, include_idle, slow_ms=slow_ms)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(sampler.collapsed(), headers={
+        "X-Profile-Samples": str(sampler.samples),
+        "X-Profile-Slow-Requests": str(sampler.slow_requests),
+    })
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(seconds: float = 10, interval_ms: float = PROFILE_INTERVAL_MS,
+                      include_idle: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Sample every thread of this process for `seconds`; collapsed stacks for a flamegraph."""
+    _check_admin_token(x_admin_token)
+    return await _run_profile(seconds, interval_ms, include_idle)
+
+
+@router.get("/profile/slow-requests", response_class=PlainTextResponse)
+async def get_slow_request_profile(seconds: float = 10, threshold_ms: float = 100,
+                                   interval_ms: float = PROFILE_INTERVAL_MS,
+                                   x_admin_token: Optional[str] = Header(None)):
+    """Collapsed stacks of event-loop CPU per request slower than `threshold_ms`."""
+    _check_admin_token(x_admin_token)
+    return await _run_profile(seconds, interval_ms, slow_ms=threshold_ms)
@@ -0,0 +1,25 @@
+"""
+Dashboard statistics served from pre-aggregated daily rollups.
+"""
+from fastapi import APIRouter, HTTPException, Query
+from database.rollups import MAX_STATS_DAYS, get_daily_stats, get_stats
+
+router = APIRouter(prefix="/api/stats", tags=["stats"])
+
+
+@router.get("")
+async def get_prediction_stats(days: int = Query(90, ge=1, le=MAX_STATS_DAYS)):
+    """Prediction counts by risk level and department, plus confidence distribution."""
+    try:
+        return await get_stats(days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/daily")
+async def get_prediction_stats_daily(days: int = Query(30, ge=1, le=MAX_STATS_DAYS)):
+    """The same statistics broken down per UTC day, oldest first."""
+    try:
+        return await get_daily_stats(days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Header
 from schemas.triage_schema import TriageRequest, TriageResponse, AITriagePredictResponse
 from services.triage_service import run_triage, run_triage_raw
 
@@ -6,10 +7,10 @@ router = APIRouter()
 
 
 @router.post("/triage", response_model=TriageResponse)
-async def triage(data: TriageRequest):
-    return await run_triage(data)
+async def triage(data: TriageRequest, idempotency_key: Optional[str] = Header(None)):
+    return await run_triage(data, idempotency_key)
 
 
 @router.post("/api/triage/predict", response_model=AITriagePredictResponse)
-async def triage_predict(data: TriageRequest):
-    return await run_triage_raw(data)
+async def triage_predict(data: TriageRequest, idempotency_key: Optional[str] = Header(None)):
+    return await run_triage_raw(data, idempotency_key)
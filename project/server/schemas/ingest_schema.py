@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from pydantic import BaseModel, field_validator
+
+from schemas.triage_schema import FeatureExplanation
+
+
+class IngestRecord(BaseModel):
+    """One historical encounter: patient fields plus an optional stored prediction."""
+    age: int
+    gender: str
+    blood_pressure: str
+    heart_rate: int
+    temperature: float
+    symptoms: list[str] = []
+    conditions: list[str] = []
+    notes: str | None = None
+    created_at: datetime | None = None
+    risk_level: str | None = None
+    recommended_department: str | None = None
+    confidence_score: float | None = None
+    explanation: list[FeatureExplanation] = []
+    model_version: str | None = None
+
+    @field_validator("created_at")
+    @classmethod
+    def _naive_utc(cls, value: datetime | None) -> datetime | None:
+        """Stored times are naive UTC, like datetime.utcnow(); "+05:30" input is shifted, not dropped."""
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class IngestReport(BaseModel):
+    records_read: int
+    invalid_records: int
+    patients_inserted: int
+    predictions_inserted: int
+    records_scored: int
+    write_errors: int
+    # Position (1-based, counting invalid records) of the last record whose
+    # chunk was written; an ingest that stopped can resume after it.
+    last_committed_record: int = 0
+    elapsed_seconds: float
+    records_per_second: float
+    peak_rss_mb: float | None = None
+    error: str | None = None
@@ -1,6 +1,10 @@
+from typing import Literal
 from pydantic import BaseModel
 
 
+ExplainMode = Literal["none", "top_k", "deferred"]
+
+
 class TriageRequest(BaseModel):
     age: int
     gender: str
@@ -10,6 +14,7 @@ class TriageRequest(BaseModel):
     temperature: float
     conditions: list[str] = []
     notes: str | None = None
+    explain: ExplainMode = "top_k"
 
 
 class TriageResponse(BaseModel):
@@ -17,6 +22,7 @@ class TriageResponse(BaseModel):
     department: str
     confidence: float
     explanation: list[str]
+    prediction_id: str | None = None
 
 
 class FeatureExplanation(BaseModel):
@@ -29,3 +35,5 @@ class AITriagePredictResponse(BaseModel):
     recommended_department: str
     confidence_score: float
     explanation: list[FeatureExplanation]
+    model_version: str | None = None
+    prediction_id: str | None = None
@@ -1,59 +1,349 @@
+import os
+import sys
+import asyncio
 import httpx
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Collection
 from fastapi import HTTPException
+from services.metrics import AI_ERRORS, TRACE_HEADER, current_trace_id, stage
 
 logger = logging.getLogger(__name__)
 
-AI_BACKEND_URL = "http://localhost:8001"
-PREDICT_ENDPOINT = f"{AI_BACKEND_URL}/predict"
-REQUEST_TIMEOUT = 30.0
+# "remote" calls the AI backend over HTTP, "local" runs the model in a
+# process pool inside the gateway.
+AI_PREDICTOR = os.getenv("AI_PREDICTOR", "remote").lower()
 
+# Comma-separated list of AI backend replicas.
+AI_BACKEND_URLS = [
+    url.strip().rstrip("/")
+    for url in os.getenv("AI_BACKEND_URLS", "http://localhost:8001").split(",")
+    if url.strip()
+]
+AI_BACKEND_URL = AI_BACKEND_URLS[0]
+PREDICT_PATH = "/predict"
+PREDICT_BATCH_PATH = "/predict/batch"
+# Backend statuses passed through to the client (with Retry-After) instead of a 502.
+AI_PASSTHROUGH_STATUSES = (429, 503)
 
-async def call_ai_predict(payload: dict) -> dict:
+# Connection pool and timeouts for the shared client.
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "100"))
+AI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+AI_KEEPALIVE_EXPIRY = float(os.getenv("AI_KEEPALIVE_EXPIRY", "30"))
+AI_CONNECT_TIMEOUT = float(os.getenv("AI_CONNECT_TIMEOUT", "5"))
+AI_READ_TIMEOUT = float(os.getenv("AI_READ_TIMEOUT", "30"))
+AI_WRITE_TIMEOUT = float(os.getenv("AI_WRITE_TIMEOUT", "10"))
+AI_POOL_TIMEOUT = float(os.getenv("AI_POOL_TIMEOUT", "5"))
+# HTTP/2 needs the optional h2 package: pip install "httpx[http2]"
+AI_HTTP2 = os.getenv("AI_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Local mode: location of the backend/ package and number of worker processes.
+AI_LOCAL_BACKEND_PATH = os.getenv(
+    "AI_LOCAL_BACKEND_PATH",
+    str(Path(__file__).resolve().parents[3] / "backend"),
+)
+AI_LOCAL_WORKERS = int(os.getenv("AI_LOCAL_WORKERS", str(os.cpu_count() or 1)))
+
+
+class BackendBalancer:
+    """Least-outstanding-requests selection across AI backend replicas."""
+
+    def __init__(self, urls: list[str]):
+        self.outstanding = {url: 0 for url in urls}
+        self._next = 0
+
+    def acquire(self, exclude: Collection[str] = ()) -> str:
+        """Pick a replica, skipping those in exclude while any other is left."""
+        urls = list(self.outstanding)
+        # Rotate the starting point so ties are spread across replicas.
+        start = self._next % len(urls)
+        self._next += 1
+        candidates = [url for url in urls[start:] + urls[:start] if url not in exclude]
+        url = min(candidates or urls, key=self.outstanding.__getitem__)
+        self.outstanding[url] += 1
+        return url
+
+    def release(self, url: str) -> None:
+        self.outstanding[url] -= 1
+
+
+_client: httpx.AsyncClient | None = None
+_balancer = BackendBalancer(AI_BACKEND_URLS)
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=AI_MAX_CONNECTIONS,
+            max_keepalive_connections=AI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=AI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=AI_CONNECT_TIMEOUT,
+            read=AI_READ_TIMEOUT,
+            write=AI_WRITE_TIMEOUT,
+            pool=AI_POOL_TIMEOUT,
+        ),
+        http2=AI_HTTP2,
+    )
+
+
+def get_ai_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily outside the app lifecycle."""
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+# ============================================
+# PREDICTORS
+# ============================================
+
+class RemotePredictor:
+    """Calls the AI backend's POST /predict over the shared pooled client."""
+
+    async def start(self) -> None:
+        get_ai_client()
+
+    async def close(self) -> None:
+        global _client
+        if _client is not None:
+            await _client.aclose()
+            _client = None
+
+    async def predict(self, payload: dict, explain: str) -> dict:
+        return await self._post(PREDICT_PATH, payload, explain)
+
+    async def predict_batch(self, payloads: list[dict], explain: str) -> list[dict]:
+        return await self._post(PREDICT_BATCH_PATH, payloads, explain)
+
+    async def _post(self, path: str, body, explain: str):
+        # Lets the backend log the same trace ID as the request that caused the call.
+        trace_id = current_trace_id()
+        headers = {TRACE_HEADER: trace_id} if trace_id else None
+        # Replicas that refused the connection; nothing reached them, so the
+        # request is safe to send to another one.
+        unreachable = set()
+        while True:
+            backend_url = _balancer.acquire(exclude=unreachable)
+            try:
+                response = await get_ai_client().post(
+                    f"{backend_url}{path}", json=body, params={"explain": explain}, headers=headers
+                )
+                response.raise_for_status()
+                return response.json()
+
+            except httpx.TimeoutException as exc:
+                logger.error("AI service request to %s timed out: %r", backend_url, exc)
+                raise HTTPException(
+                    status_code=504,
+                    detail="AI prediction service timed out. Please try again.",
+                )
+            except httpx.ConnectError:
+                unreachable.add(backend_url)
+                if len(unreachable) < len(_balancer.outstanding):
+                    logger.warning("Cannot connect to AI service at %s, trying another replica", backend_url)
+                    continue
+                logger.error("Cannot connect to AI service at %s", backend_url)
+                raise HTTPException(
+                    status_code=503,
+                    detail="AI prediction service is unavailable. Ensure it is running on port 8001.",
+                )
+            except httpx.HTTPStatusError as exc:
+                status_code = exc.response.status_code
+                if status_code in AI_PASSTHROUGH_STATUSES:
+                    # Overload, not a fault: let the client back off and retry.
+                    logger.warning("AI service at %s is overloaded (status %s)", backend_url, status_code)
+                    retry_after = exc.response.headers.get("Retry-After")
+                    raise HTTPException(
+                        status_code=status_code,
+                        detail="AI prediction service is busy. Please retry shortly.",
+                        headers={"Retry-After": retry_after} if retry_after else None,
+                    )
+                logger.error(
+                    "AI service returned status %s: %s",
+                    status_code,
+                    exc.response.text,
+                )
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"AI service error: {exc.response.text}",
+                )
+            except Exception as exc:
+                logger.error("Unexpected error calling AI service: %s", exc)
+                raise HTTPException(
+                    status_code=500,
+                    detail="Internal error while contacting AI prediction service.",
+                )
+            finally:
+                _balancer.release(backend_url)
+
+
+def _init_local_worker(backend_path: str) -> None:
+    """Process pool initializer: load the model once per worker."""
+    if backend_path not in sys.path:
+        sys.path.insert(0, backend_path)
+    from app.model_inference import load_model
+
+    load_model()
+
+
+def _local_predict(payload: dict, explain: str) -> dict:
+    from app.model_inference import predict_patient_json
+
+    result = predict_patient_json(payload, explain=explain)
+    # NumPy scalars -> plain Python types, as the HTTP path would return.
+    result["risk_level"] = str(result["risk_level"])
+    return result
+
+
+def _local_predict_batch(payloads: list[dict], explain: str) -> list[dict]:
+    from app.model_inference import predict_patients_json
+
+    results = predict_patients_json(payloads, explain=explain)
+    for result in results:
+        result["risk_level"] = str(result["risk_level"])
+    return results
+
+
+class LocalPredictor:
+    """
+    Runs backend/app/model_inference in a process pool so CPU-bound model
+    and SHAP work stays off the gateway's event loop.
     """
-    Calls the AI microservice POST /predict endpoint.
+
+    def __init__(self, backend_path: str = AI_LOCAL_BACKEND_PATH, workers: int = AI_LOCAL_WORKERS):
+        self.backend_path = backend_path
+        self.workers = max(1, workers)
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def start(self) -> None:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_local_worker,
+                initargs=(self.backend_path,),
+            )
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            # Waits for the predictions in flight; off the event loop.
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    async def predict(self, payload: dict, explain: str) -> dict:
+        return await self._run(_local_predict, payload, explain)
+
+    async def predict_batch(self, payloads: list[dict], explain: str) -> list[dict]:
+        return await self._run(_local_predict_batch, payloads, explain)
+
+    async def _run(self, fn, *args):
+        await self.start()
+        pool = self._pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            logger.error("Local inference worker pool is broken")
+            # Reap the surviving workers and fail queued calls before the next
+            # call starts a new pool; a concurrent caller may already have.
+            pool.shutdown(wait=False, cancel_futures=True)
+            if self._pool is pool:
+                self._pool = None
+            raise HTTPException(
+                status_code=503,
+                detail="Local AI prediction workers are unavailable.",
+            )
+        except Exception as exc:
+            logger.error("Local inference failed: %s", exc)
+            raise HTTPException(
+                status_code=500,
+                detail="Internal error while running local AI prediction.",
+            )
+
+
+_PREDICTORS = {
+    "remote": RemotePredictor,
+    "local": LocalPredictor,
+}
+
+_predictor = None
+
+
+def get_predictor():
+    """Return the configured predictor (AI_PREDICTOR=remote|local)."""
+    global _predictor
+    if _predictor is None:
+        if AI_PREDICTOR not in _PREDICTORS:
+            raise ValueError(f"Unknown AI_PREDICTOR '{AI_PREDICTOR}', expected one of {sorted(_PREDICTORS)}")
+        _predictor = _PREDICTORS[AI_PREDICTOR]()
+    return _predictor
+
+
+def set_predictor(predictor) -> None:
+    """Replace the active predictor (used by benchmarks and tests)."""
+    global _predictor
+    _predictor = predictor
+
+
+async def init_ai_client() -> None:
+    """Start the configured predictor (called on application startup)."""
+    await get_predictor().start()
+
+
+async def close_ai_client() -> None:
+    """Stop the configured predictor (called on application shutdown)."""
+    if _predictor is not None:
+        await _predictor.close()
+
+
+async def _timed_call(call):
+    """Await a predictor call, recording its latency and any error."""
+    try:
+        with stage("ai_call"):
+            return await call
+    except HTTPException as exc:
+        AI_ERRORS.labels(exc.status_code).inc()
+        raise
+    except Exception:
+        AI_ERRORS.labels(500).inc()
+        raise
+
+
+async def call_ai_predict(payload: dict, explain: str = "top_k") -> dict:
+    """
+    Runs a prediction through the configured predictor (remote HTTP call to
+    the AI microservice's POST /predict, or local process pool).
 
     Args:
         payload: Dict matching the AI backend's PatientInput schema:
             {age, gender, blood_pressure (int), heart_rate, temperature, symptoms, conditions}
+        explain: AI backend explanation mode, "top_k" or "none" (skips SHAP).
 
     Returns:
-        Dict with: {risk_level, confidence, recommended_department, explanation}
+        Dict with: {risk_level, confidence, recommended_department, explanation, model_version}
 
     Raises:
         HTTPException on timeout, connection error, or unexpected AI response.
     """
-    try:
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-            response = await client.post(PREDICT_ENDPOINT, json=payload)
-            response.raise_for_status()
-            return response.json()
-
-    except httpx.TimeoutException:
-        logger.error("AI service request timed out after %ss", REQUEST_TIMEOUT)
-        raise HTTPException(
-            status_code=504,
-            detail="AI prediction service timed out. Please try again.",
-        )
-    except httpx.ConnectError:
-        logger.error("Cannot connect to AI service at %s", AI_BACKEND_URL)
-        raise HTTPException(
-            status_code=503,
-            detail="AI prediction service is unavailable. Ensure it is running on port 8001.",
-        )
-    except httpx.HTTPStatusError as exc:
-        logger.error(
-            "AI service returned status %s: %s",
-            exc.response.status_code,
-            exc.response.text,
-        )
-        raise HTTPException(
-            status_code=502,
-            detail=f"AI service error: {exc.response.text}",
-        )
-    except Exception as exc:
-        logger.error("Unexpected error calling AI service: %s", exc)
-        raise HTTPException(
-            status_code=500,
-            detail="Internal error while contacting AI prediction service.",
-        )
+    return await _timed_call(get_predictor().predict(payload, explain))
+
+
+async def call_ai_predict_batch(payloads: list[dict], explain: str = "none") -> list[dict]:
+    """
+    Scores many patients in one call (the AI backend's POST /predict/batch,
+    or one local batch). Results are returned in input order.
+
+    Args:
+        payloads: List of dicts matching the AI backend's PatientInput schema.
+        explain: AI backend explanation mode, "top_k" or "none" (skips SHAP).
+
+    Raises:
+        HTTPException on timeout, connection error, or unexpected AI response.
+    """
+    if not payloads:
+        return []
+    return await _timed_call(get_predictor().predict_batch(payloads, explain))
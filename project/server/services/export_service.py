@@ -0,0 +1,201 @@
+"""
+Streaming export of predictions joined with their patients.
+
+The join is done server-side with $lookup and results are read through an
+aggregation cursor in batches of `batch_size`. Each batch is encoded and
+handed to the caller before the next is fetched, so memory use depends on
+the batch size, not on how many records are exported.
+
+Formats:
+  - ndjson: one flat JSON object per line
+  - arrow:  Arrow IPC stream, one record batch per cursor batch
+            (requires the optional pyarrow package)
+"""
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from database.connection import get_db
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency, only needed for Arrow output
+    pa = None
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FORMATS = ("ndjson", "arrow")
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class ExportUnavailableError(RuntimeError):
+    """Raised when the requested export format cannot be produced here."""
+
+
+# ============================================
+# QUERY
+# ============================================
+
+def build_export_pipeline(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    risk_levels: Optional[List[str]] = None,
+) -> list:
+    """Aggregation pipeline: filter predictions, join patients, flatten rows."""
+    match = {}
+    if start or end:
+        match["created_at"] = {}
+        if start:
+            match["created_at"]["$gte"] = start
+        if end:
+            match["created_at"]["$lt"] = end
+    if risk_levels:
+        match["risk_level"] = {"$in": risk_levels}
+
+    return [
+        {"$match": match},
+        # Served by the (created_at, _id) index, so no in-memory sort.
+        {"$sort": {"created_at": 1, "_id": 1}},
+        {
+            "$lookup": {
+                "from": "patients",
+                "localField": "patient_id",
+                "foreignField": "_id",
+                "as": "patient",
+            }
+        },
+        {"$unwind": {"path": "$patient", "preserveNullAndEmptyArrays": True}},
+        {
+            "$project": {
+                "_id": 0,
+                "prediction_id": "$_id",
+                "patient_id": 1,
+                "created_at": 1,
+                "risk_level": 1,
+                "recommended_department": 1,
+                "confidence_score": 1,
+                "explanation": 1,
+                "explanation_status": 1,
+                "model_version": 1,
+                "age": "$patient.age",
+                "gender": "$patient.gender",
+                "blood_pressure": "$patient.blood_pressure",
+                "heart_rate": "$patient.heart_rate",
+                "temperature": "$patient.temperature",
+                "symptoms": "$patient.symptoms",
+                "conditions": "$patient.conditions",
+            }
+        },
+    ]
+
+
+async def iter_export_batches(pipeline: list, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[list]:
+    """Yield lists of at most batch_size rows from the aggregation cursor."""
+    cursor = get_db().predictions.aggregate(pipeline, batchSize=batch_size, allowDiskUse=True)
+    batch = []
+    async for row in cursor:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ============================================
+# ENCODERS
+# ============================================
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)  # ObjectId
+
+
+async def encode_ndjson(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(json.dumps(row, default=_json_default) + "\n" for row in batch).encode()
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("prediction_id", pa.string()),
+        ("patient_id", pa.string()),
+        ("created_at", pa.timestamp("ms")),
+        ("risk_level", pa.string()),
+        ("recommended_department", pa.string()),
+        ("confidence_score", pa.float64()),
+        ("explanation", pa.list_(pa.struct([("feature", pa.string()), ("impact", pa.float64())]))),
+        ("explanation_status", pa.string()),
+        ("model_version", pa.string()),
+        ("age", pa.int32()),
+        ("gender", pa.string()),
+        ("blood_pressure", pa.string()),
+        ("heart_rate", pa.int32()),
+        ("temperature", pa.float64()),
+        ("symptoms", pa.list_(pa.string())),
+        ("conditions", pa.list_(pa.string())),
+    ])
+
+
+def _arrow_columns(batch: list, schema) -> list:
+    columns = []
+    for field in schema:
+        values = [row.get(field.name) for row in batch]
+        if field.name in ("prediction_id", "patient_id"):
+            values = [str(value) if value is not None else None for value in values]
+        columns.append(pa.array(values, type=field.type))
+    return columns
+
+
+async def encode_arrow(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    schema = _arrow_schema()
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        # Hand off what has been written so far and reuse the buffer.
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield drain()  # schema message
+    async for batch in batches:
+        writer.write_batch(pa.record_batch(_arrow_columns(batch, schema), schema=schema))
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+# ============================================
+# EXPORT
+# ============================================
+
+def export_predictions(
+    fmt: str = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    risk_levels: Optional[List[str]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Stream predictions joined with patients as encoded byte chunks.
+
+    Args:
+        fmt: "ndjson" or "arrow"
+        start: Include predictions created at or after this time
+        end: Include predictions created before this time
+        risk_levels: Only include these risk levels
+        batch_size: Rows per cursor batch (and per output chunk)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}', expected one of {EXPORT_FORMATS}")
+    if fmt == "arrow" and pa is None:
+        raise ExportUnavailableError("Arrow export requires the pyarrow package")
+    batches = iter_export_batches(build_export_pipeline(start, end, risk_levels), max(1, batch_size))
+    return encode_ndjson(batches) if fmt == "ndjson" else encode_arrow(batches)
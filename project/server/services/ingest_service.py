@@ -0,0 +1,361 @@
+"""
+Streaming bulk ingest of historical triage records.
+
+Records are read incrementally (NDJSON or CSV), validated, optionally
+scored through the AI backend's batch path, and written with unordered
+insert_many in fixed-size chunks. At most one chunk is being built and one
+being written at any time, so memory stays bounded regardless of input
+size.
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional
+
+from bson import ObjectId
+from pydantic import ValidationError
+
+from database.repositories import TriageRecordRepository
+from schemas.ingest_schema import IngestRecord, IngestReport
+from services.ai_service import call_ai_predict_batch
+from services.triage_service import _parse_systolic_bp
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1000"))
+# Largest chunk_size accepted by POST /api/ingest; a chunk is buffered in memory.
+INGEST_MAX_CHUNK_SIZE = 5000
+# Chunk size cap when scoring. Each chunk is one AI batch call, and the
+# backend rejects a batch above its INFERENCE_MAX_PENDING (default 1024)
+# patients; half of that leaves room for live triage traffic.
+INGEST_SCORE_CHUNK_SIZE = int(os.getenv("INGEST_SCORE_CHUNK_SIZE", "512"))
+INGEST_FORMATS = ("ndjson", "csv")
+# List-valued CSV columns hold multiple values separated by this character.
+CSV_LIST_SEPARATOR = ";"
+CSV_LIST_FIELDS = ("symptoms", "conditions")
+
+
+# ============================================
+# LINE SOURCES
+# ============================================
+
+async def iter_file_lines(path: str) -> AsyncIterator[str]:
+    """Yield lines from a local file without loading it into memory."""
+    with open(path, encoding="utf-8", newline="") as handle:
+        for line in handle:
+            yield line
+
+
+async def iter_stream_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream (e.g. an HTTP request body) into lines, keeping line endings like a file does."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8") + "\n"
+    if buffer:
+        yield buffer.decode("utf-8")
+
+
+# ============================================
+# PARSERS
+# ============================================
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Optional[dict]]:
+    """Yield one dict per non-empty line, or None for lines that are not JSON objects."""
+    async for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield None
+            continue
+        yield record if isinstance(record, dict) else None
+
+
+def _csv_row_to_record(header: list[str], values: list[str]) -> dict:
+    record = {}
+    for column, value in zip(header, values):
+        value = value.strip()
+        if column in CSV_LIST_FIELDS:
+            record[column] = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+        elif value:
+            record[column] = value
+    return record
+
+
+class _LineFeed:
+    """The input of parse_csv's csv.reader, filled with one complete row at a time."""
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[Optional[dict]]:
+    """
+    Yield one dict per CSV row; the first row is the header.
+
+    A quoted field may span several lines, so lines are buffered until the
+    quotes balance and then handed to a single csv.reader.
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header = None
+    quotes = 0
+    async for line in lines:
+        if not quotes and not line.strip():
+            continue
+        feed.lines.append(line)
+        # An odd quote count means a quoted field continues on the next line
+        # ("" inside a field counts twice, so it never changes the parity).
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        quotes = 0
+        values = next(reader)
+        if header is None:
+            header = [column.strip() for column in values]
+            continue
+        yield _csv_row_to_record(header, values)
+    if feed.lines:
+        # Unterminated quote at the end of the input.
+        yield None
+
+
+def parse_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Optional[dict]]:
+    if fmt not in INGEST_FORMATS:
+        raise ValueError(f"Unsupported ingest format '{fmt}', expected one of {INGEST_FORMATS}")
+    return parse_ndjson(lines) if fmt == "ndjson" else parse_csv(lines)
+
+
+# ============================================
+# DOCUMENT BUILDING
+# ============================================
+
+def _ai_payload(record: IngestRecord) -> dict:
+    return {
+        "age": record.age,
+        "gender": record.gender,
+        "blood_pressure": _parse_systolic_bp(record.blood_pressure),
+        "heart_rate": record.heart_rate,
+        "temperature": record.temperature,
+        "symptoms": record.symptoms,
+        "conditions": record.conditions,
+    }
+
+
+def _patient_doc(record: IngestRecord, created_at: datetime) -> dict:
+    return {
+        "_id": ObjectId(),
+        "age": record.age,
+        "gender": record.gender,
+        "blood_pressure": record.blood_pressure,
+        "heart_rate": record.heart_rate,
+        "temperature": record.temperature,
+        "symptoms": record.symptoms,
+        "conditions": record.conditions,
+        "notes": record.notes,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def _stored_prediction(record: IngestRecord) -> Optional[dict]:
+    if record.risk_level is None or record.recommended_department is None:
+        return None
+    return {
+        "risk_level": record.risk_level,
+        "recommended_department": record.recommended_department,
+        "confidence_score": record.confidence_score or 0.0,
+        "explanation": [item.model_dump() for item in record.explanation],
+        "explanation_status": "complete" if record.explanation else "none",
+        "model_version": record.model_version,
+    }
+
+
+def _scored_prediction(ai_result: dict, explain: str) -> dict:
+    return {
+        "risk_level": ai_result["risk_level"],
+        "recommended_department": ai_result["recommended_department"],
+        "confidence_score": ai_result["confidence"],
+        "explanation": ai_result.get("explanation", []),
+        "explanation_status": "complete" if explain == "top_k" else "none",
+        "model_version": ai_result.get("model_version"),
+    }
+
+
+async def _build_chunk(records: list[IngestRecord], score: bool, explain: str) -> tuple[list, list, int]:
+    """Build patient and prediction documents for one chunk; returns (patients, predictions, scored)."""
+    now = datetime.utcnow()
+    patient_docs, prediction_docs = [], []
+    predictions = [_stored_prediction(record) for record in records]
+
+    to_score = [i for i, prediction in enumerate(predictions) if prediction is None] if score else []
+    if to_score:
+        ai_results = await call_ai_predict_batch(
+            [_ai_payload(records[i]) for i in to_score], explain=explain
+        )
+        for i, ai_result in zip(to_score, ai_results):
+            predictions[i] = _scored_prediction(ai_result, explain)
+
+    for record, prediction in zip(records, predictions):
+        created_at = record.created_at or now
+        patient = _patient_doc(record, created_at)
+        patient_docs.append(patient)
+        if prediction is not None:
+            prediction.update({
+                "_id": ObjectId(),
+                "patient_id": patient["_id"],
+                "input_data": _ai_payload(record),
+                "created_at": created_at,
+            })
+            prediction_docs.append(prediction)
+
+    return patient_docs, prediction_docs, len(to_score)
+
+
+# ============================================
+# INGEST
+# ============================================
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class IngestAborted(Exception):
+    """An ingest stopped by an error; report covers the chunks written before it."""
+
+    def __init__(self, report: IngestReport, cause: Exception):
+        super().__init__(f"Ingest stopped after record {report.last_committed_record}: {cause}")
+        self.report = report
+        self.cause = cause
+
+
+def _report(counts: dict, start: float, error: Optional[str] = None) -> IngestReport:
+    elapsed = time.perf_counter() - start
+    return IngestReport(
+        records_read=counts["read"],
+        invalid_records=counts["invalid"],
+        patients_inserted=counts["patients"],
+        predictions_inserted=counts["predictions"],
+        records_scored=counts["scored"],
+        write_errors=counts["errors"],
+        last_committed_record=counts["committed"],
+        elapsed_seconds=round(elapsed, 3),
+        records_per_second=round(counts["read"] / elapsed, 1) if elapsed else 0.0,
+        peak_rss_mb=_peak_rss_mb(),
+        error=error,
+    )
+
+
+async def ingest_records(
+    records: AsyncIterator[Optional[dict]],
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    score: bool = False,
+    explain: str = "none",
+) -> IngestReport:
+    """
+    Validate, optionally score, and bulk insert records chunk by chunk.
+
+    Args:
+        records: Async iterator of raw record dicts (None marks an unparseable line)
+        chunk_size: Records per insert_many call (at most INGEST_SCORE_CHUNK_SIZE when scoring)
+        score: Run the model for records without a stored prediction
+        explain: Explanation mode used when scoring ("none" or "top_k")
+
+    Returns:
+        IngestReport with counts and throughput
+
+    Raises:
+        IngestAborted if reading, scoring or writing fails. Its report counts
+        what was written before the failure; last_committed_record is where
+        to resume.
+    """
+    chunk_size = max(1, chunk_size)
+    if score:
+        chunk_size = min(chunk_size, INGEST_SCORE_CHUNK_SIZE)
+    start = time.perf_counter()
+    counts = {"read": 0, "invalid": 0, "patients": 0, "predictions": 0, "scored": 0, "errors": 0, "committed": 0}
+    chunk: list[IngestRecord] = []
+    # The insert task in flight and the number of the last record in its chunk.
+    pending_write: Optional[tuple[asyncio.Task, int]] = None
+
+    async def finish_write():
+        nonlocal pending_write
+        if pending_write is not None:
+            task, last_record = pending_write
+            pending_write = None
+            patients, predictions, errors = await task
+            counts["patients"] += patients
+            counts["predictions"] += predictions
+            counts["errors"] += errors
+            counts["committed"] = last_record
+
+    async def flush():
+        nonlocal pending_write
+        patient_docs, prediction_docs, scored = await _build_chunk(chunk, score, explain)
+        counts["scored"] += scored
+        # Keep one write in flight while the next chunk is read and scored.
+        await finish_write()
+        pending_write = (
+            asyncio.create_task(TriageRecordRepository.insert_many(patient_docs, prediction_docs)),
+            counts["read"],
+        )
+
+    try:
+        async for raw in records:
+            counts["read"] += 1
+            try:
+                chunk.append(IngestRecord.model_validate(raw))
+            except ValidationError:
+                counts["invalid"] += 1
+                continue
+            if len(chunk) >= chunk_size:
+                await flush()
+                chunk = []
+
+        if chunk:
+            await flush()
+        await finish_write()
+    except Exception as exc:
+        # The write in flight holds an earlier chunk: let it finish so the
+        # report says exactly which records are stored.
+        try:
+            await finish_write()
+        except Exception as write_exc:
+            logger.error("Bulk ingest write failed while stopping: %s", write_exc)
+        report = _report(counts, start, error=str(getattr(exc, "detail", None) or exc))
+        logger.error("Bulk ingest stopped: %s", report.model_dump())
+        raise IngestAborted(report, exc) from exc
+    finally:
+        # Only left over when the ingest itself was cancelled.
+        if pending_write is not None:
+            pending_write[0].cancel()
+
+    report = _report(counts, start)
+    logger.info("Bulk ingest finished: %s", report.model_dump())
+    return report
@@ -0,0 +1,300 @@
+"""
+Live feed of new triage predictions, streamed to dashboards as
+server-sent events (GET /api/predictions/stream).
+
+Predictions are fanned out in-process: every connected client has a
+bounded queue and receives each matching prediction as one pre-encoded SSE
+message, so a publish costs one JSON encoding plus a put per matching
+client. Clients are bucketed by their (risk_level, department) filter,
+which keeps publishing proportional to the clients that want the event.
+
+A client that falls LIVE_FEED_QUEUE_SIZE events behind (slow network, or a
+tab in the background) gets an "overflow" event and is disconnected
+instead of holding memory or slowing the publisher; browsers reconnect
+with Last-Event-ID and the missed predictions are replayed from MongoDB.
+At most LIVE_FEED_BACKFILL_LIMIT are replayed; when more were missed the
+replay ends with a "truncated" event so the client reloads the list.
+Streams also end after LIVE_FEED_STREAM_SECONDS so clients reconnect
+periodically, which spreads them over replicas and lets shutdown finish.
+
+LIVE_FEED_SOURCE selects where events come from:
+    local          predictions persisted by this process (run_triage /
+                   run_triage_raw), once they are in MongoDB (after the
+                   flush in async_batched mode); each replica only sees
+                   its own
+    change_stream  a MongoDB change stream on the predictions collection,
+                   so every replica sees every insert (requires a replica
+                   set or Atlas)
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from database.connection import get_db
+from database.projections import CURSOR_FIELDS, PREDICTION_SUMMARY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+LIVE_FEED_SOURCE = os.getenv("LIVE_FEED_SOURCE", "local").lower()
+LIVE_FEED_QUEUE_SIZE = int(os.getenv("LIVE_FEED_QUEUE_SIZE", "256"))
+LIVE_FEED_MAX_SUBSCRIBERS = int(os.getenv("LIVE_FEED_MAX_SUBSCRIBERS", "10000"))
+LIVE_FEED_HEARTBEAT_SECONDS = float(os.getenv("LIVE_FEED_HEARTBEAT_SECONDS", "15"))
+LIVE_FEED_STREAM_SECONDS = float(os.getenv("LIVE_FEED_STREAM_SECONDS", "300"))
+# Predictions replayed to a client reconnecting with Last-Event-ID.
+LIVE_FEED_BACKFILL_LIMIT = int(os.getenv("LIVE_FEED_BACKFILL_LIMIT", "500"))
+LIVE_FEED_RETRY_MS = int(os.getenv("LIVE_FEED_RETRY_MS", "2000"))
+
+LIVE_FEED_SOURCES = ("local", "change_stream")
+# Fields sent per prediction: the summary view plus the model version.
+LIVE_FEED_FIELDS = CURSOR_FIELDS + PREDICTION_SUMMARY_FIELDS + ("model_version",)
+
+# Queue markers that end a stream.
+OVERFLOW = "overflow"
+CLOSED = "closed"
+
+
+class LiveFeedFull(Exception):
+    """Raised when LIVE_FEED_MAX_SUBSCRIBERS clients are already connected."""
+
+
+def prediction_event(prediction: dict) -> dict:
+    """The JSON-ready subset of a prediction document sent to clients."""
+    event = {}
+    for name in LIVE_FEED_FIELDS:
+        value = prediction.get(name)
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        event[name] = value
+    return event
+
+
+def encode_event(prediction: dict) -> tuple[str, bytes]:
+    """(event id, SSE message) for a prediction document."""
+    event = prediction_event(prediction)
+    data = json.dumps(event, separators=(",", ":"))
+    return event["_id"], f"id: {event['_id']}\nevent: prediction\ndata: {data}\n\n".encode()
+
+
+class Subscriber:
+    """One connected client: its filter and its bounded queue of messages."""
+
+    def __init__(self, risk_level: Optional[str], department: Optional[str], queue_size: int):
+        self.key = (risk_level, department)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def close(self, marker: str) -> None:
+        """Replace anything still queued with an end-of-stream marker."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(marker)
+
+
+class LiveFeed:
+    """In-process pub/sub for new predictions."""
+
+    def __init__(
+        self,
+        source: str = LIVE_FEED_SOURCE,
+        queue_size: int = LIVE_FEED_QUEUE_SIZE,
+        max_subscribers: int = LIVE_FEED_MAX_SUBSCRIBERS,
+    ):
+        if source not in LIVE_FEED_SOURCES:
+            raise ValueError(f"Unknown LIVE_FEED_SOURCE '{source}', expected one of {LIVE_FEED_SOURCES}")
+        self.source = source
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: dict[tuple, set[Subscriber]] = defaultdict(set)
+        self._count = 0
+        self._watcher: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+        self.overflowed = 0
+
+    # ---- Subscriptions ----
+
+    def is_full(self) -> bool:
+        return self._count >= self.max_subscribers
+
+    def subscribe(self, risk_level: Optional[str] = None, department: Optional[str] = None) -> Subscriber:
+        if self.is_full():
+            raise LiveFeedFull()
+        subscriber = Subscriber(risk_level, department, self.queue_size)
+        self._subscribers[subscriber.key].add(subscriber)
+        self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        bucket = self._subscribers.get(subscriber.key)
+        if bucket is None or subscriber not in bucket:
+            return
+        bucket.discard(subscriber)
+        if not bucket:
+            del self._subscribers[subscriber.key]
+        self._count -= 1
+
+    # ---- Publishing ----
+
+    def publish(self, prediction: dict) -> None:
+        """Queue a persisted prediction for every client whose filter matches it."""
+        self.published += 1
+        if not self._count:
+            return
+        risk_level = prediction.get("risk_level")
+        department = prediction.get("recommended_department")
+        buckets = [
+            self._subscribers.get(key)
+            for key in {(None, None), (risk_level, None), (None, department), (risk_level, department)}
+        ]
+        if not any(buckets):
+            return
+
+        item = encode_event(prediction)
+        for bucket in buckets:
+            for subscriber in list(bucket or ()):
+                try:
+                    subscriber.queue.put_nowait(item)
+                    self.delivered += 1
+                except asyncio.QueueFull:
+                    # Too far behind: drop it and let it catch up from MongoDB.
+                    self.overflowed += 1
+                    self.unsubscribe(subscriber)
+                    subscriber.close(OVERFLOW)
+
+    def publish_persisted(self, prediction: dict) -> None:
+        """Publish a prediction this process just stored (skipped when a change stream is the source)."""
+        if self.source == "local":
+            self.publish(prediction)
+
+    # ---- Change Stream ----
+
+    async def start(self) -> None:
+        if self.source == "change_stream" and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Stop the change stream and end every open stream."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        for bucket in list(self._subscribers.values()):
+            for subscriber in list(bucket):
+                self.unsubscribe(subscriber)
+                subscriber.close(CLOSED)
+
+    async def _watch(self) -> None:
+        pipeline = [
+            {"$match": {"operationType": "insert"}},
+            {"$project": {f"fullDocument.{name}": 1 for name in LIVE_FEED_FIELDS}},
+        ]
+        resume_token = None
+        backoff = 0.5
+        while True:
+            try:
+                async with get_db().predictions.watch(pipeline, resume_after=resume_token) as stream:
+                    backoff = 0.5
+                    async for change in stream:
+                        resume_token = change["_id"]
+                        self.publish(change["fullDocument"])
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as exc:
+                logger.warning("Prediction change stream failed (%s), reconnecting in %.1fs", exc, backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "subscribers": self._count,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflowed": self.overflowed,
+        }
+
+
+live_feed = LiveFeed()
+
+
+async def _backfill(last_event_id: Optional[str], risk_level: Optional[str],
+                    department: Optional[str]) -> tuple[list[tuple[str, bytes]], bool]:
+    """
+    Predictions stored after last_event_id, oldest first, and whether more
+    than LIVE_FEED_BACKFILL_LIMIT of them were left out.
+    """
+    if not last_event_id or not ObjectId.is_valid(last_event_id):
+        return [], False
+    query = {"_id": {"$gt": ObjectId(last_event_id)}}
+    if risk_level:
+        query["risk_level"] = risk_level
+    if department:
+        query["recommended_department"] = department
+    cursor = get_db().predictions.find(
+        query, {name: 1 for name in LIVE_FEED_FIELDS}
+    ).sort("_id", 1).limit(LIVE_FEED_BACKFILL_LIMIT + 1)
+    events = [encode_event(prediction) async for prediction in cursor]
+    return events[:LIVE_FEED_BACKFILL_LIMIT], len(events) > LIVE_FEED_BACKFILL_LIMIT
+
+
+async def event_stream(
+    risk_level: Optional[str] = None,
+    department: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+    feed: LiveFeed = live_feed,
+    heartbeat: float = LIVE_FEED_HEARTBEAT_SECONDS,
+    max_seconds: float = LIVE_FEED_STREAM_SECONDS,
+):
+    """
+    SSE body for one client: missed predictions since last_event_id, then
+    live ones, with a comment line every heartbeat seconds to keep proxies
+    from closing an idle connection.
+
+    The client is only subscribed once the body is iterated, so a response
+    that is never sent does not hold a subscription.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    yield f"retry: {LIVE_FEED_RETRY_MS}\n\n".encode()
+    try:
+        subscriber = feed.subscribe(risk_level, department)
+    except LiveFeedFull:
+        # Filled up since the route checked: let the client retry later.
+        return
+    try:
+        # Subscribed before the query runs, so nothing falls in between;
+        # predictions that show up in both are only sent once.
+        events, truncated = await _backfill(last_event_id, risk_level, department)
+        replayed = set()
+        for event_id, message in events:
+            replayed.add(event_id)
+            yield message
+        if truncated:
+            yield f'event: truncated\ndata: {{"limit":{LIVE_FEED_BACKFILL_LIMIT}}}\n\n'.encode()
+
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if item == OVERFLOW:
+                yield b"event: overflow\ndata: {}\n\n"
+                return
+            if item == CLOSED:
+                return
+            event_id, message = item
+            if event_id not in replayed:
+                yield message
+    finally:
+        feed.unsubscribe(subscriber)
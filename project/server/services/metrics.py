@@ -0,0 +1,43 @@
+"""
+Prometheus metrics for the gateway.
+
+The metric types, GET /metrics rendering, request middleware and trace
+IDs come from the shared observability package (also used by the AI
+backend); this module only defines the gateway's own metrics. See
+observability.metrics for running several gateway processes behind one
+port (PROMETHEUS_MULTIPROC_DIR).
+
+The trace ID of each request is forwarded to the AI backend so one request
+can be followed across both services' logs.
+"""
+from observability.metrics import (
+    CONTENT_TYPE, DEFAULT_BUCKETS, TRACE_HEADER, Counter, Histogram, HttpMetrics,
+    MetricsMiddleware, current_trace_id, render_metrics,
+)
+
+# -------- Gateway Metrics --------
+HTTP_METRICS = HttpMetrics("gateway")
+STAGE_SECONDS = Histogram(
+    "gateway_stage_duration_seconds",
+    "Time per triage stage (build_payload, ai_call, persist, mongo_insert_*).",
+    ["stage"], buckets=DEFAULT_BUCKETS,
+)
+AI_ERRORS = Counter(
+    "gateway_ai_errors", "Failed AI predictor calls by the status returned to the client.",
+    ["status"],
+)
+ROLLUP_ERRORS = Counter(
+    "gateway_rollup_errors", "Stored prediction batches whose statistics rollup update failed.",
+)
+
+
+# -------- Stage Timing --------
+def stage(name):
+    """Context manager timing one stage into gateway_stage_duration_seconds."""
+    return STAGE_SECONDS.labels(name).time()
+
+
+async def timed(name, awaitable):
+    """Await awaitable and record how long it took as stage name."""
+    with stage(name):
+        return await awaitable
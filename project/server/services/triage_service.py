@@ -1,10 +1,32 @@
+import asyncio
+import hashlib
+import json
 import logging
+import uuid
+from typing import Awaitable, Callable, Optional
+from fastapi import HTTPException
+from pydantic import BaseModel
 from schemas.triage_schema import TriageRequest, TriageResponse
 from services.ai_service import call_ai_predict
-from database.repositories import PatientRepository, PredictionRepository
+from services.live_feed import live_feed
+from services.metrics import stage
+from services.single_flight import SingleFlight
+from database.repositories import (
+    PERSISTENCE_MODE, IdempotencyRepository, PredictionRepository, TriageRecordRepository,
+)
 
 logger = logging.getLogger(__name__)
 
+# Strong references to in-flight background tasks (deferred explanations,
+# live feed events waiting for a flush) so they are not garbage-collected
+# before they finish.
+_background_tasks: set[asyncio.Task] = set()
+
+# Identical concurrent AI calls share one request to the backend, and
+# concurrent requests with the same Idempotency-Key share one execution.
+ai_calls = SingleFlight("ai_predict")
+idempotent_requests = SingleFlight("idempotency")
+
 
 def _parse_systolic_bp(blood_pressure: str) -> int:
     """Extract systolic (first number) from 'systolic/diastolic' string."""
@@ -28,14 +50,39 @@ def _build_ai_payload(data: TriageRequest) -> dict:
     }
 
 
-async def run_triage(data: TriageRequest) -> TriageResponse:
-    """
-    Call the AI microservice, transform its response,
-    and store patient and prediction data in MongoDB.
-    """
-    payload = _build_ai_payload(data)
-    ai_result = await call_ai_predict(payload)
+def _ai_explain_mode(data: TriageRequest) -> str:
+    """Deferred explanations are skipped on the synchronous AI call."""
+    return "none" if data.explain == "deferred" else data.explain
+
+
+def _canonical_hash(value: dict) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def _prediction_key(payload: dict, explain: str) -> str:
+    """Payloads that differ only in label order or whitespace get the same key."""
+    return _canonical_hash({
+        **payload,
+        "symptoms": sorted(label.strip() for label in payload["symptoms"]),
+        "conditions": sorted(label.strip() for label in payload["conditions"]),
+        "explain": explain,
+    })
 
+
+async def _predict(payload: dict, explain: str) -> dict:
+    """call_ai_predict, coalesced with identical in-flight calls."""
+    return await ai_calls.do(
+        _prediction_key(payload, explain),
+        lambda: call_ai_predict(payload, explain=explain),
+    )
+
+
+def _explanation_status(data: TriageRequest) -> str:
+    return {"none": "none", "top_k": "complete", "deferred": "pending"}[data.explain]
+
+
+async def _persist_triage(data: TriageRequest, payload: dict, ai_result: dict) -> str:
+    """Store patient and prediction data in one round trip and return the prediction ID."""
     # Store patient data
     patient_data = {
         "age": data.age,
@@ -47,21 +94,149 @@ async def run_triage(data: TriageRequest) -> TriageResponse:
         "conditions": data.conditions,
         "notes": data.notes,
     }
-    patient_id = await PatientRepository.create(patient_data)
-    logger.info(f"Created patient record: {patient_id}")
 
     # Store prediction data
     prediction_data = {
-        "patient_id": patient_id,
         "risk_level": ai_result["risk_level"],
         "recommended_department": ai_result["recommended_department"],
         "confidence_score": ai_result["confidence"],
         "explanation": ai_result.get("explanation", []),
-        "model_version": "1.0.0",
+        "explanation_status": _explanation_status(data),
+        # Version that scored the request, as reported by the AI backend.
+        "model_version": ai_result.get("model_version"),
         "input_data": payload,
     }
-    prediction_id = await PredictionRepository.create(prediction_data)
+    with stage("persist"):
+        patient_id, prediction_id = await TriageRecordRepository.create(patient_data, prediction_data)
+    logger.info(f"Created patient record: {patient_id}")
     logger.info(f"Created prediction record: {prediction_id}")
+    _publish_when_persisted(prediction_data)
+
+    return prediction_id
+
+
+def _publish_when_persisted(prediction_data: dict) -> None:
+    """
+    Push a prediction to dashboards following GET /api/predictions/stream
+    once it is in MongoDB. In async_batched mode it is only queued here, and
+    a client reconnecting before the flush would not find it in the replay.
+    """
+    if PERSISTENCE_MODE != "async_batched":
+        live_feed.publish_persisted(prediction_data)
+        return
+    task = asyncio.create_task(_publish_after_flush(prediction_data))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _publish_after_flush(prediction_data: dict) -> None:
+    prediction_id = str(prediction_data["_id"])
+    try:
+        await TriageRecordRepository.wait_persisted(prediction_id)
+    except Exception as exc:
+        # Never stored, so it is not announced either.
+        logger.warning("Not publishing prediction %s, it was not stored: %s", prediction_id, exc)
+        return
+    live_feed.publish_persisted(prediction_data)
+
+
+async def _complete_explanation(prediction_id: str, payload: dict) -> None:
+    """Compute a deferred explanation and write it onto the stored prediction."""
+    try:
+        ai_result = await _predict(payload, "top_k")
+        explanation, status = ai_result.get("explanation", []), "complete"
+    except Exception as exc:
+        logger.error("Deferred explanation failed for %s: %s", prediction_id, exc)
+        explanation, status = [], "failed"
+
+    try:
+        await TriageRecordRepository.wait_persisted(prediction_id)
+    except Exception as exc:
+        # The prediction was dropped by the write-behind flush; nothing to update.
+        logger.warning("Not storing the explanation of %s, the prediction was not stored: %s", prediction_id, exc)
+        return
+
+    try:
+        await PredictionRepository.update_explanation(prediction_id, explanation, status=status)
+        if status == "complete":
+            logger.info(f"Stored deferred explanation for prediction: {prediction_id}")
+    except Exception as exc:
+        logger.error("Could not store the %s explanation of %s: %s", status, prediction_id, exc)
+
+
+def _schedule_explanation(data: TriageRequest, prediction_id: str, payload: dict) -> None:
+    if data.explain != "deferred":
+        return
+    task = asyncio.create_task(_complete_explanation(prediction_id, payload))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _run_idempotent(
+    scope: str,
+    idempotency_key: Optional[str],
+    data: TriageRequest,
+    handler: Callable[[TriageRequest], Awaitable],
+):
+    """
+    Run handler once per Idempotency-Key: repeats of a completed request get
+    the stored response and write nothing. Without a key, just run handler.
+    """
+    if not idempotency_key:
+        return await handler(data)
+    key = f"{scope}:{idempotency_key}"
+    request_hash = _canonical_hash(data.model_dump())
+    # Only identical bodies share an execution; a different body under the
+    # same key runs on its own and gets 422 from the claim.
+    return await idempotent_requests.do(
+        f"{key}:{request_hash}", lambda: _run_once(key, request_hash, data, handler)
+    )
+
+
+async def _run_once(key: str, request_hash: str, data: TriageRequest,
+                    handler: Callable[[TriageRequest], Awaitable]):
+    owner = uuid.uuid4().hex
+    existing = await IdempotencyRepository.claim(key, request_hash, owner)
+    if existing is not None:
+        if existing["request_hash"] != request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request"
+            )
+        if existing["status"] != "completed":
+            # Its lease has not run out yet; after that a retry takes it over.
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress"
+            )
+        logger.info("Replaying stored response for idempotency key %s", key)
+        return existing["response"]
+
+    try:
+        response = await handler(data)
+    except BaseException:
+        await IdempotencyRepository.release(key, owner)
+        raise
+    stored = response.model_dump() if isinstance(response, BaseModel) else response
+    await IdempotencyRepository.complete(key, owner, stored)
+    return response
+
+
+async def run_triage(data: TriageRequest, idempotency_key: Optional[str] = None) -> TriageResponse:
+    """
+    Call the AI microservice, transform its response,
+    and store patient and prediction data in MongoDB.
+    """
+    return await _run_idempotent("triage", idempotency_key, data, _run_triage)
+
+
+async def _run_triage(data: TriageRequest) -> TriageResponse:
+    with stage("build_payload"):
+        payload = _build_ai_payload(data)
+    ai_result = await _predict(payload, _ai_explain_mode(data))
+
+    prediction_id = await _persist_triage(data, payload, ai_result)
+    _schedule_explanation(data, prediction_id, payload)
 
     explanation_strings = [
         f"{item['feature']} (impact: {item['impact']})"
@@ -73,47 +248,31 @@ async def run_triage(data: TriageRequest) -> TriageResponse:
         department=ai_result["recommended_department"],
         confidence=round(ai_result["confidence"] / 100.0, 4),
         explanation=explanation_strings,
+        prediction_id=prediction_id,
     )
 
 
-async def run_triage_raw(data: TriageRequest) -> dict:
+async def run_triage_raw(data: TriageRequest, idempotency_key: Optional[str] = None) -> dict:
     """
     Call the AI microservice, return the raw structured response,
     and store patient and prediction data in MongoDB.
     """
-    payload = _build_ai_payload(data)
-    ai_result = await call_ai_predict(payload)
+    return await _run_idempotent("triage_raw", idempotency_key, data, _run_triage_raw)
 
-    # Store patient data
-    patient_data = {
-        "age": data.age,
-        "gender": data.gender,
-        "blood_pressure": data.blood_pressure,
-        "heart_rate": data.heart_rate,
-        "temperature": data.temperature,
-        "symptoms": data.symptoms,
-        "conditions": data.conditions,
-        "notes": data.notes,
-    }
-    patient_id = await PatientRepository.create(patient_data)
-    logger.info(f"Created patient record: {patient_id}")
 
-    # Store prediction data
-    prediction_data = {
-        "patient_id": patient_id,
-        "risk_level": ai_result["risk_level"],
-        "recommended_department": ai_result["recommended_department"],
-        "confidence_score": ai_result["confidence"],
-        "explanation": ai_result.get("explanation", []),
-        "model_version": "1.0.0",
-        "input_data": payload,
-    }
-    prediction_id = await PredictionRepository.create(prediction_data)
-    logger.info(f"Created prediction record: {prediction_id}")
+async def _run_triage_raw(data: TriageRequest) -> dict:
+    with stage("build_payload"):
+        payload = _build_ai_payload(data)
+    ai_result = await _predict(payload, _ai_explain_mode(data))
+
+    prediction_id = await _persist_triage(data, payload, ai_result)
+    _schedule_explanation(data, prediction_id, payload)
 
     return {
         "risk_level": ai_result["risk_level"],
         "recommended_department": ai_result["recommended_department"],
         "confidence_score": ai_result["confidence"],
         "explanation": ai_result.get("explanation", []),
+        "model_version": ai_result.get("model_version"),
+        "prediction_id": prediction_id,
     }
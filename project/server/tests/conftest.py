@@ -0,0 +1,43 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from database import connection
+from database.cache import MemoryCacheBackend, cache
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A fresh in-memory MongoDB (mongomock) behind database.connection.get_db."""
+    database = AsyncMongoMockClient()[connection.DB_NAME]
+    monkeypatch.setattr(connection, "db", database)
+    cache.set_backend(MemoryCacheBackend())
+    return database
+
+
+def make_record(patient_name="Test Patient", risk_level="Low"):
+    """Patient and prediction documents shaped like TriageRecordRepository.create builds them."""
+    from datetime import datetime
+    from bson import ObjectId
+
+    now = datetime.utcnow()
+    patient = {"_id": ObjectId(), "name": patient_name, "age": 40, "created_at": now, "updated_at": now}
+    prediction = {
+        "_id": ObjectId(),
+        "patient_id": patient["_id"],
+        "risk_level": risk_level,
+        "recommended_department": "General Medicine",
+        "confidence_score": 87.5,
+        "created_at": now,
+    }
+    return patient, prediction
+
+
+def metric_value(name: str) -> float:
+    """Current value of an unlabelled metric, read from GET /metrics."""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    for line in TestClient(app).get("/metrics").text.splitlines():
+        if line.split(" ")[0] == name:
+            return float(line.split(" ")[1])
+    raise KeyError(name)
@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from services import ai_service
+from services.ai_service import BackendBalancer, RemotePredictor
+
+URLS = ["http://ai-1", "http://ai-2", "http://ai-3"]
+RESULT = {"risk_level": "Low", "recommended_department": "General Medicine", "confidence": 90.0}
+
+
+def test_ties_rotate_across_replicas():
+    balancer = BackendBalancer(URLS)
+    picked = []
+    for _ in range(6):
+        url = balancer.acquire()
+        picked.append(url)
+        balancer.release(url)
+    assert picked == URLS * 2
+
+
+def test_least_outstanding_replica_is_picked():
+    balancer = BackendBalancer(URLS)
+    busy = [balancer.acquire() for _ in range(3)]
+    assert sorted(busy) == URLS
+    # ai-1 and ai-3 finish; ai-2 is still busy, so it is skipped.
+    balancer.release("http://ai-1")
+    balancer.release("http://ai-3")
+    picked = {balancer.acquire() for _ in range(2)}
+    assert picked == {"http://ai-1", "http://ai-3"}
+    assert balancer.outstanding == dict.fromkeys(URLS, 1)
+
+
+def test_excluded_replicas_are_skipped_while_others_remain():
+    balancer = BackendBalancer(URLS)
+    assert balancer.acquire(exclude={"http://ai-1", "http://ai-2"}) == "http://ai-3"
+    # Everything excluded: still returns a replica rather than failing.
+    assert balancer.acquire(exclude=set(URLS)) in URLS
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    """Fake replicas behind the shared client; hosts in `down` refuse connections."""
+    state = {"down": set(), "calls": []}
+
+    def handler(request):
+        url = f"http://{request.url.host}"
+        state["calls"].append(url)
+        if url in state["down"]:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json=RESULT)
+
+    monkeypatch.setattr(ai_service, "_balancer", BackendBalancer(URLS))
+    monkeypatch.setattr(ai_service, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return state
+
+
+def test_unreachable_replica_fails_over(backends):
+    backends["down"] = {"http://ai-1", "http://ai-2"}
+    result = asyncio.run(RemotePredictor().predict({"age": 40}, "none"))
+    assert result == RESULT
+    assert backends["calls"] == URLS
+    assert set(ai_service._balancer.outstanding.values()) == {0}
+
+
+def test_all_replicas_unreachable_is_503(backends):
+    backends["down"] = set(URLS)
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(RemotePredictor().predict({"age": 40}, "none"))
+    assert info.value.status_code == 503
+    # Each replica is tried once.
+    assert sorted(backends["calls"]) == URLS
+
+
+def test_http_errors_are_not_retried_elsewhere(backends, monkeypatch):
+    def handler(request):
+        backends["calls"].append(request.url.host)
+        return httpx.Response(500, text="boom")
+
+    monkeypatch.setattr(ai_service, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(RemotePredictor().predict({"age": 40}, "none"))
+    assert info.value.status_code == 502
+    assert len(backends["calls"]) == 1
@@ -0,0 +1,111 @@
+import asyncio
+
+from bson import ObjectId
+
+from database.cache import MemoryCacheBackend, ReadThroughCache, RedisCacheBackend, cache, patient_key
+from database.repositories import PatientRepository, PredictionRepository, UserRepository
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_lookup_is_cached_and_returns_copies(db):
+    patient_id = _run(PatientRepository.create({"name": "Ada", "age": 36}))
+    first = _run(PatientRepository.find_by_id(patient_id))
+    first["name"] = "mutated by caller"
+    second = _run(PatientRepository.find_by_id(patient_id))
+    assert second["name"] == "Ada"
+    assert (cache.misses["patient"], cache.hits["patient"]) == (1, 1)
+
+
+def test_update_and_delete_invalidate(db):
+    patient_id = _run(PatientRepository.create({"name": "Ada", "age": 36}))
+    _run(PatientRepository.find_by_id(patient_id))
+
+    _run(PatientRepository.update(patient_id, {"age": 37}))
+    assert _run(PatientRepository.find_by_id(patient_id))["age"] == 37
+
+    _run(PatientRepository.delete(patient_id))
+    assert _run(PatientRepository.find_by_id(patient_id)) is None
+    assert cache.invalidations["patient"] == 2
+
+
+def test_prediction_updates_invalidate(db):
+    prediction_id = _run(PredictionRepository.create({
+        "patient_id": str(ObjectId()), "risk_level": "High", "confidence_score": 90.0, "explanation_status": "pending",
+    }))
+    _run(PredictionRepository.find_by_id(prediction_id))
+    _run(PredictionRepository.update_explanation(prediction_id, [{"feature": "age", "impact": 0.2}]))
+    prediction = _run(PredictionRepository.find_by_id(prediction_id))
+    assert prediction["explanation_status"] == "complete"
+    assert prediction["explanation"] == [{"feature": "age", "impact": 0.2}]
+
+
+def test_email_lookup_follows_user_changes(db):
+    user_id = _run(UserRepository.create({"email": "ada@example.com", "name": "Ada"}))
+    assert _run(UserRepository.find_by_email("ada@example.com"))["_id"] == user_id
+    # Served from the cache: the email key maps to the ID key.
+    assert _run(UserRepository.find_by_email("ada@example.com"))["name"] == "Ada"
+    assert cache.hits["user"] == 1
+
+    _run(UserRepository.update(user_id, {"email": "lovelace@example.com"}))
+    assert _run(UserRepository.find_by_email("ada@example.com")) is None
+    assert _run(UserRepository.find_by_email("lovelace@example.com"))["_id"] == user_id
+
+    _run(UserRepository.delete(user_id))
+    assert _run(UserRepository.find_by_email("lovelace@example.com")) is None
+
+
+def test_load_overlapping_an_invalidation_is_not_cached():
+    read_through = ReadThroughCache(MemoryCacheBackend())
+    versions = iter([{"v": 1}, {"v": 2}])
+
+    async def scenario():
+        async def load():
+            document = next(versions)
+            # A write lands between the read and the cache fill.
+            await read_through.invalidate("patient:1")
+            return document
+
+        assert await read_through.get_or_load("patient:1", load) == {"v": 1}
+        return await read_through.get_or_load("patient:1", lambda: asyncio.sleep(0, {"v": 2}))
+
+    assert _run(scenario()) == {"v": 2}
+
+
+def test_memory_backend_ttl_and_lru(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("database.cache.time.monotonic", lambda: now[0])
+    backend = MemoryCacheBackend(max_entries=2, ttl=10)
+
+    async def scenario():
+        await backend.set("a", b"1")
+        await backend.set("b", b"2")
+        await backend.get("a")          # "b" is now least recently used
+        await backend.set("c", b"3")
+        assert await backend.get("b") is None
+        assert await backend.get("a") == b"1"
+        now[0] += 11
+        assert await backend.get("a") is None
+
+    _run(scenario())
+
+
+class FailingClient:
+    async def get(self, key):
+        raise ConnectionError("redis down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("redis down")
+
+    async def delete(self, *keys):
+        raise ConnectionError("redis down")
+
+
+def test_backend_errors_fall_back_to_the_database(db):
+    patient_id = _run(PatientRepository.create({"name": "Ada", "age": 36}))
+    cache.set_backend(RedisCacheBackend(client=FailingClient()))
+    assert _run(PatientRepository.find_by_id(patient_id))["name"] == "Ada"
+    _run(cache.invalidate(patient_key(patient_id)))
+    assert cache.errors == 3
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from schemas.triage_schema import TriageRequest
+from services import triage_service
+from services.triage_service import run_triage_raw
+
+REQUEST = TriageRequest(
+    age=58, gender="Male", symptoms=["Chest Pain"], blood_pressure="160/95",
+    heart_rate=110, temperature=37.2, explain="deferred",
+)
+EXPLANATION = [{"feature": "Blood_Pressure", "impact": 0.21}]
+
+
+@pytest.fixture
+def shap(monkeypatch):
+    """AI calls: "none" answers at once, "top_k" (SHAP) waits until released."""
+    state = {"explain_modes": [], "error": None}
+
+    async def predict(payload, explain="top_k"):
+        state["explain_modes"].append(explain)
+        if explain == "top_k":
+            await state["release"].wait()
+            if state["error"] is not None:
+                raise state["error"]
+        return {
+            "risk_level": "High", "recommended_department": "Cardiology", "confidence": 91.0,
+            "explanation": EXPLANATION if explain == "top_k" else [], "model_version": "v1",
+        }
+
+    monkeypatch.setattr(triage_service, "call_ai_predict", predict)
+    return state
+
+
+async def _stored(db, response):
+    return await db.predictions.find_one({"_id": ObjectId(response["prediction_id"])})
+
+
+async def _finish_background_tasks():
+    await asyncio.gather(*triage_service._background_tasks)
+
+
+def test_response_does_not_wait_for_the_explanation(db, shap):
+    async def scenario():
+        shap["release"] = asyncio.Event()
+        # Would time out if the response waited on the held-back SHAP call.
+        response = await asyncio.wait_for(run_triage_raw(REQUEST), timeout=1)
+        assert response["explanation"] == []
+        assert shap["explain_modes"] == ["none", "top_k"]
+        prediction = await _stored(db, response)
+        assert prediction["explanation_status"] == "pending"
+        shap["release"].set()
+        await _finish_background_tasks()
+
+    asyncio.run(scenario())
+
+
+def test_pending_explanation_is_completed(db, shap):
+    async def scenario():
+        shap["release"] = asyncio.Event()
+        response = await run_triage_raw(REQUEST)
+        shap["release"].set()
+        await _finish_background_tasks()
+        return await _stored(db, response)
+
+    prediction = asyncio.run(scenario())
+    assert prediction["explanation_status"] == "complete"
+    assert prediction["explanation"] == EXPLANATION
+
+
+def test_failed_explanation_is_marked_failed(db, shap):
+    shap["error"] = HTTPException(status_code=503, detail="busy")
+
+    async def scenario():
+        shap["release"] = asyncio.Event()
+        response = await run_triage_raw(REQUEST)
+        shap["release"].set()
+        await _finish_background_tasks()
+        return await _stored(db, response)
+
+    prediction = asyncio.run(scenario())
+    assert prediction["explanation_status"] == "failed"
+    assert prediction["explanation"] == []
+
+
+@pytest.mark.parametrize("explain, status", [("none", "none"), ("top_k", "complete")])
+def test_other_modes_are_not_deferred(db, shap, explain, status):
+    async def scenario():
+        shap["release"] = asyncio.Event()
+        shap["release"].set()
+        response = await run_triage_raw(REQUEST.model_copy(update={"explain": explain}))
+        assert not triage_service._background_tasks
+        return await _stored(db, response)
+
+    assert asyncio.run(scenario())["explanation_status"] == status
+    assert shap["explain_modes"] == [explain]
+
+
+def test_explanation_of_a_dropped_record_is_not_written(db, shap, monkeypatch):
+    from database import repositories
+    from database.write_behind import WriteBehindQueue
+    from tests.test_write_behind import FlakyCollection
+
+    queue = WriteBehindQueue(batch_size=10, flush_interval_ms=20)
+    monkeypatch.setattr(repositories, "PERSISTENCE_MODE", "async_batched")
+    monkeypatch.setattr(repositories, "write_behind", queue)
+    monkeypatch.setattr(triage_service, "PERSISTENCE_MODE", "async_batched")
+    db.predictions = FlakyCollection(db.predictions)
+    updates = []
+    monkeypatch.setattr(
+        triage_service.PredictionRepository, "update_explanation",
+        staticmethod(lambda *args, **kwargs: updates.append(args) or asyncio.sleep(0)),
+    )
+
+    async def scenario():
+        shap["release"] = asyncio.Event()
+        response = await run_triage_raw(REQUEST)
+        db.predictions.rejected.add(ObjectId(response["prediction_id"]))
+        await queue.stop()
+        # The flush already failed when the explanation arrives.
+        shap["release"].set()
+        await _finish_background_tasks()
+
+    asyncio.run(scenario())
+    assert updates == []
+    assert asyncio.run(db.predictions.count_documents({})) == 0
@@ -0,0 +1,195 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from database import repositories
+from database.repositories import IdempotencyRepository
+from schemas.triage_schema import TriageRequest
+from services import triage_service
+from services.triage_service import run_triage_raw
+
+REQUEST = TriageRequest(
+    age=58, gender="Male", symptoms=["Chest Pain"], blood_pressure="160/95",
+    heart_rate=110, temperature=37.2, explain="none",
+)
+
+
+@pytest.fixture
+def ai_calls(monkeypatch):
+    calls = []
+
+    async def predict(payload, explain="top_k"):
+        calls.append(payload)
+        await asyncio.sleep(0.01)
+        return {
+            "risk_level": "High", "recommended_department": "Cardiology",
+            "confidence": 91.0, "explanation": [], "model_version": "v1",
+        }
+
+    monkeypatch.setattr(triage_service, "call_ai_predict", predict)
+    return calls
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_repeat_replays_the_stored_response(db, ai_calls):
+    first = _run(run_triage_raw(REQUEST, "key-1"))
+    second = _run(run_triage_raw(REQUEST, "key-1"))
+    assert second == first
+    assert len(ai_calls) == 1
+    assert _run(db.predictions.count_documents({})) == 1
+    record = _run(db.idempotency_keys.find_one({"_id": "triage_raw:key-1"}))
+    assert record["status"] == "completed" and "lease_expires_at" not in record
+
+
+def test_key_reused_with_another_body(db, ai_calls):
+    _run(run_triage_raw(REQUEST, "key-1"))
+    with pytest.raises(HTTPException) as info:
+        _run(run_triage_raw(REQUEST.model_copy(update={"age": 59}), "key-1"))
+    assert info.value.status_code == 422
+
+
+def test_concurrent_repeats_share_one_execution(db, ai_calls):
+    async def scenario():
+        return await asyncio.gather(*(run_triage_raw(REQUEST, "key-1") for _ in range(5)))
+
+    responses = _run(scenario())
+    assert all(response == responses[0] for response in responses)
+    assert len(ai_calls) == 1
+    assert _run(db.predictions.count_documents({})) == 1
+
+
+def _claim_held_elsewhere(db, lease_expires_at):
+    _run(db.idempotency_keys.insert_one({
+        "_id": "triage_raw:key-1",
+        "request_hash": triage_service._canonical_hash(REQUEST.model_dump()),
+        "status": "in_progress",
+        "owner": "other-process",
+        "lease_expires_at": lease_expires_at,
+        "created_at": datetime.utcnow(),
+    }))
+
+
+def test_live_claim_elsewhere_is_a_conflict(db, ai_calls):
+    _claim_held_elsewhere(db, datetime.utcnow() + timedelta(seconds=30))
+    with pytest.raises(HTTPException) as info:
+        _run(run_triage_raw(REQUEST, "key-1"))
+    assert info.value.status_code == 409
+    assert ai_calls == []
+
+
+def test_stale_claim_is_taken_over(db, ai_calls):
+    _claim_held_elsewhere(db, datetime.utcnow() - timedelta(seconds=1))
+    response = _run(run_triage_raw(REQUEST, "key-1"))
+    assert len(ai_calls) == 1
+    record = _run(db.idempotency_keys.find_one({"_id": "triage_raw:key-1"}))
+    assert record["status"] == "completed"
+    assert record["owner"] != "other-process"
+    assert _run(run_triage_raw(REQUEST, "key-1")) == response
+
+
+def test_stale_claim_with_another_body_is_not_taken_over(db, ai_calls):
+    _claim_held_elsewhere(db, datetime.utcnow() - timedelta(seconds=1))
+    with pytest.raises(HTTPException) as info:
+        _run(run_triage_raw(REQUEST.model_copy(update={"age": 59}), "key-1"))
+    assert info.value.status_code == 422
+
+
+def test_only_one_retry_wins_a_stale_claim(db):
+    async def scenario():
+        return await asyncio.gather(*(
+            IdempotencyRepository.claim("k", "hash", owner) for owner in ("a", "b", "c")
+        ))
+
+    _run(db.idempotency_keys.insert_one({
+        "_id": "k", "request_hash": "hash", "status": "in_progress", "owner": "dead",
+        "lease_expires_at": datetime.utcnow() - timedelta(seconds=1), "created_at": datetime.utcnow(),
+    }))
+    results = _run(scenario())
+    assert results.count(None) == 1
+
+
+def test_previous_owner_cannot_complete_or_release(db):
+    assert _run(IdempotencyRepository.claim("k", "hash", "first")) is None
+    _run(db.idempotency_keys.update_one({"_id": "k"}, {"$set": {"lease_expires_at": datetime.utcnow()}}))
+    assert _run(IdempotencyRepository.claim("k", "hash", "second")) is None
+
+    _run(IdempotencyRepository.release("k", "first"))
+    _run(IdempotencyRepository.complete("k", "first", {"from": "first"}))
+    record = _run(db.idempotency_keys.find_one({"_id": "k"}))
+    assert (record["owner"], record["status"]) == ("second", "in_progress")
+
+    _run(IdempotencyRepository.complete("k", "second", {"from": "second"}))
+    assert _run(db.idempotency_keys.find_one({"_id": "k"}))["response"] == {"from": "second"}
+
+
+def test_failed_request_releases_its_claim(db, ai_calls, monkeypatch):
+    async def unavailable(payload, explain="top_k"):
+        raise HTTPException(status_code=503, detail="busy")
+
+    monkeypatch.setattr(triage_service, "call_ai_predict", unavailable)
+    with pytest.raises(HTTPException):
+        _run(run_triage_raw(REQUEST, "key-1"))
+    assert _run(db.idempotency_keys.count_documents({})) == 0
+
+
+def test_concurrent_requests_with_another_body_are_rejected(db, ai_calls):
+    other = REQUEST.model_copy(update={"age": 59})
+
+    async def scenario():
+        return await asyncio.gather(
+            run_triage_raw(REQUEST, "key-1"), run_triage_raw(other, "key-1"),
+            return_exceptions=True,
+        )
+
+    first, second = _run(scenario())
+    assert first["prediction_id"]
+    assert isinstance(second, HTTPException) and second.status_code == 422
+    assert len(ai_calls) == 1
+    assert _run(db.predictions.count_documents({})) == 1
+
+
+class VanishingClaims:
+    """Wraps idempotency_keys: the conflicting claim is gone by the time it is read."""
+
+    def __init__(self, collection, vanish):
+        self.collection = collection
+        self.vanish = vanish
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def find_one(self, query, *args, **kwargs):
+        if self.vanish:
+            self.vanish -= 1
+            await self.collection.delete_one(query)
+            return None
+        return await self.collection.find_one(query, *args, **kwargs)
+
+
+def test_claim_released_before_it_is_read_is_claimed_again(db):
+    _run(IdempotencyRepository.claim("k", "hash", "first"))
+    db.idempotency_keys = VanishingClaims(db.idempotency_keys, vanish=1)
+
+    assert _run(IdempotencyRepository.claim("k", "hash", "second")) is None
+    record = _run(db.idempotency_keys.find_one({"_id": "k"}))
+    assert (record["owner"], record["status"]) == ("second", "in_progress")
+
+
+def test_claim_that_keeps_vanishing_is_a_conflict(db, monkeypatch):
+    claims = db.idempotency_keys
+    db.idempotency_keys = VanishingClaims(claims, vanish=10)
+
+    async def insert_conflict(document):
+        # Another request holds the key whenever this one tries to insert it.
+        await claims.insert_one({**document, "owner": "other"})
+        await claims.insert_one(document)
+
+    monkeypatch.setattr(db.idempotency_keys, "insert_one", insert_conflict, raising=False)
+    existing = _run(IdempotencyRepository.claim("k", "hash", "mine"))
+    assert existing["status"] == "in_progress"
+    assert db.idempotency_keys.vanish == 10 - repositories.IDEMPOTENCY_CLAIM_ATTEMPTS
@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from database.rollups import ROLLUP_COLLECTION
+from services import ingest_service
+from services.ingest_service import (
+    INGEST_MAX_CHUNK_SIZE, IngestAborted, ingest_records, iter_stream_lines, parse_records,
+)
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+def _parse_csv(*parts):
+    return asyncio.run(_collect(parse_records(iter_stream_lines(_chunks(*parts)), "csv")))
+
+
+def _record(i):
+    return {
+        "age": 20 + i, "gender": "Female", "blood_pressure": "120/80",
+        "heart_rate": 70, "temperature": 36.8, "symptoms": ["Fever"],
+    }
+
+
+async def _records(n, fail_at=None):
+    for i in range(n):
+        if i == fail_at:
+            raise OSError("connection lost")
+        yield _record(i)
+
+
+def test_csv_quoted_field_spans_lines():
+    body = (
+        'age,gender,notes,symptoms\n'
+        '40,Male,"first line\n\nthird, with comma",Fever;Cough\n'
+        '51,Female,"says ""ouch""",\n'
+    )
+    # Split mid-row so the quoted field also spans request body chunks.
+    rows = _parse_csv(body[:30].encode(), body[30:].encode())
+    assert rows == [
+        {"age": "40", "gender": "Male", "notes": "first line\n\nthird, with comma", "symptoms": ["Fever", "Cough"]},
+        {"age": "51", "gender": "Female", "notes": 'says "ouch"', "symptoms": []},
+    ]
+
+
+def test_csv_unterminated_quote_is_invalid():
+    rows = _parse_csv(b'age,notes\n1,ok\n2,"never closed\n3,more\n')
+    assert rows == [{"age": "1", "notes": "ok"}, None]
+
+
+def test_ingest_writes_every_chunk(db):
+    report = asyncio.run(ingest_records(_records(25), chunk_size=10))
+    assert report.patients_inserted == 25
+    assert report.last_committed_record == 25
+    assert report.error is None
+    assert asyncio.run(db.patients.count_documents({})) == 25
+
+
+def test_failed_read_reports_what_was_written(db):
+    with pytest.raises(IngestAborted) as info:
+        asyncio.run(ingest_records(_records(25, fail_at=23), chunk_size=10))
+    report = info.value.report
+    assert report.last_committed_record == report.patients_inserted == 20
+    assert report.error == "connection lost"
+    assert asyncio.run(db.patients.count_documents({})) == 20
+
+
+def test_failed_scoring_waits_for_the_write_in_flight(db, monkeypatch):
+    calls = []
+
+    async def predict_batch(payloads, explain="none"):
+        calls.append(len(payloads))
+        if len(calls) == 2:
+            raise HTTPException(status_code=503, detail="busy", headers={"Retry-After": "1"})
+        return [
+            {"risk_level": "Low", "recommended_department": "General Medicine", "confidence": 90.0}
+            for _ in payloads
+        ]
+
+    monkeypatch.setattr(ingest_service, "call_ai_predict_batch", predict_batch)
+    monkeypatch.setattr(ingest_service, "INGEST_SCORE_CHUNK_SIZE", 8)
+    with pytest.raises(IngestAborted) as info:
+        asyncio.run(ingest_records(_records(30), chunk_size=100, score=True))
+    # Scoring chunks are capped, and the first chunk's write landed.
+    assert calls == [8, 8]
+    report = info.value.report
+    assert (report.last_committed_record, report.predictions_inserted) == (8, 8)
+    assert info.value.cause.status_code == 503
+    assert asyncio.run(db.predictions.count_documents({})) == 8
+
+
+def test_created_at_with_an_offset_is_stored_in_utc(db):
+    async def records():
+        yield {
+            **_record(0), "created_at": "2024-03-01T02:00:00+05:30",
+            "risk_level": "Low", "recommended_department": "General Medicine", "confidence_score": 88.0,
+        }
+
+    report = asyncio.run(ingest_records(records()))
+    assert report.predictions_inserted == 1
+    prediction = asyncio.run(db.predictions.find_one({}))
+    assert prediction["created_at"] == datetime(2024, 2, 29, 20, 30)
+    # Counted on the UTC day, as the date range queries and exports see it.
+    bucket = asyncio.run(db[ROLLUP_COLLECTION].find_one({}))
+    assert bucket["_id"] == "2024-02-29"
+
+
+@pytest.mark.parametrize("chunk_size", [0, INGEST_MAX_CHUNK_SIZE + 1])
+def test_chunk_size_is_bounded(chunk_size):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    response = TestClient(app).post(f"/api/ingest?chunk_size={chunk_size}", content=b"")
+    assert response.status_code == 422
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from database import repositories
+from database.repositories import TriageRecordRepository
+from database.write_behind import WriteBehindQueue
+from main import app
+from routes import data as data_routes
+from services import live_feed as live_feed_module
+from services import triage_service
+from services.live_feed import LiveFeed, event_stream
+from tests.test_write_behind import FlakyCollection
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    feed = LiveFeed(source="local")
+    monkeypatch.setattr(triage_service, "live_feed", feed)
+    return feed
+
+
+@pytest.fixture
+def batched(monkeypatch):
+    queue = WriteBehindQueue(batch_size=10, flush_interval_ms=50)
+    monkeypatch.setattr(repositories, "PERSISTENCE_MODE", "async_batched")
+    monkeypatch.setattr(repositories, "write_behind", queue)
+    monkeypatch.setattr(triage_service, "PERSISTENCE_MODE", "async_batched")
+    return queue
+
+
+async def _store_and_publish(risk_level="High"):
+    patient = {"age": 40}
+    prediction = {"risk_level": risk_level, "recommended_department": "Cardiology"}
+    await TriageRecordRepository.create(patient, prediction)
+    triage_service._publish_when_persisted(prediction)
+    return prediction
+
+
+def test_sync_mode_publishes_right_away(db, feed):
+    async def scenario():
+        subscriber = feed.subscribe()
+        prediction = await _store_and_publish()
+        assert await db.predictions.count_documents({"_id": prediction["_id"]}) == 1
+        event_id, _ = subscriber.queue.get_nowait()
+        assert event_id == str(prediction["_id"])
+
+    asyncio.run(scenario())
+
+
+def test_batched_mode_publishes_after_the_flush(db, feed, batched):
+    async def scenario():
+        subscriber = feed.subscribe()
+        prediction = await _store_and_publish()
+        await asyncio.sleep(0)
+        # Queued, not stored yet: a replay would not find it.
+        assert subscriber.queue.empty()
+
+        event_id, _ = await asyncio.wait_for(subscriber.queue.get(), timeout=2)
+        assert event_id == str(prediction["_id"])
+        assert await db.predictions.count_documents({"_id": ObjectId(event_id)}) == 1
+        await batched.stop()
+
+    asyncio.run(scenario())
+
+
+def test_batched_mode_skips_records_that_were_not_stored(db, feed, batched):
+    db.predictions = FlakyCollection(db.predictions)
+
+    async def scenario():
+        subscriber = feed.subscribe()
+        refused = await _store_and_publish()
+        # Still queued: make MongoDB reject it when the batch is flushed.
+        db.predictions.rejected.add(refused["_id"])
+        stored = await _store_and_publish(risk_level="Low")
+        await batched.stop()
+        await asyncio.gather(*triage_service._background_tasks)
+
+        event_id, _ = subscriber.queue.get_nowait()
+        assert event_id == str(stored["_id"])
+        assert subscriber.queue.empty()
+
+    asyncio.run(scenario())
+
+
+async def _collect(stream, count):
+    messages = []
+    async for message in stream:
+        messages.append(message)
+        if len(messages) == count:
+            break
+    return messages
+
+
+def test_replay_past_the_limit_ends_with_a_truncated_event(db, feed, monkeypatch):
+    monkeypatch.setattr(live_feed_module, "LIVE_FEED_BACKFILL_LIMIT", 3)
+
+    async def scenario():
+        ids = [ObjectId() for _ in range(6)]
+        await db.predictions.insert_many([
+            {"_id": _id, "risk_level": "High", "recommended_department": "Cardiology"} for _id in ids
+        ])
+        stream = event_stream(last_event_id=str(ids[0]), feed=feed, max_seconds=0)
+        messages = [message async for message in stream]
+        replayed = [message for message in messages if message.startswith(b"id: ")]
+        assert [message.split(b"\n")[0] for message in replayed] == [f"id: {_id}".encode() for _id in ids[1:4]]
+        assert messages[-1] == b'event: truncated\ndata: {"limit":3}\n\n'
+
+        # Exactly at the limit nothing is left out.
+        stream = event_stream(last_event_id=str(ids[2]), feed=feed, max_seconds=0)
+        assert not [message async for message in stream if b"truncated" in message]
+
+    asyncio.run(scenario())
+
+
+def test_stream_that_is_never_iterated_holds_no_subscription(feed):
+    async def scenario():
+        stream = event_stream(feed=feed)
+        assert feed.stats()["subscribers"] == 0
+        await stream.aclose()
+
+        stream = event_stream(feed=feed, heartbeat=0.01)
+        await _collect(stream, 3)  # retry directive, then keep-alives
+        assert feed.stats()["subscribers"] == 1
+        await stream.aclose()
+        assert feed.stats()["subscribers"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_feed_is_rejected_before_streaming(feed, monkeypatch):
+    monkeypatch.setattr(data_routes, "live_feed", feed)
+    feed.max_subscribers = 1
+    feed.subscribe()
+    response = TestClient(app).get("/api/predictions/stream")
+    assert response.status_code == 503
+    assert feed.stats()["subscribers"] == 1
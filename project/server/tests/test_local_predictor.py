@@ -0,0 +1,79 @@
+import asyncio
+import os
+import signal
+
+import pytest
+from fastapi import HTTPException
+
+from services.ai_service import LocalPredictor
+
+PAYLOAD = {
+    "age": 58, "gender": "Male", "blood_pressure": 160, "heart_rate": 110,
+    "temperature": 37.2, "symptoms": ["Chest Pain"], "conditions": ["Hypertension"],
+}
+
+
+@pytest.fixture
+def predictor():
+    predictor = LocalPredictor(workers=1)
+    yield predictor
+    asyncio.run(predictor.close())
+
+
+def test_scores_in_a_worker_process(predictor):
+    async def scenario():
+        single = await predictor.predict(PAYLOAD, "none")
+        batch = await predictor.predict_batch([PAYLOAD, {**PAYLOAD, "age": 30}], "none")
+        return single, batch
+
+    single, batch = asyncio.run(scenario())
+    assert isinstance(single["risk_level"], str)
+    assert single["recommended_department"] and single["model_version"]
+    assert single["explanation"] == []
+    assert batch[0] == single
+    assert len(batch) == 2 and all(isinstance(result["risk_level"], str) for result in batch)
+
+
+def test_broken_pool_is_replaced(predictor):
+    async def scenario():
+        await predictor.predict(PAYLOAD, "none")
+        broken = predictor._pool
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+        with pytest.raises(HTTPException) as info:
+            await predictor.predict(PAYLOAD, "none")
+        assert info.value.status_code == 503
+        assert predictor._pool is None
+
+        # The next call starts a new pool.
+        result = await predictor.predict(PAYLOAD, "none")
+        assert predictor._pool is not broken
+        return result
+
+    assert isinstance(asyncio.run(scenario())["risk_level"], str)
+
+
+def test_close_does_not_block_the_event_loop(predictor):
+    async def scenario():
+        await predictor.predict(PAYLOAD, "none")
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.create_task(tick())
+        in_flight = asyncio.create_task(predictor.predict_batch([PAYLOAD] * 5000, "none"))
+        await asyncio.sleep(0.01)
+        before = ticks
+        # Shutdown waits for the batch in flight; the loop keeps running meanwhile.
+        await predictor.close()
+        during = ticks - before
+        ticker.cancel()
+        await asyncio.gather(in_flight, return_exceptions=True)
+        return during
+
+    assert asyncio.run(scenario()) > 0
+    assert predictor._pool is None
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from database.pagination import MAX_PAGE_SIZE, InvalidCursorError, fetch_page
+from main import app
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def patients(db):
+    # Two rows share each timestamp, so _id breaks the ties.
+    documents = [
+        {"_id": ObjectId(), "name": f"patient {i}", "created_at": START + timedelta(minutes=i // 2)}
+        for i in range(7)
+    ]
+    asyncio.run(db.patients.insert_many(documents))
+    return sorted(documents, key=lambda doc: (doc["created_at"], doc["_id"]), reverse=True)
+
+
+def _all_pages(collection, limit):
+    pages, cursor = [], None
+    while True:
+        page, cursor = asyncio.run(fetch_page(collection, {}, limit, cursor))
+        pages.append([doc["_id"] for doc in page])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_pages_cover_every_row_once(db, patients, limit):
+    pages = _all_pages(db.patients, limit)
+    assert [_id for page in pages for _id in page] == [doc["_id"] for doc in patients]
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 1 <= len(pages[-1]) <= limit
+
+
+def test_limit_beyond_end(db, patients):
+    page, cursor = asyncio.run(fetch_page(db.patients, {}, 100))
+    assert len(page) == 7 and cursor is None
+
+
+def test_empty_collection(db):
+    assert asyncio.run(fetch_page(db.patients, {}, 10)) == ([], None)
+
+
+@pytest.mark.parametrize("limit", [0, -1, MAX_PAGE_SIZE + 1])
+def test_fetch_page_rejects_bad_limits(db, limit):
+    with pytest.raises(ValueError):
+        asyncio.run(fetch_page(db.patients, {}, limit))
+
+
+def test_invalid_cursor(db):
+    with pytest.raises(InvalidCursorError):
+        asyncio.run(fetch_page(db.patients, {}, 10, cursor="not-a-cursor"))
+
+
+@pytest.mark.parametrize("path", [
+    "/api/patients",
+    "/api/predictions",
+    f"/api/predictions/patient/{ObjectId()}",
+    "/api/predictions/risk/High",
+    "/api/users",
+])
+@pytest.mark.parametrize("limit", [0, -5, MAX_PAGE_SIZE + 1])
+def test_list_routes_validate_limit(db, path, limit):
+    response = TestClient(app).get(path, params={"limit": limit})
+    assert response.status_code == 422
+
+
+def test_route_pages(db, patients):
+    client = TestClient(app)
+    first = client.get("/api/patients", params={"limit": 5}).json()
+    assert first["count"] == 5
+    second = client.get("/api/patients", params={"limit": 5, "cursor": first["next_cursor"]}).json()
+    assert second["count"] == 2 and second["next_cursor"] is None
+    assert client.get("/api/patients", params={"cursor": "bad"}).status_code == 400
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from benchmarks.fake_db import FakeDatabase
+from database import connection, rollups
+from database.rollups import (
+    REBUILD_COLLECTION,
+    ROLLUP_COLLECTION,
+    get_daily_stats,
+    rebuild_rollups,
+    record_predictions,
+    record_stored_predictions,
+)
+from tests.conftest import metric_value
+
+DAY_1, DAY_2 = datetime(2026, 3, 1, 9), datetime(2026, 3, 2, 17)
+
+
+def _prediction(created_at, risk_level="High", confidence=85.0):
+    return {
+        "risk_level": risk_level,
+        "recommended_department": "Cardiology",
+        "confidence_score": confidence,
+        "created_at": created_at,
+    }
+
+
+PREDICTIONS = [_prediction(DAY_1), _prediction(DAY_1, "Low", 42.0), _prediction(DAY_2)]
+
+
+async def _rollups(db):
+    return {doc["_id"]: doc for doc in await db[ROLLUP_COLLECTION].find({}).to_list(None)}
+
+
+def test_record_predictions_counts_per_day(db):
+    asyncio.run(record_predictions(PREDICTIONS))
+    asyncio.run(record_predictions(PREDICTIONS[:1]))
+    day_1 = asyncio.run(_rollups(db))["2026-03-01"]
+    assert day_1["total"] == 3
+    assert day_1["risk_level"] == {"High": 2, "Low": 1}
+    assert day_1["confidence"] == {"80": 2, "40": 1}
+    assert day_1["confidence_sum"] == pytest.approx(212.0)
+
+
+def test_record_predictions_on_the_benchmark_database(monkeypatch):
+    fake = FakeDatabase()
+    monkeypatch.setattr(connection, "db", fake)
+    asyncio.run(record_predictions(PREDICTIONS))
+    asyncio.run(record_predictions(PREDICTIONS))
+    day_1 = fake[ROLLUP_COLLECTION].documents["2026-03-01"]
+    assert day_1["total"] == 4
+    assert day_1["department"] == {"Cardiology": 4}
+    assert day_1["date"] == datetime(2026, 3, 1)
+
+
+class BrokenCollection:
+    async def update_one(self, *args, **kwargs):
+        raise OSError("not primary")
+
+
+class BrokenRollups:
+    """A database whose rollup collection fails every write."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, name):
+        return BrokenCollection() if name in (ROLLUP_COLLECTION, REBUILD_COLLECTION) else self.db[name]
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+
+def test_record_predictions_raises(db, monkeypatch):
+    monkeypatch.setattr(connection, "db", BrokenRollups(db))
+    with pytest.raises(OSError):
+        asyncio.run(record_predictions(PREDICTIONS))
+
+
+def test_failures_after_a_write_are_logged_and_counted(db, monkeypatch, caplog):
+    monkeypatch.setattr(connection, "db", BrokenRollups(db))
+    before = metric_value("gateway_rollup_errors_total")
+    asyncio.run(record_stored_predictions(PREDICTIONS))
+    assert metric_value("gateway_rollup_errors_total") == before + 1
+    assert "Failed to update prediction rollups for 3 predictions" in caplog.text
+
+
+def test_rebuild_replaces_the_rollups(db):
+    asyncio.run(db.predictions.insert_many([dict(p) for p in PREDICTIONS]))
+    # Stale counts and a leftover from an interrupted rebuild.
+    asyncio.run(db[ROLLUP_COLLECTION].insert_one({"_id": "2026-03-01", "total": 99}))
+    asyncio.run(db[ROLLUP_COLLECTION].insert_one({"_id": "2025-01-01", "total": 5}))
+    asyncio.run(db[REBUILD_COLLECTION].insert_one({"_id": "2026-03-02", "total": 7}))
+
+    assert asyncio.run(rebuild_rollups(batch_size=2)) == 3
+    documents = asyncio.run(_rollups(db))
+    assert sorted(documents) == ["2026-03-01", "2026-03-02"]
+    assert documents["2026-03-01"]["total"] == 2
+    assert documents["2026-03-02"]["total"] == 1
+    assert REBUILD_COLLECTION not in asyncio.run(db.list_collection_names())
+
+
+def test_rebuild_without_predictions_clears_the_rollups(db):
+    asyncio.run(db[ROLLUP_COLLECTION].insert_one({"_id": "2026-03-01", "total": 99}))
+    assert asyncio.run(rebuild_rollups()) == 0
+    assert asyncio.run(_rollups(db)) == {}
+
+
+def test_failed_rebuild_keeps_the_live_rollups(db, monkeypatch):
+    asyncio.run(db.predictions.insert_many([dict(p) for p in PREDICTIONS]))
+    asyncio.run(record_predictions(PREDICTIONS))
+    live = asyncio.run(_rollups(db))
+
+    async def failing(predictions, collection=ROLLUP_COLLECTION):
+        raise OSError("connection reset")
+
+    monkeypatch.setattr(rollups, "record_predictions", failing)
+    with pytest.raises(OSError):
+        asyncio.run(rebuild_rollups())
+    assert asyncio.run(_rollups(db)) == live
+
+
+def test_daily_stats_read_the_rollups(db, monkeypatch):
+    asyncio.run(record_predictions(PREDICTIONS))
+    monkeypatch.setattr(rollups, "_window", lambda days, end=None: ["2026-03-01", "2026-03-02", "2026-03-03"])
+    buckets = asyncio.run(get_daily_stats(3))["buckets"]
+    assert [bucket["total"] for bucket in buckets] == [2, 1, 0]
+    assert buckets[0]["average_confidence"] == pytest.approx(63.5)
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+    assert results == [{"value": 42}] * 10
+    assert calls == [1]
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "shared": 9}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+
+    async def scenario():
+        return await asyncio.gather(
+            flight.do("a", lambda: asyncio.sleep(0.01, "a")),
+            flight.do("b", lambda: asyncio.sleep(0.01, "b")),
+        )
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert flight.executed == 2
+
+
+def test_nothing_is_cached_after_a_call_finishes():
+    flight = SingleFlight("test")
+    values = iter([1, 2])
+
+    async def scenario():
+        first = await flight.do("key", lambda: asyncio.sleep(0, next(values)))
+        second = await flight.do("key", lambda: asyncio.sleep(0, next(values)))
+        return first, second
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("backend down")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+
+    async def scenario():
+        first = asyncio.create_task(flight.do("key", lambda: asyncio.sleep(0.05, "done")))
+        second = asyncio.create_task(flight.do("key", lambda: asyncio.sleep(0.05, "unused")))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
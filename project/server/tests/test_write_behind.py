@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError, WriteError
+
+from database import write_behind as write_behind_module
+from database.rollups import ROLLUP_COLLECTION
+from database.write_behind import WriteBehindQueue
+from tests.conftest import make_record
+
+
+class FlakyCollection:
+    """Wraps a collection: insert_many fails `failures` times, and rejects the listed _ids."""
+
+    def __init__(self, collection, failures=0, rejected=()):
+        self.collection = collection
+        self.failures = failures
+        self.rejected = set(rejected)
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def insert_many(self, documents, ordered=True):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        accepted = [doc for doc in documents if doc["_id"] not in self.rejected]
+        if accepted:
+            try:
+                await self.collection.insert_many(accepted, ordered=False)
+            except BulkWriteError:
+                pass  # duplicates from an earlier attempt
+        errors = [
+            {"index": index, "code": 121, "errmsg": "Document failed validation", "op": doc}
+            for index, doc in enumerate(documents)
+            if doc["_id"] in self.rejected
+        ]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(accepted)})
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(write_behind_module, "WRITE_BEHIND_RETRY_BACKOFF_MS", 1.0)
+
+
+async def _write(queue, records):
+    for patient, prediction in records:
+        await queue.enqueue(patient, prediction)
+    results = await asyncio.gather(
+        *(queue.wait_persisted(str(prediction["_id"])) for _, prediction in records),
+        return_exceptions=True,
+    )
+    await queue.stop()
+    return results
+
+
+def test_flushes_records_in_one_batch(db):
+    records = [make_record() for _ in range(5)]
+    queue = WriteBehindQueue(batch_size=10, flush_interval_ms=20)
+
+    assert asyncio.run(_write(queue, records)) == [None] * 5
+    assert asyncio.run(db.patients.count_documents({})) == 5
+    assert asyncio.run(db.predictions.count_documents({})) == 5
+    assert queue.stats()["flushed_records"] == 5
+    assert queue.flush_count == 1
+
+
+def test_retries_a_failed_flush(db):
+    db.patients = FlakyCollection(db.patients, failures=2)
+    records = [make_record() for _ in range(3)]
+    queue = WriteBehindQueue(batch_size=10, flush_interval_ms=20, max_retries=3)
+
+    assert asyncio.run(_write(queue, records)) == [None] * 3
+    assert queue.flush_retries == 2
+    assert (queue.flushed_records, queue.failed_records) == (3, 0)
+    assert asyncio.run(db.predictions.count_documents({})) == 3
+
+
+def test_drops_the_batch_after_the_last_retry(db, monkeypatch):
+    db.patients = FlakyCollection(db.patients, failures=10)
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def recording_sleep(seconds):
+        sleeps.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(write_behind_module.asyncio, "sleep", recording_sleep)
+    records = [make_record() for _ in range(3)]
+    queue = WriteBehindQueue(batch_size=10, flush_interval_ms=20, max_retries=2)
+
+    results = asyncio.run(_write(queue, records))
+    assert all(isinstance(result, AutoReconnect) for result in results)
+    assert db.patients.calls == 3
+    # No backoff after the final attempt.
+    assert len(sleeps) == queue.flush_retries == 2
+    assert (queue.flushed_records, queue.failed_records) == (0, 3)
+    assert asyncio.run(db[ROLLUP_COLLECTION].count_documents({})) == 0
+
+
+def test_rejected_document_does_not_fail_its_batch(db):
+    records = [make_record() for _ in range(4)]
+    bad_patient, bad_prediction = records[1][0], records[2][1]
+    db.patients = FlakyCollection(db.patients, rejected=[bad_patient["_id"]])
+    db.predictions = FlakyCollection(db.predictions, rejected=[bad_prediction["_id"]])
+    queue = WriteBehindQueue(batch_size=10, flush_interval_ms=20, max_retries=3)
+
+    results = asyncio.run(_write(queue, records))
+    assert results[0] is None and results[3] is None
+    assert isinstance(results[1], WriteError) and isinstance(results[2], WriteError)
+    assert results[2].code == 121
+    # Rejections are not retried, and the records that made it are not counted as dropped.
+    assert queue.flush_retries == 0
+    assert (queue.flushed_records, queue.failed_records) == (2, 2)
+
+    stored = {doc["_id"] for doc in asyncio.run(db.predictions.find({}).to_list(None))}
+    assert stored == {records[0][1]["_id"], records[3][1]["_id"]}
+    # No patient is left behind without its prediction.
+    patients = {doc["_id"] for doc in asyncio.run(db.patients.find({}).to_list(None))}
+    assert patients == {records[0][0]["_id"], records[3][0]["_id"]}
+    rollup = asyncio.run(db[ROLLUP_COLLECTION].find_one({}))
+    assert rollup["total"] == 2
+
+
+def test_wait_persisted_reports_a_failure_after_the_flush(db):
+    records = [make_record() for _ in range(2)]
+    db.predictions = FlakyCollection(db.predictions, rejected=[records[1][1]["_id"]])
+    queue = WriteBehindQueue(batch_size=10, flush_interval_ms=20)
+    asyncio.run(_write(queue, records))
+
+    async def wait(prediction):
+        await queue.wait_persisted(str(prediction["_id"]))
+
+    # Already flushed: stored returns at once, dropped raises its write error.
+    asyncio.run(wait(records[0][1]))
+    with pytest.raises(WriteError):
+        asyncio.run(wait(records[1][1]))
+    # Never queued here.
+    asyncio.run(wait(make_record()[1]))
+
+
+def test_failure_history_is_bounded(db, monkeypatch):
+    monkeypatch.setattr(write_behind_module, "WRITE_BEHIND_FAILURE_HISTORY", 2)
+    records = [make_record() for _ in range(3)]
+    db.predictions = FlakyCollection(db.predictions, rejected=[prediction["_id"] for _, prediction in records])
+    queue = WriteBehindQueue(batch_size=10, flush_interval_ms=20)
+    asyncio.run(_write(queue, records))
+    assert list(queue._failed) == [str(prediction["_id"]) for _, prediction in records[1:]]
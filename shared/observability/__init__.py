@@ -0,0 +1 @@
+"""Metrics and trace IDs shared by the triage gateway and the AI backend."""
@@ -0,0 +1,167 @@
+"""
+Prometheus metrics and trace IDs for the triage services.
+
+Metrics are prometheus_client objects. Each service defines its own
+metrics (with its own name prefix) next to its code; this module holds
+what both share: the HTTP request metrics and middleware, the X-Trace-Id
+handling and the GET /metrics rendering.
+
+With several worker processes behind one port (uvicorn --workers,
+gunicorn), set PROMETHEUS_MULTIPROC_DIR to an empty directory before the
+service starts: every process then writes its values there and /metrics
+reports the sum over all of them instead of whichever process answered.
+Gauges declare how to combine processes (multiprocess_mode); the
+directory must be emptied on each restart, and a process manager that
+replaces workers should call mark_process_dead(pid) when one exits.
+"""
+import contextvars
+import logging
+import os
+import time
+import uuid
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# -------- Configuration --------
+# Requests slower than this are logged with their trace ID (0 disables).
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+
+TRACE_HEADER = "X-Trace-Id"
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+# Finer than prometheus_client's defaults at the low end, where most stages fall.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "CONTENT_TYPE", "DEFAULT_BUCKETS", "TRACE_HEADER", "Counter", "Gauge", "Histogram",
+    "HttpMetrics", "MetricsMiddleware", "current_trace_id", "mark_process_dead",
+    "render_metrics", "trace_id_var",
+]
+
+
+def multiprocess_enabled():
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_metrics():
+    """The Prometheus text exposition for GET /metrics (all processes in multiprocess mode)."""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid):
+    """Drop the live gauges of an exited worker process (multiprocess mode only)."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
+
+
+class HttpMetrics:
+    """Request latency, in-flight and error metrics for one service, named <prefix>_http_*."""
+
+    def __init__(self, prefix):
+        self.request_seconds = Histogram(
+            f"{prefix}_http_request_duration_seconds", "HTTP request latency by route.",
+            ["method", "route"], buckets=DEFAULT_BUCKETS,
+        )
+        self.in_flight = Gauge(
+            f"{prefix}_http_requests_in_flight", "HTTP requests being handled.",
+            multiprocess_mode="livesum",
+        )
+        self.errors = Counter(
+            f"{prefix}_http_request_errors", "HTTP responses with status >= 400 or unhandled errors.",
+            ["method", "route", "status"],
+        )
+
+
+# -------- Trace IDs --------
+trace_id_var = contextvars.ContextVar("trace_id", default=None)
+
+
+def current_trace_id():
+    return trace_id_var.get()
+
+
+def _is_event_stream(headers):
+    return any(
+        name.lower() == b"content-type" and value.split(b";")[0].strip() == b"text/event-stream"
+        for name, value in headers
+    )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency, in-flight and error metrics per route
+    template, plus the X-Trace-Id header in and out.
+
+    Event streams stay open for minutes; once one starts it is left out of
+    the latency, in-flight and slow-request figures.
+    """
+
+    def __init__(self, app, metrics, service):
+        self.app = app
+        self.metrics = metrics
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-trace-id":
+                trace_id = value.decode("latin-1")[:64]
+                break
+        trace_id = trace_id or uuid.uuid4().hex
+        token = trace_id_var.set(trace_id)
+        status = 500
+        streaming = False
+        in_flight = self.metrics.in_flight
+
+        async def send_with_trace(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if _is_event_stream(headers):
+                    streaming = True
+                    in_flight.dec()
+                message["headers"] = headers + [
+                    (TRACE_HEADER.lower().encode(), trace_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        start = time.perf_counter()
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            if not streaming:
+                in_flight.dec()
+                self.metrics.request_seconds.labels(method, route).observe(elapsed)
+            if status >= 400:
+                self.metrics.errors.labels(method, route, status).inc()
+            if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS and not streaming:
+                logger.warning(
+                    "Slow %s request trace_id=%s %s %s status=%s took %.3fs",
+                    self.service, trace_id, method, route, status, elapsed,
+                )
+            trace_id_var.reset(token)
@@ -0,0 +1,276 @@
+"""
+On-demand sampling profiler, used by the gateway (/api/ops/profile) and
+the AI backend (/admin/profile).
+
+A background thread snapshots every thread's Python stack with
+sys._current_frames() every interval and counts identical stacks. The
+result is written in the collapsed-stack format ("frame;frame;frame count"
+per line) read by flamegraph.pl, speedscope and inferno. Nothing runs
+between sessions, and only one session can run per process at a time.
+
+Threads waiting for work (an idle event loop, pool threads blocked on
+their queue) are left out unless include_idle is set.
+
+In slow-request mode only the event loop thread is sampled, each sample
+is charged to the request whose task was running, and at the end of each
+request its samples are kept if it took at least the threshold. Each kept
+request becomes its own root frame ("POST /predict trace=... 812ms"). This
+covers CPU spent on the event loop; work handed to other processes is only
+visible in their own profiles.
+
+Worker processes (the AI backend's inference workers) are profiled by
+starting the same sampler inside each of them (start_worker_profile); each
+writes its stacks to a file that the parent merges (collect_worker_profiles).
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# -------- Configuration --------
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+
+# Innermost frames (file name, function) of threads that are only waiting.
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("connection.py", "_recv"),
+    ("connection.py", "wait"),
+    ("synchronize.py", "__enter__"),
+}
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+# -------- Sampler --------
+_labels = {}
+
+
+def _frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        # co_qualname is new in Python 3.11.
+        name = getattr(code, "co_qualname", code.co_name)
+        label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        _labels[code] = label
+    return label
+
+
+def _stack(frame):
+    """Labels from the outermost frame to frame."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _is_idle(frame):
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+class StackSampler:
+    """
+    Counts stack samples of the threads of this process for one session.
+
+    With a loop and slow_seconds set it runs in slow-request mode: only the
+    loop thread is sampled and samples are charged to the running request.
+    """
+
+    def __init__(self, interval_seconds, include_idle=False, root=None,
+                 loop=None, slow_seconds=None):
+        self.interval = max(0.001, interval_seconds)
+        self.include_idle = include_idle
+        self.root = [root] if root else []
+        self.loop = loop
+        self.slow_seconds = slow_seconds
+        self.loop_thread = None
+        self.counts = Counter()
+        self.samples = 0
+        self.slow_requests = 0
+        # Task of each request in flight -> its sample counts.
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def run(self, seconds):
+        """Sample until seconds have passed; blocks the calling thread."""
+        me = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self._sample(me)
+            time.sleep(self.interval)
+
+    def _sample(self, me):
+        self.samples += 1
+        frames = sys._current_frames()
+        if self.slow_seconds is not None:
+            frame = frames.get(self.loop_thread)
+            task = asyncio.current_task(self.loop)
+            if frame is None or task is None:
+                return
+            with self._lock:
+                counts = self._requests.get(task)
+                if counts is not None:
+                    counts[tuple(_stack(frame))] += 1
+            return
+
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident == me or (not self.include_idle and _is_idle(frame)):
+                continue
+            stack = self.root + [names.get(ident, f"thread-{ident}")] + _stack(frame)
+            self.counts[tuple(stack)] += 1
+
+    # Called on the event loop by RequestProfilingMiddleware.
+    def begin_request(self, task):
+        with self._lock:
+            self._requests[task] = Counter()
+
+    def end_request(self, task, name, seconds):
+        with self._lock:
+            counts = self._requests.pop(task, None)
+        if counts is None or seconds < self.slow_seconds:
+            return
+        self.slow_requests += 1
+        root = self.root + [f"{name} {seconds * 1000:.0f}ms"]
+        for stack, count in counts.items():
+            self.counts[tuple(root) + stack] += count
+
+    def collapsed(self):
+        return format_collapsed(self.counts)
+
+
+def format_collapsed(counts):
+    lines = [f"{';'.join(stack)} {count}" for stack, count in counts.most_common()]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def parse_collapsed(text):
+    counts = Counter()
+    for line in text.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if stack:
+            counts[tuple(stack.split(";"))] += int(count)
+    return counts
+
+
+# -------- Sessions --------
+_session = None
+
+
+def _check_duration(seconds):
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise ValueError(f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}]")
+
+
+async def profile(seconds, interval_ms=PROFILE_INTERVAL_MS, include_idle=False,
+                  root=None, slow_ms=None, during=None):
+    """
+    Sample this process for seconds and return the StackSampler.
+
+    slow_ms switches to slow-request mode. during is an optional function
+    returning a coroutine to run alongside the sampler (e.g. profiling the
+    inference workers); its result is returned as the second value.
+    """
+    global _session
+    _check_duration(seconds)
+    if _session is not None:
+        raise ProfilerBusy()
+
+    loop = asyncio.get_running_loop()
+    slow_seconds = slow_ms / 1000.0 if slow_ms is not None else None
+    sampler = StackSampler(
+        interval_ms / 1000.0, include_idle=include_idle, root=root,
+        loop=loop, slow_seconds=slow_seconds,
+    )
+    sampler.loop_thread = threading.get_ident()
+    _session = sampler
+    try:
+        sampling = asyncio.to_thread(sampler.run, seconds)
+        if during is None:
+            await sampling
+            return sampler, None
+        _, extra = await asyncio.gather(sampling, during())
+        return sampler, extra
+    finally:
+        _session = None
+
+
+class RequestProfilingMiddleware:
+    """
+    ASGI middleware that reports each request to a slow-request profiling
+    session; a pass-through when none is running.
+    """
+
+    def __init__(self, app, trace_id=lambda: None):
+        self.app = app
+        self.trace_id = trace_id
+
+    async def __call__(self, scope, receive, send):
+        session = _session
+        if session is None or session.slow_seconds is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        session.begin_request(task)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            name = f"{scope['method']} {route} trace={self.trace_id()}"
+            session.end_request(task, name, time.perf_counter() - start)
+
+
+# -------- Worker Processes --------
+_worker_session = None
+
+
+def start_worker_profile(path, seconds, interval_seconds, include_idle=False, root="inference-worker"):
+    """
+    Start sampling this worker process in a background thread and write
+    the collapsed stacks to path/<pid>.folded when done. Safe to call more
+    than once per session; returns the worker's pid.
+    """
+    global _worker_session
+    if _worker_session == path:
+        return os.getpid()
+    _worker_session = path
+    sampler = StackSampler(interval_seconds, include_idle=include_idle, root=root)
+
+    def run():
+        sampler.run(seconds)
+        target = os.path.join(path, f"{os.getpid()}.folded")
+        with open(target + ".tmp", "w") as handle:
+            handle.write(sampler.collapsed())
+        os.replace(target + ".tmp", target)
+
+    threading.Thread(target=run, name="profiler", daemon=True).start()
+    return os.getpid()
+
+
+async def collect_worker_profiles(path, pids, timeout):
+    """Merge the stacks written by start_worker_profile for pids."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    pending = set(pids)
+    counts = Counter()
+    while pending and loop.time() < deadline:
+        for pid in list(pending):
+            target = os.path.join(path, f"{pid}.folded")
+            if os.path.exists(target):
+                with open(target) as handle:
+                    counts.update(parse_collapsed(handle.read()))
+                pending.discard(pid)
+        if pending:
+            await asyncio.sleep(0.05)
+    return counts, pending